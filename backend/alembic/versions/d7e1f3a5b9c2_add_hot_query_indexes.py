@@ -0,0 +1,67 @@
+"""add expression, composite and partial indexes for hot queries
+
+Revision ID: d7e1f3a5b9c2
+Revises: c1d2e3f4a5b6
+Create Date: 2026-10-18
+
+Each index matches a predicate the plain column indexes cannot serve:
+- lower(email) lookups: crud.user.get_by_email, forwarder portal auth
+- unread counts: conversation_id IN (...) AND is_read = false AND sender_role <> 'SYSTEM'
+  (replaces idx_msg_unread, which also indexed every already-read message)
+- conversation lists: WHERE shipper_id/forwarder_id = ? ORDER BY updated_at DESC
+- forwarder inbox: status = 'OPEN' ORDER BY submitted_at DESC with a NOT IN over
+  the forwarder's own quotations
+
+Built CONCURRENTLY so live tables are not write-locked, and IF NOT EXISTS / IF EXISTS because
+the models declare several of these indexes too: ensure_schema's create_all may already have
+built them before this migration runs. Verify plans with scripts/explain_hot_queries.py.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd7e1f3a5b9c2'
+down_revision = 'c1d2e3f4a5b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('idx_users_email_lower', 'users', [sa.text('lower(email)')],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('idx_forwarders_email_lower', 'forwarders', [sa.text('lower(email)')],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+        op.create_index('idx_msg_unread_partial', 'chat_messages', ['conversation_id', 'sender_id'],
+                        postgresql_where=sa.text("is_read = false AND sender_role <> 'SYSTEM'"),
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('idx_msg_unread', table_name='chat_messages', postgresql_concurrently=True, if_exists=True)
+
+        op.create_index('idx_conv_shipper_updated', 'conversations', ['shipper_id', sa.text('updated_at DESC')],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('idx_conv_forwarder_updated', 'conversations', ['forwarder_id', sa.text('updated_at DESC')],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+        op.create_index('idx_request_open_submitted', 'requests', [sa.text('submitted_at DESC')],
+                        postgresql_where=sa.text("status = 'OPEN'"),
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('idx_request_open_f2f_submitted', 'requests',
+                        [sa.text('is_f2f DESC'), sa.text('submitted_at DESC')],
+                        postgresql_where=sa.text("status = 'OPEN'"),
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('idx_quote_forwarder_request', 'quotations', ['forwarder_id', 'request_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_quote_forwarder_request', table_name='quotations', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_request_open_f2f_submitted', table_name='requests', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_request_open_submitted', table_name='requests', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_conv_forwarder_updated', table_name='conversations', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_conv_shipper_updated', table_name='conversations', postgresql_concurrently=True, if_exists=True)
+        op.create_index('idx_msg_unread', 'chat_messages', ['conversation_id', 'is_read', 'sender_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('idx_msg_unread_partial', table_name='chat_messages', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_forwarders_email_lower', table_name='forwarders', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_users_email_lower', table_name='users', postgresql_concurrently=True, if_exists=True)
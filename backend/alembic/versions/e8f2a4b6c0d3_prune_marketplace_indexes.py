@@ -0,0 +1,76 @@
+"""prune redundant indexes on quotations and requests
+
+Revision ID: e8f2a4b6c0d3
+Revises: d7e1f3a5b9c2
+Create Date: 2026-10-18
+
+Every n8n quote upsert and portal bid maintained ~12 b-trees on quotations, most of
+which no query reads. Dropped:
+- ix_*_id: duplicates of the primary key index
+- quotations: single-column indexes on forwarder_email, forwarder_company, total_price,
+  currency, transit_days, carrier, status, received_at (never filtered or sorted on
+  alone); request_id and forwarder_id (now leading columns of composites)
+- requests: user_sovereign_id (indexed twice), cargo_type, incoterms, status,
+  posted_by_forwarder_id, idx_request_f2f (superseded by idx_request_open_f2f_submitted)
+
+Added the composites the read paths use:
+- idx_quote_request_price (request_id, total_price): quotes per request, cheapest first
+- idx_request_sovereign_submitted (user_sovereign_id, submitted_at DESC): "my requests"
+
+Tables were originally created by metadata.create_all, which already builds the two
+composites from the models' __table_args__, so creates use IF NOT EXISTS and drops IF EXISTS.
+Benchmark writes with scripts/bench_quote_writes.py before and after.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e8f2a4b6c0d3'
+down_revision = 'd7e1f3a5b9c2'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) — recreated on downgrade
+_DROPPED = [
+    ('ix_quotations_id', 'quotations', ['id']),
+    ('ix_quotations_request_id', 'quotations', ['request_id']),
+    ('ix_quotations_forwarder_id', 'quotations', ['forwarder_id']),
+    ('ix_quotations_forwarder_email', 'quotations', ['forwarder_email']),
+    ('ix_quotations_forwarder_company', 'quotations', ['forwarder_company']),
+    ('ix_quotations_total_price', 'quotations', ['total_price']),
+    ('ix_quotations_currency', 'quotations', ['currency']),
+    ('ix_quotations_transit_days', 'quotations', ['transit_days']),
+    ('ix_quotations_carrier', 'quotations', ['carrier']),
+    ('ix_quotations_status', 'quotations', ['status']),
+    ('ix_quotations_received_at', 'quotations', ['received_at']),
+    ('ix_requests_id', 'requests', ['id']),
+    ('ix_requests_user_sovereign_id', 'requests', ['user_sovereign_id']),
+    ('idx_request_sovereign_user', 'requests', ['user_sovereign_id']),
+    ('ix_requests_cargo_type', 'requests', ['cargo_type']),
+    ('ix_requests_incoterms', 'requests', ['incoterms']),
+    ('ix_requests_status', 'requests', ['status']),
+    ('ix_requests_posted_by_forwarder_id', 'requests', ['posted_by_forwarder_id']),
+    ('idx_request_f2f', 'requests', ['is_f2f', 'posted_by_forwarder_id']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # Create the replacements first so no read path is ever left without an index
+        op.create_index('idx_quote_request_price', 'quotations', ['request_id', 'total_price'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('idx_request_sovereign_submitted', 'requests',
+                        ['user_sovereign_id', sa.text('submitted_at DESC')],
+                        postgresql_concurrently=True, if_not_exists=True)
+        for name, _table, _cols in _DROPPED:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, cols in reversed(_DROPPED):
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({", ".join(cols)})')
+        op.drop_index('idx_request_sovereign_submitted', table_name='requests',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_quote_request_price', table_name='quotations',
+                      postgresql_concurrently=True, if_exists=True)
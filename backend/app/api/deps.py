@@ -1,12 +1,12 @@
 import hmac
 import os
-from typing import Generator, Optional
+from typing import Optional
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import AsyncSessionLocal as SessionLocal
+from app.db.session import get_db  # re-exported: deps.get_db IS session.get_db (one session per request)
 from app.core import security
 from app.core.config import settings
 from app.models.user import User
@@ -16,34 +16,70 @@ reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
-async def get_db() -> Generator:
-    try:
-        db = SessionLocal()
-        yield db
-    finally:
-        await db.close()
-
 from app.core import redis as _redis_mod
+from app.services.principal_cache import principal_cache, token_key, snapshot_user, materialize_user
 
 async def get_current_user(
     db: AsyncSession = Depends(get_db), token: str = Depends(reusable_oauth2)
 ) -> User:
-    try:
-        if _redis_mod.redis_client:
-            is_blacklisted = await _redis_mod.redis_client.get(f"blacklist:{token}")
-            if is_blacklisted:
-                raise HTTPException(status_code=401, detail="Token has been revoked/logged out")
-
-        payload = security.decode_token(token)
-        token_data = payload.get("sub")
-    except (JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    user = await crud.user.get_by_email(db, email=token_data)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    """
+    Resolve the bearer token to a User.
+    Cache hits (see services/principal_cache) skip the JWT decode and the users query;
+    the blacklist / password-change / cache-epoch checks always run, in ONE Redis round trip.
+    A cache hit returns a detached User — treat current_user as read-only.
+    """
+    key = token_key(token)
+    entry = principal_cache.get_local(key)
+    if entry is not None:
+        payload = {"sub": entry["user"]["email"], "user_id": entry["user_id"], "iat": entry["iat"], "exp": entry["exp"]}
+    else:
+        try:
+            payload = security.decode_token(token)
+        except (JWTError, ValidationError):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+    token_data = payload.get("sub")
+    token_user_id = str(payload["user_id"]) if payload.get("user_id") else None
+
+    pw_changed_at = None
+    epoch = "0"
+    shared_raw = None
+    if _redis_mod.redis_client:
+        pipe = _redis_mod.redis_client.pipeline(transaction=False)
+        pipe.get(f"blacklist:{token}")
+        if token_user_id:
+            pipe.get(f"pw_changed_at:{token_user_id}")
+            pipe.get(f"principal_epoch:{token_user_id}")
+        if entry is None:
+            pipe.get(f"principal:{key}")
+        results = await pipe.execute()
+        if results[0]:
+            raise HTTPException(status_code=401, detail="Token has been revoked/logged out")
+        if token_user_id:
+            pw_changed_at, epoch = results[1], results[2] or "0"
+        if entry is None:
+            shared_raw = results[-1]
+
+    if entry is not None and entry["epoch"] != epoch:
+        entry = None
+    if entry is None and token_user_id:
+        shared = principal_cache.parse_shared(shared_raw)
+        if shared and shared.get("epoch") == epoch and shared.get("user_id") == token_user_id:
+            entry = principal_cache.put(key, token_user_id, shared["user"], shared["iat"], shared["exp"], epoch)
+
+    cache_miss = entry is None
+    if entry is not None:
+        user = materialize_user(entry["user"])
+    else:
+        user = await crud.user.get_by_email(db, email=token_data)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        if _redis_mod.redis_client and token_user_id != str(user.id):
+            # Legacy token without a matching user_id claim — separate lookup, never cached
+            pw_changed_at = await _redis_mod.redis_client.get(f"pw_changed_at:{user.id}")
+    user_snapshot = snapshot_user(user) if cache_miss and token_user_id == str(user.id) else None
 
     # Apply effective role: admin email always gets role="admin" regardless of DB value
     admin_email = os.getenv("ADMIN_EMAIL", "")
@@ -51,15 +87,17 @@ async def get_current_user(
         user.role = "admin"
 
     # Reject tokens issued before the last password reset (kills all existing sessions)
-    if _redis_mod.redis_client:
-        pw_changed_at = await _redis_mod.redis_client.get(f"pw_changed_at:{user.id}")
-        if pw_changed_at:
-            token_iat = payload.get("iat", 0)
-            if token_iat < int(pw_changed_at):
-                raise HTTPException(
-                    status_code=401,
-                    detail="Session expired after a password change. Please log in again."
-                )
+    if pw_changed_at:
+        token_iat = payload.get("iat", 0)
+        if token_iat < int(pw_changed_at):
+            raise HTTPException(
+                status_code=401,
+                detail="Session expired after a password change. Please log in again."
+            )
+
+    if user_snapshot is not None and payload.get("exp"):
+        new_entry = principal_cache.put(key, token_user_id, user_snapshot, payload.get("iat", 0), int(payload["exp"]), epoch)
+        await principal_cache.store_shared(key, new_entry)
 
     return user
 
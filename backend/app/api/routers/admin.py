@@ -10,6 +10,7 @@ from app.models.booking import Booking
 from app.models.conversation import Conversation
 from app.api.deps import get_admin_user
 from app.services.webhook import webhook_service
+from app.services.principal_cache import principal_cache
 from datetime import datetime, timezone
 import base64
 
@@ -138,6 +139,7 @@ async def approve_forwarder(
     user.role = "forwarder"
 
     await db.commit()
+    await principal_cache.invalidate_user(user.id)
 
     background_tasks.add_task(webhook_service.trigger_forwarder_decision_webhook, {
         "decision": "APPROVED",
@@ -251,6 +253,7 @@ async def unlock_user(
     user.is_locked = False
     user.failed_login_attempts = 0
     await db.commit()
+    await principal_cache.invalidate_user(user.id)
     return {"success": True, "message": f"{user.email} has been unlocked."}
 
 
@@ -295,6 +298,8 @@ async def demote_forwarder(
             user.sovereign_id = user.sovereign_id[4:]
 
     await db.commit()
+    if user:
+        await principal_cache.invalidate_user(user.id)
     return {"success": True, "message": f"{forwarder.company_name} demoted to shipper."}
 
 
@@ -320,6 +325,7 @@ async def toggle_lock_user(
         user.failed_login_attempts = 0
 
     await db.commit()
+    await principal_cache.invalidate_user(user.id)
     action = "blocked" if user.is_locked else "unblocked"
     return {"success": True, "message": f"{user.email} {action}.", "is_locked": user.is_locked}
 
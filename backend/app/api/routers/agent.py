@@ -2,24 +2,27 @@
 CargoLink AI Agent — Streaming + LlamaIndex RAG + OpenAI
 Bilingual (Arabic/English), streams responses token by token.
 """
+import asyncio
+import logging
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from pydantic import BaseModel
-from typing import Any
-from app.db.session import get_db
+from typing import Any, Optional
+from app.db.session import AsyncSessionLocal, begin_pool_stats
 from app.api.deps import get_current_user
 from app.models.user import User
 from app.models.marketplace import MarketplaceRequest, MarketplaceBid
 from app.models.conversation import Conversation
 from app.models.booking import Booking
 from app.core.config import settings
-from openai import AsyncOpenAI
+from app.services.llm_gateway import llm_gateway
+from app.services.tool_results import fit_to_budget, tool_cache, tool_cache_key
 import json
 
 router = APIRouter()
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
 # Progress messages shown to user while tools run
 PROGRESS = {
@@ -33,14 +36,24 @@ PROGRESS = {
     "compare_and_recommend_quotes": {"en": "Comparing and analyzing quotes...", "ar": "جارٍ مقارنة عروض الأسعار..."},
     "get_all_my_data":           {"en": "Loading your full account overview...", "ar": "جارٍ تحميل نظرة عامة على حسابك..."},
 }
+ANSWERING = {"en": "Preparing your answer...", "ar": "جارٍ إعداد الإجابة..."}
+
+# List tools answer with counts by status plus one page of the most recent rows
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 25
+_PAGE_PARAMS = {
+    "status": {"type": "string", "description": "Only rows with this status, e.g. OPEN"},
+    "limit": {"type": "integer", "description": f"Rows to return (default {PAGE_SIZE}, max {MAX_PAGE_SIZE})"},
+    "offset": {"type": "integer", "description": "Skip this many of the most recent rows (next page)"},
+}
 
 TOOLS = [
     {
         "type": "function",
         "function": {
             "name": "get_my_requests",
-            "description": "Get all freight requests submitted by the user with status and quote counts",
-            "parameters": {"type": "object", "properties": {}, "required": []},
+            "description": "Get the user's freight requests: counts by status plus the most recent requests with status and quote counts",
+            "parameters": {"type": "object", "properties": _PAGE_PARAMS, "required": []},
         },
     },
     {
@@ -59,16 +72,16 @@ TOOLS = [
         "type": "function",
         "function": {
             "name": "get_my_conversations",
-            "description": "Get all active negotiation conversations",
-            "parameters": {"type": "object", "properties": {}, "required": []},
+            "description": "Get the user's negotiation conversations: counts by status plus the most recently active ones",
+            "parameters": {"type": "object", "properties": _PAGE_PARAMS, "required": []},
         },
     },
     {
         "type": "function",
         "function": {
             "name": "get_my_bookings",
-            "description": "Get all confirmed bookings for the user",
-            "parameters": {"type": "object", "properties": {}, "required": []},
+            "description": "Get the user's bookings: counts by status plus the most recent bookings",
+            "parameters": {"type": "object", "properties": _PAGE_PARAMS, "required": []},
         },
     },
     {
@@ -119,25 +132,44 @@ TOOLS = [
         "type": "function",
         "function": {
             "name": "get_all_my_data",
-            "description": "Get complete overview of everything — requests, quotes, conversations, bookings",
+            "description": "Get an overview of everything — stats, recent requests, conversations and bookings",
             "parameters": {"type": "object", "properties": {}, "required": []},
         },
     },
 ]
 
 
-async def run_tool(name: str, args: dict, user: User, db: AsyncSession) -> Any:
+async def _paged(db: AsyncSession, model, owner, order, args: dict, key: str, row) -> dict:
+    """Counts by status over the owner's rows plus one page of the most recent (optionally one status)."""
+    counts = await db.execute(select(model.status, func.count()).where(owner).group_by(model.status))
+    by_status = {status or "UNKNOWN": n for status, n in counts.all()}
+    limit = min(max(int(args.get("limit") or PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    offset = max(int(args.get("offset") or 0), 0)
+    status = (args.get("status") or "").upper()
+
+    query = select(model).where(owner)
+    if status:
+        query = query.where(model.status == status)
+    res = await db.execute(query.order_by(order).limit(limit).offset(offset))
+    rows = res.scalars().all()
+    matching = by_status.get(status, 0) if status else sum(by_status.values())
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "offset": offset,
+        "returned": len(rows),
+        "has_more": offset + len(rows) < matching,
+        key: [row(r) for r in rows],
+    }
+
+
+async def run_tool(name: str, args: dict, user: User, db: Optional[AsyncSession]) -> Any:
     sid = user.sovereign_id
 
     if name == "get_my_requests":
-        res = await db.execute(
-            select(MarketplaceRequest)
-            .where(MarketplaceRequest.user_sovereign_id == sid)
-            .order_by(MarketplaceRequest.submitted_at.desc())
-        )
-        reqs = res.scalars().all()
-        return [
-            {
+        return await _paged(
+            db, MarketplaceRequest, MarketplaceRequest.user_sovereign_id == sid,
+            MarketplaceRequest.submitted_at.desc(), args, "requests", lambda r: {
                 "request_id": r.request_id,
                 "origin": r.origin,
                 "destination": r.destination,
@@ -147,9 +179,8 @@ async def run_tool(name: str, args: dict, user: User, db: AsyncSession) -> Any:
                 "status": r.status,
                 "quote_count": r.quotation_count or 0,
                 "submitted_at": str(r.submitted_at),
-            }
-            for r in reqs
-        ]
+            },
+        )
 
     if name == "get_quotes_for_request":
         req_check = await db.execute(
@@ -178,14 +209,9 @@ async def run_tool(name: str, args: dict, user: User, db: AsyncSession) -> Any:
         ]
 
     if name == "get_my_conversations":
-        res = await db.execute(
-            select(Conversation)
-            .where(Conversation.shipper_id == sid)
-            .order_by(Conversation.updated_at.desc())
-        )
-        convs = res.scalars().all()
-        return [
-            {
+        return await _paged(
+            db, Conversation, Conversation.shipper_id == sid,
+            Conversation.updated_at.desc(), args, "conversations", lambda c: {
                 "public_id": c.public_id,
                 "forwarder_company": c.forwarder_company,
                 "status": c.status,
@@ -193,19 +219,13 @@ async def run_tool(name: str, args: dict, user: User, db: AsyncSession) -> Any:
                 "agreed_price": float(c.agreed_price) if c.agreed_price else None,
                 "offer_side": c.offer_side,
                 "currency": c.currency,
-            }
-            for c in convs
-        ]
+            },
+        )
 
     if name == "get_my_bookings":
-        res = await db.execute(
-            select(Booking)
-            .where(Booking.user_sovereign_id == sid)
-            .order_by(Booking.created_at.desc())
-        )
-        bookings = res.scalars().all()
-        return [
-            {
+        return await _paged(
+            db, Booking, Booking.user_sovereign_id == sid,
+            Booking.created_at.desc(), args, "bookings", lambda b: {
                 "reference": b.reference,
                 "carrier_name": b.carrier_name,
                 "origin": b.origin_locode,
@@ -215,9 +235,8 @@ async def run_tool(name: str, args: dict, user: User, db: AsyncSession) -> Any:
                 "transit_days": b.transit_days,
                 "status": b.status,
                 "confirmed_at": str(b.confirmed_at),
-            }
-            for b in bookings
-        ]
+            },
+        )
 
     if name == "get_dashboard_stats":
         req_count = await db.scalar(select(func.count()).where(MarketplaceRequest.user_sovereign_id == sid))
@@ -266,9 +285,10 @@ async def run_tool(name: str, args: dict, user: User, db: AsyncSession) -> Any:
     if name == "search_freight_knowledge":
         try:
             from app.services.rag_service import query_knowledge
-            return query_knowledge(args["question"])
+            return await query_knowledge(args["question"])
         except Exception as e:
-            return f"Knowledge search error: {e}"
+            # A dict, so tool_cache doesn't keep an index or LLM outage for AGENT_TOOL_CACHE_TTL
+            return {"error": f"Knowledge base unavailable: {e}"}
 
     if name == "compare_and_recommend_quotes":
         res = await db.execute(
@@ -298,15 +318,72 @@ async def run_tool(name: str, args: dict, user: User, db: AsyncSession) -> Any:
         }
 
     if name == "get_all_my_data":
-        requests = await run_tool("get_my_requests", {}, user, db)
-        stats = await run_tool("get_dashboard_stats", {}, user, db)
-        bookings = await run_tool("get_my_bookings", {}, user, db)
-        conversations = await run_tool("get_my_conversations", {}, user, db)
+        # Independent sub-tools, each in its own session — takes as long as the slowest one
+        requests, stats, bookings, conversations = await asyncio.gather(*(
+            execute_tool(sub, {}, user)
+            for sub in ("get_my_requests", "get_dashboard_stats", "get_my_bookings", "get_my_conversations")
+        ))
         return {"stats": stats, "requests": requests, "bookings": bookings, "conversations": conversations}
 
     return {"error": f"Unknown tool: {name}"}
 
 
+# ═══════════════════════════════════════════════════════
+# TOOL RUNNER
+# Tool calls from one model turn run concurrently. Each call checks out its own short-lived
+# session (an AsyncSession can't run two queries at once), at most AGENT_TOOL_CONCURRENCY
+# per worker so agent turns can't drain the DB pool, and each has a deadline. Results are
+# cached per user for AGENT_TOOL_CACHE_TTL (app/services/tool_results.py), so a follow-up
+# question doesn't run the same queries again.
+# ═══════════════════════════════════════════════════════
+_tool_slots = asyncio.Semaphore(settings.AGENT_TOOL_CONCURRENCY)
+TOOL_TIMEOUTS = {"search_freight_knowledge": 20.0, "get_all_my_data": 20.0}
+_NO_SESSION = {"search_freight_knowledge", "get_all_my_data"}
+_COORDINATORS = {"get_all_my_data"}   # only fans out to other tools — holding a slot could deadlock
+
+
+async def _run_in_session(name: str, args: dict, user: User) -> Any:
+    if name in _NO_SESSION:
+        return await run_tool(name, args, user, None)
+    async with AsyncSessionLocal() as db:
+        return await run_tool(name, args, user, db)
+
+
+async def _run_limited(name: str, args: dict, user: User, timeout: float) -> Any:
+    async with _tool_slots:
+        return await asyncio.wait_for(_run_in_session(name, args, user), timeout)
+
+
+async def execute_tool(name: str, args: dict, user: User) -> Any:
+    """
+    Run one tool call (or serve it from the per-user cache) with its own session, a
+    concurrency slot and a timeout. Failures come back as {"error": ...} for the model to
+    read, so one slow or broken tool never sinks the turn.
+    """
+    # Tool sessions are deliberate extra checkouts — don't count them against the request
+    # (this resets the counter in this task's context only)
+    begin_pool_stats()
+    timeout = TOOL_TIMEOUTS.get(name, settings.AGENT_TOOL_TIMEOUT)
+    try:
+        if name in _COORDINATORS:
+            # Its sub-tools are cached individually
+            return await asyncio.wait_for(_run_in_session(name, args, user), timeout)
+        return await tool_cache.get_or_load(
+            tool_cache_key(user.sovereign_id, name, args),
+            lambda: _run_limited(name, args, user, timeout),
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"[AGENT] Tool {name} timed out after {timeout:.0f}s")
+        return {"error": f"{name} timed out — try again or ask something narrower"}
+    except Exception as e:
+        logger.error(f"[AGENT] Tool {name} failed: {e}")
+        return {"error": f"{name} failed"}
+
+
+async def _invalid_arguments(name: str) -> dict:
+    return {"error": f"Could not parse arguments for {name}"}
+
+
 def _is_arabic(text: str) -> bool:
     arabic_chars = sum(1 for c in text if '؀' <= c <= 'ۿ')
     return arabic_chars / max(len(text), 1) > 0.2
@@ -339,6 +416,40 @@ RULES:
 - For quotes: compare **price** AND **transit days**, give a clear recommendation"""
 
 
+async def _stream_turn(messages: list, usage: list):
+    """
+    One streamed completion with tools enabled. Yields ("token", text) for content deltas as
+    they arrive, then ("tool_calls", [...]) when the stream ends ([] for a plain answer).
+    Tool calls arrive as deltas keyed by index — id and name first, arguments in fragments.
+    """
+    usage[2] += 1
+    calls: dict = {}
+    async for chunk in llm_gateway.stream(
+        "agent",
+        model="gpt-4o-mini",
+        messages=messages,
+        tools=TOOLS,
+        tool_choice="auto",
+    ):
+        if chunk.usage:
+            usage[0] += chunk.usage.prompt_tokens
+            usage[1] += chunk.usage.completion_tokens
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            yield "token", delta.content
+        for part in delta.tool_calls or ():
+            call = calls.setdefault(part.index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+            if part.id:
+                call["id"] = part.id
+            if part.function and part.function.name:
+                call["function"]["name"] += part.function.name
+            if part.function and part.function.arguments:
+                call["function"]["arguments"] += part.function.arguments
+    yield "tool_calls", [calls[i] for i in sorted(calls)]
+
+
 class AgentMessage(BaseModel):
     message: str
     history: list = []
@@ -348,7 +459,6 @@ class AgentMessage(BaseModel):
 async def agent_chat_stream(
     body: AgentMessage,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
 ):
     """Streaming endpoint — sends SSE events: progress, token, done, error."""
     lang = "ar" if _is_arabic(body.message) else "en"
@@ -360,50 +470,69 @@ async def agent_chat_stream(
     messages.append({"role": "user", "content": body.message})
 
     async def generate():
+        usage = [0, 0, 0]   # prompt tokens, completion tokens, model calls
         try:
             for _ in range(6):
-                response = await client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=messages,
-                    tools=TOOLS,
-                    tool_choice="auto",
-                )
-                msg = response.choices[0].message
-
-                if msg.tool_calls:
-                    messages.append(msg)
-                    for tc in msg.tool_calls:
-                        # Send progress event so UI shows what's happening
-                        prog = PROGRESS.get(tc.function.name, {}).get(lang, "Working...")
-                        yield f"data: {json.dumps({'progress': prog})}\n\n"
-
-                        args = json.loads(tc.function.arguments) if tc.function.arguments else {}
-                        result = await run_tool(tc.function.name, args, current_user, db)
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": tc.id,
-                            "content": json.dumps(result, default=str),
-                        })
-                else:
-                    # No more tool calls — stream the final answer token by token
-                    stream = await client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=messages,
-                        stream=True,
-                    )
-                    async for chunk in stream:
-                        token = chunk.choices[0].delta.content or ""
-                        if token:
-                            yield f"data: {json.dumps({'token': token})}\n\n"
+                # One streamed call per turn: answer tokens go out as they arrive, tool calls
+                # are assembled from their deltas and run once the stream ends
+                content, tool_calls = [], []
+                async for kind, value in _stream_turn(messages, usage):
+                    if kind == "token":
+                        content.append(value)
+                        yield f"data: {json.dumps({'token': value})}\n\n"
+                    else:
+                        tool_calls = value
+
+                if not tool_calls:
                     yield "data: [DONE]\n\n"
                     return
 
+                messages.append({"role": "assistant", "content": "".join(content) or None, "tool_calls": tool_calls})
+                # Send progress event so UI shows what's happening
+                prog = PROGRESS.get(tool_calls[0]["function"]["name"], {}).get(lang, "Working...")
+                yield f"data: {json.dumps({'progress': prog})}\n\n"
+
+                # All calls of this turn run at once; report each as it finishes
+                running = {}
+                for tc in tool_calls:
+                    name = tc["function"]["name"]
+                    try:
+                        args = json.loads(tc["function"]["arguments"]) if tc["function"]["arguments"] else {}
+                    except ValueError:
+                        args = None
+                    call = execute_tool(name, args, current_user) if args is not None else _invalid_arguments(name)
+                    running[asyncio.ensure_future(call)] = tc
+                results = {}
+                pending = set(running)
+                try:
+                    while pending:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            results[running[task]["id"]] = task.result()
+                        still = next((running[t]["function"]["name"] for t in pending), None)
+                        prog = PROGRESS.get(still, {}).get(lang, "Working...") if still else ANSWERING[lang]
+                        yield f"data: {json.dumps({'progress': prog, 'tools_done': len(results), 'tools_total': len(running)})}\n\n"
+                finally:
+                    for task in pending:   # client went away mid-turn
+                        task.cancel()
+
+                # Keep this turn's tool output within AGENT_TOOL_TOKEN_BUDGET tokens
+                contents = fit_to_budget(results)
+                for tc in tool_calls:
+                    messages.append({
+                        "role": "tool",
+                        "tool_call_id": tc["id"],
+                        "content": contents[tc["id"]],
+                    })
+
             yield "data: [DONE]\n\n"
 
         except Exception as e:
             err = "حدث خطأ. حاول مرة أخرى." if lang == "ar" else "Something went wrong. Please try again."
             yield f"data: {json.dumps({'error': err})}\n\n"
             yield "data: [DONE]\n\n"
+        finally:
+            logger.info(f"[AGENT] {usage[2]} model calls, {usage[0]} prompt + {usage[1]} completion tokens")
 
     return StreamingResponse(
         generate(),
@@ -14,6 +14,7 @@ from app.core.config import settings
 from typing import Optional
 from pydantic import BaseModel, EmailStr
 from app.services.activity import activity_service
+from app.services.principal_cache import principal_cache
 import logging
 import httpx
 import random
@@ -82,6 +83,7 @@ async def social_sync(
     user = await crud.user.get_by_email(db, email=email)
     
     needs_commit = False
+    profile_changed = False
     if not user:
         user_count_res = await db.execute(select(func.count(User.id)))
         user_count = user_count_res.scalar() or 0
@@ -133,12 +135,14 @@ async def social_sync(
 
             user.sovereign_id = new_sovereign_id
             needs_commit = True
+            profile_changed = True
             logger.info(f"[SELF-HEALING] Assigned Account ID {new_sovereign_id} to {email}")
 
         # Update avatar if missing or changed
         if picture and (not user.avatar_url or user.avatar_url != picture):
             user.avatar_url = picture
             needs_commit = True
+            profile_changed = True
     
     # AUDIT PILLAR: Log Social Sync (Optimized with single commit)
     client_ip = raw_request.client.host if raw_request.client else None
@@ -157,6 +161,8 @@ async def social_sync(
         await db.commit()
         if user.id: # Refresh only if we have an ID
             await db.refresh(user)
+    if profile_changed:
+        await principal_cache.invalidate_user(user.id)
     
     if not user.is_active:
         raise HTTPException(status_code=401, detail="Account Inactive")
@@ -590,7 +596,10 @@ async def change_password(
 ):
     """Change user password."""
     user_id = current_user.id
-    user = current_user
+    # current_user may be a cached principal, which never carries the password hash
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     loop = asyncio.get_event_loop()
     pw_ok = await loop.run_in_executor(None, security.verify_password, data.current_password, user.password_hash or "")
     if not user.password_hash or not pw_ok:
@@ -14,6 +14,7 @@ from typing import Optional
 from pydantic import BaseModel, Field
 from app.services.activity import activity_service
 from app.services.webhook import webhook_service
+from app.services.principal_cache import principal_cache
 from app.core.config import settings
 import logging
 
@@ -58,6 +59,7 @@ async def save_forwarder(f_in: ForwarderSave, db: AsyncSession = Depends(get_db)
             if not user.sovereign_id.startswith("REG-"):
                 user.sovereign_id = f"REG-{user.sovereign_id}"
             await db.commit()
+            await principal_cache.invalidate_user(user.id)
             
         return {"success": True, "message": "Partner already exists. Role synchronized."}
     
@@ -111,6 +113,8 @@ async def save_forwarder(f_in: ForwarderSave, db: AsyncSession = Depends(get_db)
             user.sovereign_id = f"REG-{user.sovereign_id}"
     
     await db.commit()
+    if user:
+        await principal_cache.invalidate_user(user.id)
     
     return {
         "success": True,
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import date
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+import asyncio
+import re
 import uuid
 import json
 import logging
 
 from app.core.config import settings
 from app.core import security as sec_utils
+from app.core import redis as redis_mod
+from app.core.cache import TieredCache, normalize
 from app.services.activity import activity_service
+from app.services.hs_index import hs_index
+from app.services.lanes import quote_lane
+from app.services.llm_gateway import llm_gateway
+from app.services.port_index import port_index
 
 _optional_oauth2 = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
@@ -27,63 +37,7 @@ class QuoteRequest(BaseModel):
 
 
 # ── Trade Lane Intelligence ──────────────────────────────────────────────────
-
-ASIA = ["CN", "SHA", "CNSHA", "CNNBO", "CNNGB", "CNTXG", "CNQIN",
-        "SG", "SGSIN", "JP", "JPOSA", "JPTYO", "KR", "KRPUS",
-        "TW", "TWKEL", "HK", "HKHKG", "VN", "VNSGN", "TH", "THBKK",
-        "MY", "MYPKG", "ID", "IDJKT", "PH", "PHMNL"]
-
-US_WEST = ["USLAX", "USLGB", "USSEA", "USPOR", "USOAK"]
-US_EAST = ["USNYC", "USSAV", "USHOU", "USBLT", "USORF", "USBOS", "USCHA"]
-EUROPE  = ["NLRTM", "DEHAM", "BEANR", "GBFXT", "ESBCN", "FRMRS",
-           "ITGOA", "PLGDY", "SEGOT", "DKAAR", "NL", "DE", "GB", "FR"]
-MIDEAST = ["AEDXB", "AEJEA", "SADAM", "SAJED", "OMKCT", "QADOH",
-           "KWKWI", "BHMNA", "AE", "SA", "OM", "QA", "KW"]
-
-def _match(code: str, regions: list) -> bool:
-    c = code.upper()
-    return any(c.startswith(r.upper()) or c == r.upper() for r in regions)
-
-
-def _lane(origin: str, dest: str) -> dict:
-    """Returns base pricing and transit config for a trade lane."""
-    o, d = origin.upper(), dest.upper()
-
-    if _match(o, ASIA):
-        if _match(d, US_WEST):
-            return {"base": 2900, "transit": (34, 22, 16), "lane": "Trans-Pacific Westbound",
-                    "red_sea": False, "note": "Stable rates; Lunar New Year volumes impacting February schedules"}
-        if _match(d, US_EAST):
-            return {"base": 4600, "transit": (42, 30, 24), "lane": "Trans-Pacific East Coast (All-Water)",
-                    "red_sea": False, "note": "All-water route via Panama; strong demand from US importers"}
-        if _match(d, EUROPE):
-            return {"base": 4100, "transit": (40, 28, 22), "lane": "Asia-Europe",
-                    "red_sea": True, "note": "Red Sea diversion via Cape of Good Hope adding 10-14 days and $600-800 surcharge"}
-        if _match(d, MIDEAST):
-            return {"base": 2200, "transit": (18, 12, 9), "lane": "Asia-Middle East",
-                    "red_sea": True, "note": "Red Sea situation: some carriers re-routing via Cape; confirm routing with carrier"}
-        return {"base": 3200, "transit": (35, 25, 18), "lane": "Asia-International",
-                "red_sea": False, "note": "Market rate for international routing"}
-
-    if _match(o, EUROPE):
-        if _match(d, US_WEST) or _match(d, US_EAST):
-            return {"base": 2600, "transit": (18, 14, 10), "lane": "Europe-North America",
-                    "red_sea": False, "note": "Transatlantic rates competitive; Hamburg and Rotterdam main hubs"}
-        return {"base": 2800, "transit": (30, 22, 16), "lane": "Europe-International",
-                "red_sea": False, "note": "Stable transatlantic market conditions"}
-
-    if _match(o, US_WEST) or _match(o, US_EAST):
-        if _match(d, ASIA):
-            return {"base": 1200, "transit": (25, 18, 14), "lane": "Trans-Pacific Eastbound",
-                    "red_sea": False, "note": "Backhaul rates — US exports at discount vs import lane"}
-        if _match(d, EUROPE):
-            return {"base": 2400, "transit": (16, 12, 9), "lane": "North America-Europe",
-                    "red_sea": False, "note": "Competitive transatlantic corridor; multiple direct services available"}
-
-    # Default
-    return {"base": 3000, "transit": (35, 25, 18), "lane": "International",
-            "red_sea": False, "note": "International routing — confirm exact schedule with carrier"}
-
+# Regions and lane pricing live in app/services/lanes.py (compiled lookup tables).
 
 CONTAINER_MULT = {
     "20FT": 0.62, "20": 0.62,
@@ -176,12 +130,9 @@ WISDOM RULE: Each wisdom sentence must name ONE specific current event, tariff r
 
 async def _ai_quotes(origin: str, destination: str, container: str,
                      commodity: str, ready_date: str, goods_value: Optional[float]) -> Optional[List[dict]]:
-    if not settings.OPENAI_API_KEY:
+    if not llm_gateway.configured:
         return None
     try:
-        from openai import AsyncOpenAI
-        client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
         value_str = f"${goods_value:,.0f} USD" if goods_value else "not disclosed"
         s_origin    = origin.replace("\n", " ").replace("\"", "'")[:50]
         s_dest      = destination.replace("\n", " ").replace("\"", "'")[:50]
@@ -207,7 +158,8 @@ Return JSON with key "quotes" containing exactly 3 objects, each with:
 - wisdom: MANDATORY — cite a SPECIFIC named tariff rate, index value, surcharge name+amount, or named geopolitical event affecting this route's price TODAY. Examples: "US Section 301 tariffs of 145% on Chinese goods are driving front-loading surges on this lane, keeping rates 30% above pre-tariff-war levels." or "Red Sea EBS of $720 applies as Houthi attacks force Cape of Good Hope routing, adding 14 days and $800 to this shipment." NEVER write generic sentences.
 - breakdown: {{ base_rate, fuel_surcharge, port_fees, surcharges, total }} — all integers, must sum to price"""
 
-        resp = await client.chat.completions.create(
+        resp = await llm_gateway.chat(
+            "quotes",
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": _SYSTEM_PROMPT},
@@ -241,9 +193,29 @@ Return JSON with key "quotes" containing exactly 3 objects, each with:
 
 # ── Deterministic Fallback ────────────────────────────────────────────────────
 
+# surcharge class: (share of the lane base rate, note)
+COMMODITY_SURCHARGES = {
+    "haz": (0.35, "hazardous goods surcharge applied"),
+    "high_value": (0.12, "high-value cargo premium applied"),
+    "reefer": (0.50, "reefer surcharge applied"),
+}
+
+
+def _surcharge_class(commodity: str, goods_value: Optional[float]) -> Optional[str]:
+    """Commodity surcharge class, first match wins: hazardous > high value > reefer."""
+    c_lower = commodity.lower()
+    if "hazardous" in c_lower or "dangerous" in c_lower:
+        return "haz"
+    if "high value" in c_lower or (goods_value and goods_value > 50000):
+        return "high_value"
+    if "reefer" in c_lower or "refrigerated" in c_lower or "frozen" in c_lower:
+        return "reefer"
+    return None
+
+
 def _deterministic_quotes(origin: str, destination: str, container: str,
                            commodity: str, goods_value: Optional[float]) -> List[dict]:
-    lane_data = _lane(origin, destination)
+    lane_data = quote_lane(origin, destination)
     base = lane_data["base"]
     t_eco, t_dir, t_exp = lane_data["transit"]
     lane = lane_data["lane"]
@@ -254,19 +226,8 @@ def _deterministic_quotes(origin: str, destination: str, container: str,
     cont_mult = CONTAINER_MULT.get(cont_key, CONTAINER_MULT.get(container.upper()[:3], 1.0))
 
     # Commodity surcharges
-    c_lower = commodity.lower()
-    if "hazardous" in c_lower or "dangerous" in c_lower:
-        commodity_fee = int(base * 0.35)
-        commodity_note = "hazardous goods surcharge applied"
-    elif "high value" in c_lower or (goods_value and goods_value > 50000):
-        commodity_fee = int(base * 0.12)
-        commodity_note = "high-value cargo premium applied"
-    elif "reefer" in c_lower or "refrigerated" in c_lower or "frozen" in c_lower:
-        commodity_fee = int(base * 0.50)
-        commodity_note = "reefer surcharge applied"
-    else:
-        commodity_fee = 0
-        commodity_note = ""
+    commodity_rate, commodity_note = COMMODITY_SURCHARGES.get(_surcharge_class(commodity, goods_value), (0, ""))
+    commodity_fee = int(base * commodity_rate)
 
     red_sea_fee = 720 if red_sea else 0
 
@@ -314,31 +275,95 @@ def _deterministic_quotes(origin: str, destination: str, container: str,
     ]
 
 
-# ── Endpoint ──────────────────────────────────────────────────────────────────
+# ── Quote Cache ───────────────────────────────────────────────────────────────
+# Identical searches (same lane, equipment, commodity class, value band, ready week) within
+# QUOTE_CACHE_TTL reuse one AI answer; a burst of them shares one LLM call. Deterministic
+# fallback answers are kept briefly so the AI is retried soon after an outage.
+
+_FALLBACK_CACHE_TTL = 60
+_quote_cache = TieredCache(
+    "quotes", fresh_ttl=settings.QUOTE_CACHE_TTL, max_entries=1000,
+    ttl_for=lambda v: settings.QUOTE_CACHE_TTL if v["source"] == "ai" else _FALLBACK_CACHE_TTL,
+)
+_LOCODE_IN_TEXT = re.compile(r"\b([A-Z]{2}[A-Z0-9]{3})\b")
+
+
+def _locode(place: str) -> str:
+    """'CNSHA', 'cnsha', 'Shanghai, CN (CNSHA)' and 'Shanghai' all → 'CNSHA'; unknown text is normalized."""
+    text = place.strip()
+    if port_index.by_code(text):
+        return text.upper()
+    for code in _LOCODE_IN_TEXT.findall(text.upper()):
+        if port_index.by_code(code):
+            return code
+    top = port_index.search(text, limit=1)
+    if top and top[0]["city"].lower() == text.lower():
+        return top[0]["code"]
+    return normalize(text)
+
+
+def _commodity_bucket(commodity: str, goods_value: Optional[float]) -> str:
+    """Pricing class: the surcharge class _deterministic_quotes applies, else the best HS chapter."""
+    surcharge_class = _surcharge_class(commodity, goods_value)
+    if surcharge_class:
+        return surcharge_class
+    top = hs_index.search(commodity, limit=1)
+    return f"ch{top[0]['heading']['chapter']}" if top else "general"
+
+
+def _value_band(goods_value: Optional[float]) -> str:
+    if not goods_value:
+        return "nd"
+    for limit in (10_000, 50_000, 250_000):
+        if goods_value <= limit:
+            return f"le{limit}"
+    return "gt250000"
+
+
+def _ready_week(ready: str) -> str:
+    try:
+        year, week, _ = date.fromisoformat(ready[:10]).isocalendar()
+        return f"{year}w{week:02d}"
+    except ValueError:
+        return normalize(ready)
 
-@router.post("/")
-async def get_instant_quotes(
-    req: QuoteRequest,
-    raw_request: Request,
-    token: Optional[str] = Depends(_optional_oauth2),
-):
-    """
-    AI-powered instant freight rate engine.
-    Uses GPT-4o-mini for market-calibrated predictions.
-    Falls back to deterministic trade-lane pricing model if AI unavailable.
-    """
-    ready = req.ready_date or date.today().isoformat()
 
+def _quote_cache_key(req: QuoteRequest, ready: str) -> str:
+    return "|".join((
+        _locode(req.origin), _locode(req.destination),
+        req.container.upper().replace(" ", ""), _commodity_bucket(req.commodity, req.goods_value),
+        _value_band(req.goods_value), _ready_week(ready),
+    ))
+
+
+async def _generate_quotes(req: QuoteRequest, ready: str) -> dict:
     # 1. Try AI
     raw = await _ai_quotes(req.origin, req.destination, req.container,
                            req.commodity, ready, req.goods_value)
+    source = "ai"
 
     # 2. Deterministic fallback
     if not raw:
         raw = _deterministic_quotes(req.origin, req.destination, req.container,
                                     req.commodity, req.goods_value)
+        source = "model"
+    return {"raw": raw, "source": source, "generated_at": datetime.now(timezone.utc).isoformat()}
+
 
-    # 3. Normalize + assign stable IDs
+# ── Fast Mode: deterministic now, AI upgrade later ───────────────────────────
+# The lane engine answers in milliseconds; the AI call runs in the background under
+# QUOTE_AI_DEADLINE and lands in the quote cache. Clients get the refined quotes from the
+# SSE variant (/stream) or by polling /upgrade/{token} — tokens live in Redis so any
+# worker can answer the poll.
+
+_UPGRADE_TTL = 300
+_LOCAL_UPGRADES_MAX = 1000
+_local_upgrades: "OrderedDict[str, dict]" = OrderedDict()
+_upgrade_tasks: set = set()
+
+
+def _present(raw: List[dict], req: QuoteRequest) -> List[dict]:
+    """Normalize raw engine/AI quotes for the API and assign stable IDs."""
     quotes = []
     for i, q in enumerate(raw):
         route_key = f"{req.origin}-{req.destination}-{q.get('carrier_name', '')}-{i}"
@@ -355,8 +380,92 @@ async def get_instant_quotes(
             "dest_locode": req.destination,
             "status": "ACTIVE",
         })
+    return quotes
+
+
+async def _ai_answer(req: QuoteRequest, ready: str) -> dict:
+    """AI quotes under the hard deadline. Raises on failure/timeout so nothing is cached."""
+    raw = await asyncio.wait_for(
+        _ai_quotes(req.origin, req.destination, req.container, req.commodity, ready, req.goods_value),
+        settings.QUOTE_AI_DEADLINE,
+    )
+    if not raw:
+        raise RuntimeError("AI quotes unavailable")
+    return {"raw": raw, "source": "ai", "generated_at": datetime.now(timezone.utc).isoformat()}
+
+
+async def _store_upgrade(token: str, state: dict) -> None:
+    _local_upgrades[token] = state
+    while len(_local_upgrades) > _LOCAL_UPGRADES_MAX:
+        _local_upgrades.popitem(last=False)
+    client = redis_mod.redis_client
+    if client is not None:
+        try:
+            await client.setex(f"quote_upgrade:{token}", _UPGRADE_TTL, json.dumps(state))
+        except Exception as e:
+            logger.warning(f"[QUOTES] Upgrade store failed: {e}")
+
+
+async def _read_upgrade(token: str) -> Optional[dict]:
+    client = redis_mod.redis_client
+    if client is not None:
+        try:
+            raw = await client.get(f"quote_upgrade:{token}")
+            if raw:
+                return json.loads(raw)
+        except Exception as e:
+            logger.warning(f"[QUOTES] Upgrade read failed: {e}")
+    return _local_upgrades.get(token)
+
 
-    # 4. Log SEARCH activity if user is authenticated (fire-and-forget)
+async def _run_upgrade(req: QuoteRequest, ready: str, key: str, token: Optional[str]) -> Optional[dict]:
+    """Background AI refinement. Identical concurrent searches share one LLM call via the cache."""
+    try:
+        answer = await _quote_cache.get_or_load(key, lambda: _ai_answer(req, ready))
+    except asyncio.CancelledError:
+        # Shutdown or a cancelled stream: resolve the token so a polling client stops waiting
+        if token:
+            await _store_upgrade(token, {"status": "failed"})
+        raise
+    except Exception as e:
+        logger.warning(f"[QUOTES] AI upgrade failed ({type(e).__name__}): {e}")
+        answer = None
+    if answer is not None and answer["source"] != "ai":
+        answer = None   # a fallback answer was cached meanwhile — nothing better to offer
+    if token:
+        if answer is None:
+            await _store_upgrade(token, {"status": "failed"})
+        else:
+            await _store_upgrade(token, {"status": "ready", "quotes": _present(answer["raw"], req),
+                                         "generated_at": answer["generated_at"]})
+    return answer
+
+
+async def _fast_answer(req: QuoteRequest, ready: str, with_token: bool):
+    """(response, upgrade task or None) — cached answer if any, else the deterministic engine now."""
+    key = _quote_cache_key(req, ready)
+    cached = await _quote_cache.peek(key)
+    if cached is not None:
+        return {"quotes": _present(cached["raw"], req), "source": cached["source"], "cached": True,
+                "generated_at": cached["generated_at"], "upgrade_token": None}, None
+
+    raw = _deterministic_quotes(req.origin, req.destination, req.container, req.commodity, req.goods_value)
+    response = {"quotes": _present(raw, req), "source": "model", "cached": False,
+                "generated_at": datetime.now(timezone.utc).isoformat(), "upgrade_token": None}
+    if not llm_gateway.configured:
+        return response, None
+
+    if with_token:
+        response["upgrade_token"] = uuid.uuid4().hex
+        await _store_upgrade(response["upgrade_token"], {"status": "pending"})
+    task = asyncio.create_task(_run_upgrade(req, ready, key, response["upgrade_token"]))
+    _upgrade_tasks.add(task)
+    task.add_done_callback(_upgrade_tasks.discard)
+    return response, task
+
+
+async def _log_search(req: QuoteRequest, token: Optional[str]) -> None:
+    """Log SEARCH activity if user is authenticated (fire-and-forget)."""
     if token:
         try:
             payload = sec_utils.decode_token(token)
@@ -379,4 +488,78 @@ async def get_instant_quotes(
         except Exception:
             pass  # Never block quotes due to activity logging failure
 
-    return {"quotes": quotes}
+
+# ── Endpoint ──────────────────────────────────────────────────────────────────
+
+@router.post("/")
+async def get_instant_quotes(
+    req: QuoteRequest,
+    raw_request: Request,
+    token: Optional[str] = Depends(_optional_oauth2),
+    mode: str = "full",
+):
+    """
+    AI-powered instant freight rate engine.
+    Uses GPT-4o-mini for market-calibrated predictions.
+    Falls back to deterministic trade-lane pricing model if AI unavailable.
+    Answers are cached per lane / equipment / commodity class / value band / ready week.
+
+    mode=fast: answer immediately from the cache or the deterministic engine; the AI runs in
+    the background and its quotes are fetched with GET /upgrade/{upgrade_token}.
+    """
+    ready = req.ready_date or date.today().isoformat()
+
+    if mode == "fast":
+        response, _ = await _fast_answer(req, ready, with_token=True)
+    else:
+        # AI, else deterministic — through the quote cache
+        answer, hit = await _quote_cache.lookup_or_load(
+            _quote_cache_key(req, ready), lambda: _generate_quotes(req, ready)
+        )
+        response = {"quotes": _present(answer["raw"], req), "cached": hit != "miss",
+                    "generated_at": answer["generated_at"]}
+
+    await _log_search(req, token)
+    return response
+
+
+@router.get("/upgrade/{upgrade_token}")
+async def get_quote_upgrade(upgrade_token: str):
+    """Poll for the AI refinement of a mode=fast answer: pending → ready (with quotes) or failed."""
+    state = await _read_upgrade(upgrade_token)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired upgrade token")
+    return state
+
+
+@router.post("/stream")
+async def stream_instant_quotes(
+    req: QuoteRequest,
+    token: Optional[str] = Depends(_optional_oauth2),
+):
+    """
+    SSE variant of mode=fast: the first event carries the immediate quotes, a second one the
+    AI-refined quotes if they arrive within QUOTE_AI_DEADLINE, then [DONE].
+    """
+    ready = req.ready_date or date.today().isoformat()
+    first, upgrade = await _fast_answer(req, ready, with_token=False)
+    await _log_search(req, token)
+
+    async def generate():
+        yield f"data: {json.dumps({'stage': first['source'], 'cached': first['cached'], 'quotes': first['quotes']})}\n\n"
+        if upgrade is not None:
+            # shield: a client disconnect must not cancel the upgrade — it still fills the cache
+            answer = await asyncio.shield(upgrade)
+            if answer is not None:
+                yield f"data: {json.dumps({'stage': 'ai', 'cached': False, 'quotes': _present(answer['raw'], req)})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "Connection": "keep-alive",
+        },
+    )
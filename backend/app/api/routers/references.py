@@ -1,45 +1,72 @@
-import os
 import logging
 from fastapi import APIRouter
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime
 from urllib.parse import quote
-import httpx
 from app.data.hs_codes import HS_HEADINGS
-from app.data.ports import MAJOR_PORTS
+from app.services.hs_index import hs_index
+from app.services.maersk import maersk_client, MaerskUnavailable
+from app.services.port_index import port_index
+from app.services.reference_cache import normalize, port_cache, commodity_cache, vessel_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
 def _fallback_ports(q: str, country: str = "") -> Dict[str, Any]:
-    """Search the built-in MAJOR_PORTS list — works without any API key."""
-    q_lower = q.lower()
-    country_lower = country.lower()
+    """Search the built-in port index (MAJOR_PORTS + optional UN/LOCODE file) — works without any API key."""
+    return {"results": port_index.search(q, country), "source": "builtin"}
+
+
+async def _live_ports(q: str, country: str) -> List[Dict[str, Any]]:
+    """Maersk locations for `q` — deduplicated 5-char UNLOCODEs, best matches first."""
+    # No locationType filter — Maersk may reject unknown values.
+    # Port-level results are enforced by 5-char UNLOCODE deduplication + cityName display.
+    params = [f"cityName={quote(q)}|contains", "limit=50"]
+    if country:
+        params.append(f"countryCode={quote(country)}")
+
+    response = await maersk_client.get("locations", f"/reference-data/locations?{'&'.join(params)}")
+    if response.status_code != 200:
+        raise MaerskUnavailable(f"Maersk API {response.status_code}: {response.text[:200]}")
+
     results = []
-    for name, city, unlocode, country_name, country_code in MAJOR_PORTS:
-        # Filter by country code if provided
-        if country and country_code.lower() != country_lower:
+    seen: set = set()
+
+    for item in response.json():
+        city_name = item.get("cityName", "").strip()
+        unlocode = item.get("UNLocationCode", "").strip()
+        country_name = item.get("countryName", "")
+        country_code = item.get("countryCode", "")
+        region_code = item.get("UNRegionCode", "")
+
+        if not unlocode or not city_name:
+            continue
+        # Standard UNLOCODEs are exactly 5 chars — longer codes are terminal sub-identifiers
+        if len(unlocode) != 5:
             continue
-        # Filter by query
-        if q_lower and not (
-            q_lower in city.lower() or
-            q_lower in name.lower() or
-            q_lower in unlocode.lower()
-        ):
+
+        # Always use city name — show ports, not specific terminals
+        display = city_name
+
+        if unlocode in seen:
             continue
+        seen.add(unlocode)
+
         results.append({
-            "name": name,
-            "city": city,
+            "name": display,
+            "city": city_name,
             "code": unlocode,
             "country": country_name,
             "country_code": country_code,
-            "region": "",
+            "region": region_code,
             "type": "",
         })
-    # Exact city-start matches first
+
+    # Sort: exact city match first, then alphabetical
+    q_lower = q.lower()
     results.sort(key=lambda r: (0 if r["city"].lower().startswith(q_lower) else 1, r["name"]))
-    return {"results": results[:20], "source": "builtin"}
+    return results[:20]
 
 
 @router.get("/ports/search", response_model=Dict[str, Any])
@@ -47,78 +74,57 @@ async def search_ports(q: str = "", country: str = "", term_type: str = ""):  #
     """
     Maersk Locations API — returns terminals, ports and CFS with UNLOCODE.
     term_type: CY (container yard/terminal), CFS (container freight station), Door (skip — use address)
+    Results (including empty ones) are cached per normalized query + country — see reference_cache.
     """
-    consumer_key = os.getenv('MAERSK_CONSUMER_KEY')
     if not q.strip():
         return _fallback_ports("", country)
-    if not consumer_key:
+    if not maersk_client.configured:
         return _fallback_ports(q.strip(), country)
 
+    q_clean, country_clean = q.strip(), country.strip().upper()
     try:
-        # No locationType filter — Maersk may reject unknown values.
-        # Port-level results are enforced by 5-char UNLOCODE deduplication + cityName display.
-        params = [f"cityName={quote(q.strip())}|contains", "limit=50"]
-        if country:
-            params.append(f"countryCode={quote(country.strip())}")
-
-        url = f"https://api.maersk.com/reference-data/locations?{'&'.join(params)}"
-
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url, headers={"Consumer-Key": consumer_key}, timeout=6.0
-            )
-
-        if response.status_code != 200:
-            logger.error(f"Maersk API {response.status_code}: {response.text[:200]}")
-            return _fallback_ports(q.strip(), country)
-
-        data = response.json()
-        results = []
-        seen: set = set()
-
-        for item in data:
-            city_name = item.get("cityName", "").strip()
-            unlocode = item.get("UNLocationCode", "").strip()
-            country_name = item.get("countryName", "")
-            country_code = item.get("countryCode", "")
-            region_code = item.get("UNRegionCode", "")
-
-            if not unlocode or not city_name:
-                continue
-            # Standard UNLOCODEs are exactly 5 chars — longer codes are terminal sub-identifiers
-            if len(unlocode) != 5:
-                continue
-
-            # Always use city name — show ports, not specific terminals
-            display = city_name
-
-            if unlocode in seen:
-                continue
-            seen.add(unlocode)
-
-            results.append({
-                "name": display,
-                "city": city_name,
-                "code": unlocode,
-                "country": country_name,
-                "country_code": country_code,
-                "region": region_code,
-                "type": "",
-            })
-
-        # Sort: exact city match first, then alphabetical
-        q_lower = q.strip().lower()
-        results.sort(key=lambda r: (0 if r["city"].lower().startswith(q_lower) else 1, r["name"]))
+        results = await port_cache.get_or_load(
+            normalize(q_clean, country_clean), lambda: _live_ports(q_clean, country_clean)
+        )
+    except Exception as e:
+        logger.error(f"Port Search Error: {e}")
+        return _fallback_ports(q_clean, country)
 
-        if results:
-            return {"results": results[:20], "source": "maersk-live"}
+    if results:
+        return {"results": results, "source": "maersk-live"}
 
-        # Maersk returned nothing — fall through to local fallback
-        return _fallback_ports(q.strip(), country)
+    # Maersk returned nothing — fall through to local fallback
+    return _fallback_ports(q_clean, country)
 
-    except Exception as e:
-        logger.error(f"Port Search Error: {e}")
-        return _fallback_ports(q.strip(), country)
+
+async def _live_commodities(q: str) -> List[Dict[str, Any]]:
+    url = "/commodity-classifications"
+    if q:
+        url += f"?commodityName={quote(q)}"
+
+    response = await maersk_client.get("commodities", url)
+    if response.status_code != 200:
+        raise MaerskUnavailable(f"Maersk API {response.status_code}: {response.text[:200]}")
+
+    data = response.json()
+    commodities = data.get("commodities", []) if isinstance(data, dict) else data
+    results = []
+    for r in commodities:
+        if not r.get("commodityName"):
+            continue
+        hs_codes = r.get("hsCommodities", [])
+        first_hs = hs_codes[0].get("hsCommodityCode") if hs_codes else None
+        results.append({
+            "id": r.get("commodityCode"),
+            "name": r.get("commodityName"),
+            "type": (r.get("cargoTypes") or ["DRY"])[0],
+            "hs_code": first_hs,  # primary HS code for auto-fill
+            "hs_codes": [
+                {"code": h.get("hsCommodityCode"), "name": h.get("hsCommodityName")}
+                for h in hs_codes if h.get("hsCommodityCode")
+            ],
+        })
+    return results[:50]
 
 
 @router.get("/commodities/search", response_model=Dict[str, Any])
@@ -127,49 +133,25 @@ async def search_commodities(q: str = ""):
     Commodity search — Maersk API first, falls back to WCO HS 2022 headings.
     Returns hs_codes array so frontend can auto-fill HS code field.
     """
-    consumer_key = os.getenv('MAERSK_CONSUMER_KEY')
     results = []
 
-    if consumer_key:
+    if maersk_client.configured:
+        q_clean = q.strip()
         try:
-            url = "https://api.maersk.com/commodity-classifications"
-            if q.strip():
-                url += f"?commodityName={quote(q.strip())}"
-
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    url, headers={"Consumer-Key": consumer_key}, timeout=8.0
-                )
-
-            if response.status_code == 200:
-                data = response.json()
-                commodities = data.get("commodities", []) if isinstance(data, dict) else data
-                for r in commodities:
-                    if not r.get("commodityName"):
-                        continue
-                    hs_codes = r.get("hsCommodities", [])
-                    first_hs = hs_codes[0].get("hsCommodityCode") if hs_codes else None
-                    results.append({
-                        "id": r.get("commodityCode"),
-                        "name": r.get("commodityName"),
-                        "type": (r.get("cargoTypes") or ["DRY"])[0],
-                        "hs_code": first_hs,  # primary HS code for auto-fill
-                        "hs_codes": [
-                            {"code": h.get("hsCommodityCode"), "name": h.get("hsCommodityName")}
-                            for h in hs_codes if h.get("hsCommodityCode")
-                        ],
-                    })
+            results = await commodity_cache.get_or_load(normalize(q_clean), lambda: _live_commodities(q_clean))
         except Exception as e:
             logger.error(f"Commodity Search Error: {e}")
 
     # Fallback: WCO HS 2022 headings dataset
     if not results:
-        q_lower = q.strip().lower()
-        hs_results = (
-            [h for h in HS_HEADINGS if q_lower in h["name"].lower()]
-            if q_lower else HS_HEADINGS
-        )
-        results = [{"id": h["code"], "name": h["name"], "type": "DRY", "hs_code": h["code"]} for h in hs_results]
+        if q.strip():
+            results = [
+                {"id": m["heading"]["code"], "name": m["heading"]["name"], "type": "DRY",
+                 "hs_code": m["heading"]["code"], "score": m["confidence"]}
+                for m in hs_index.search(q, limit=50)
+            ]
+        else:
+            results = [{"id": h["code"], "name": h["name"], "type": "DRY", "hs_code": h["code"]} for h in HS_HEADINGS]
 
     return {"results": results[:50], "source": "WCO HS 2022"}
 
@@ -193,37 +175,39 @@ BUILTIN_VESSELS = [
     {"name": "Safeen Prime", "imo": "9808076", "flag": "AE", "capacity": 6588},
 ]
 
+async def _live_vessels(q: str) -> List[Dict[str, Any]]:
+    if not q:
+        url = "/reference-data/vessels?limit=10"
+    elif q.isdigit():
+        url = f"/reference-data/vessels?vesselIMONumbers={quote(q)}&limit=20"
+    else:
+        url = f"/reference-data/vessels?vesselNames={quote(q)}&limit=20"
+
+    response = await maersk_client.get("vessels", url)
+    if response.status_code != 200:
+        raise MaerskUnavailable(f"Maersk API {response.status_code}: {response.text[:200]}")
+
+    return [
+        {
+            "name": r.get("vesselLongName") or r.get("vesselShortName"),
+            "imo": r.get("vesselIMONumber"),
+            "flag": r.get("vesselFlagCode"),
+            "capacity": r.get("vesselCapacityTEU"),
+        }
+        for r in response.json()
+        if r.get("vesselLongName") or r.get("vesselShortName")
+    ][:20]
+
+
 @router.get("/vessels/search", response_model=Dict[str, Any])
 async def search_vessels(q: str = ""):
     """Search active vessels via Maersk reference data."""
-    consumer_key = os.getenv('MAERSK_CONSUMER_KEY')
     results = []
 
-    if consumer_key:
+    if maersk_client.configured:
+        q_clean = q.strip()
         try:
-            q_stripped = q.strip()
-            if not q_stripped:
-                url = "https://api.maersk.com/reference-data/vessels?limit=10"
-            elif q_stripped.isdigit():
-                url = f"https://api.maersk.com/reference-data/vessels?vesselIMONumbers={quote(q_stripped)}&limit=20"
-            else:
-                url = f"https://api.maersk.com/reference-data/vessels?vesselNames={quote(q_stripped)}&limit=20"
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    url, headers={"Consumer-Key": consumer_key}, timeout=5.0
-                )
-            if response.status_code == 200:
-                data = response.json()
-                results = [
-                    {
-                        "name": r.get("vesselLongName") or r.get("vesselShortName"),
-                        "imo": r.get("vesselIMONumber"),
-                        "flag": r.get("vesselFlagCode"),
-                        "capacity": r.get("vesselCapacityTEU"),
-                    }
-                    for r in data
-                    if r.get("vesselLongName") or r.get("vesselShortName")
-                ]
+            results = await vessel_cache.get_or_load(normalize(q_clean), lambda: _live_vessels(q_clean))
         except Exception as e:
             logger.error(f"Vessel Search Error: {e}")
 
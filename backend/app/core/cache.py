@@ -0,0 +1,201 @@
+"""
+Two-tier read-through cache shared by routers and services.
+
+  - in-process LRU (per worker, `max_entries` per cache) — a repeat lookup is a dict hit
+  - Redis (shared by all workers) under `cache:{namespace}:{key}`
+
+Each entry carries two deadlines:
+  - fresh_until: served as-is
+  - stale_until: still served, but a background refresh is started (stale-while-revalidate);
+    with stale_ttl=0 (the default) entries simply expire
+Empty values get `negative_ttl` instead of `fresh_ttl` (negative caching); pass `ttl_for` to
+choose the lifetime per value (e.g. shorter for fallback answers).
+
+Loader exceptions are never cached — they propagate to the caller and the next request tries
+again. Concurrent misses for the same key share one load (singleflight), which runs in its own
+task so a cancelled caller doesn't fail the others. Every lookup is counted
+in cargolink_cache_lookups_total{cache=namespace, result=local|shared|stale|miss}.
+
+    hs_cache = TieredCache("hs_classify", fresh_ttl=86400)
+    value = await hs_cache.get_or_load(normalize(query), lambda: classify(query))
+"""
+import asyncio
+import json
+import re
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from app.core import metrics
+from app.core import redis as redis_mod
+
+logger = logging.getLogger(__name__)
+
+_WS = re.compile(r"\s+")
+
+
+def normalize(*parts: str) -> str:
+    """'  Shang ', 'cn' -> 'shang|cn' — case and whitespace never split the cache."""
+    return "|".join(_WS.sub(" ", (p or "").strip().lower()) for p in parts)
+
+
+class TieredCache:
+
+    def __init__(self, namespace: str, fresh_ttl: int, stale_ttl: int = 0, negative_ttl: Optional[int] = None,
+                 max_entries: int = 2000, ttl_for: Optional[Callable[[Any], int]] = None):
+        self.namespace = namespace
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl          # extra lifetime after fresh_ttl during which stale is served
+        self.negative_ttl = fresh_ttl if negative_ttl is None else negative_ttl
+        self.max_entries = max_entries
+        self._ttl_for = ttl_for
+        self._local: "OrderedDict[str, dict]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._refreshing: Set[asyncio.Task] = set()
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value for `key`, or `await loader()` on a miss. `loader` is called again for
+        background refreshes, so pass a zero-arg function, not a coroutine. Loader exceptions
+        propagate to the caller (and are not cached).
+        """
+        value, _ = await self.lookup_or_load(key, loader)
+        return value
+
+    async def lookup_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """Like get_or_load, but also returns where the value came from: local, shared, stale or miss."""
+        now = time.time()
+        entry = self._get_local(key, now)
+        result = "local"
+        if entry is None:
+            entry = await self._get_shared(key, now)
+            result = "shared"
+        if entry is not None:
+            if entry["fresh_until"] <= now:
+                result = "stale"
+                self._refresh_in_background(key, loader)
+            metrics.CACHE_LOOKUPS.labels(self.namespace, result).inc()
+            return entry["value"], result
+
+        metrics.CACHE_LOOKUPS.labels(self.namespace, "miss").inc()
+        return await self._load(key, loader), "miss"
+
+    async def peek(self, key: str) -> Optional[Any]:
+        """Cached value (fresh or stale) without loading on a miss; None if absent."""
+        now = time.time()
+        entry = self._get_local(key, now) or await self._get_shared(key, now)
+        metrics.CACHE_LOOKUPS.labels(self.namespace, "peek_hit" if entry else "peek_miss").inc()
+        return entry["value"] if entry else None
+
+    # ── local tier ─────────────────────────────────────────
+    def _get_local(self, key: str, now: float) -> Optional[dict]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry["stale_until"] <= now:
+            self._local.pop(key, None)
+            return None
+        self._local.move_to_end(key)
+        return entry
+
+    def _put_local(self, key: str, entry: dict) -> None:
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    # ── redis tier ─────────────────────────────────────────
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    async def _get_shared(self, key: str, now: float) -> Optional[dict]:
+        client = redis_mod.redis_client
+        if client is None:
+            return None
+        try:
+            raw = await client.get(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"[CACHE] {self.namespace}: Redis read failed: {e}")
+            return None
+        if not raw:
+            return None
+        try:
+            entry = json.loads(raw)
+        except ValueError:
+            return None
+        if entry.get("stale_until", 0) <= now:
+            return None
+        self._put_local(key, entry)
+        return entry
+
+    async def _store_shared(self, key: str, entry: dict) -> None:
+        client = redis_mod.redis_client
+        ttl = int(entry["stale_until"] - time.time())
+        if client is None or ttl <= 0:
+            return
+        try:
+            await client.setex(self._redis_key(key), ttl, json.dumps(entry))
+        except Exception as e:
+            logger.warning(f"[CACHE] {self.namespace}: Redis store failed: {e}")
+
+    # ── loading ────────────────────────────────────────────
+    def _entry(self, value: Any) -> dict:
+        now = time.time()
+        if self._ttl_for is not None:
+            fresh = self._ttl_for(value)
+        else:
+            fresh = self.fresh_ttl if value else self.negative_ttl
+        stale = self.stale_ttl if value else 0
+        return {"value": value, "fresh_until": now + fresh, "stale_until": now + fresh + stale}
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            # The load runs in its own task: a caller that goes away (client disconnect) stops
+            # waiting, but the load carries on for everyone else waiting on the same key
+            task = asyncio.create_task(self._load_and_store(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._load_done(key, t))
+        return await asyncio.shield(task)
+
+    async def _load_and_store(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        entry = self._entry(value)
+        self._put_local(key, entry)
+        await self._store_shared(key, entry)
+        return value
+
+    def _load_done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved — no "exception never retrieved" warning without waiters
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._inflight:
+            return
+
+        async def refresh():
+            try:
+                await self._load(key, loader)
+            except Exception as e:
+                # Keep serving the stale entry; the next stale hit retries
+                logger.warning(f"[CACHE] Refresh of {self.namespace}:{key} failed: {e}")
+
+        task = asyncio.create_task(refresh())
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def invalidate(self, key: str) -> None:
+        """Drop one key from this worker's LRU and from Redis."""
+        self._local.pop(key, None)
+        client = redis_mod.redis_client
+        if client is not None:
+            try:
+                await client.delete(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"[CACHE] {self.namespace}: Redis delete failed: {e}")
+
+    def clear(self) -> None:
+        """Drop this worker's local tier (Redis entries expire on their own)."""
+        self._local.clear()
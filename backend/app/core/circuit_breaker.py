@@ -0,0 +1,55 @@
+"""
+Consecutive-failure circuit breaker shared by outbound clients (Maersk, the LLM gateway).
+
+After `failures` consecutive failures the circuit opens and callers fail fast for `cooldown`
+seconds; then one probe call is let through (half-open) and its outcome closes or re-opens it.
+"""
+import time
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed → open (fail fast) → half-open (one probe) → closed."""
+
+    def __init__(self, name: str, failures: int, cooldown: float):
+        self.name = name
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release_probe(self) -> None:
+        """The half-open probe was cancelled before it could succeed or fail."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning(f"[{self.name}] Circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
@@ -0,0 +1,195 @@
+"""
+Response compression as raw ASGI middleware (replaces GZipMiddleware).
+
+- Negotiates zstd > br > gzip from Accept-Encoding; zstd/brotli only when their optional
+  packages (zstandard, brotli) are installed, gzip always.
+- Only compresses allowlisted content types, and never text/event-stream: SSE chunks must
+  reach the browser the moment they are yielded (agent chat tokens).
+- Single-chunk bodies under COMPRESSION_MIN_SIZE are sent as-is. Multi-chunk (streaming)
+  bodies are compressed incrementally and flushed per chunk, never buffered whole.
+- Levels are tunable from settings (COMPRESSION_*_LEVEL).
+"""
+import zlib
+from abc import ABC, abstractmethod
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # optional — gzip/brotli still work
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # optional — gzip/zstd still work
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+NEVER_COMPRESS = ("text/event-stream",)
+
+
+class _Encoder(ABC):
+    """Incremental compressor: feed() returns bytes ready to send, finish() ends the stream."""
+
+    @abstractmethod
+    def feed(self, data: bytes) -> bytes: ...
+
+    @abstractmethod
+    def finish(self) -> bytes: ...
+
+
+class _GzipEncoder(_Encoder):
+    def __init__(self, level: int):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def feed(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+class _BrotliEncoder(_Encoder):
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def feed(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class _ZstdEncoder(_Encoder):
+    def __init__(self, level: int):
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def feed(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+def compress(encoding: str, body: bytes) -> bytes:
+    """One-shot compression with the configured level (also used by scripts/bench_compression.py)."""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_LEVEL)
+    z = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return z.compress(body) + z.flush()
+
+
+def _new_encoder(encoding: str) -> _Encoder:
+    if encoding == "zstd":
+        return _ZstdEncoder(settings.COMPRESSION_ZSTD_LEVEL)
+    if encoding == "br":
+        return _BrotliEncoder(settings.COMPRESSION_BROTLI_LEVEL)
+    return _GzipEncoder(settings.COMPRESSION_GZIP_LEVEL)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Best encoding we support that the client accepts (q > 0), server preference zstd > br > gzip."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token.strip())
+    if zstandard is not None and "zstd" in accepted:
+        return "zstd"
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    if content_type.startswith(NEVER_COMPRESS):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or not _compressible(headers.get("content-type", "")):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message   # held until the first body chunk decides
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encoder is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers = MutableHeaders(scope=start)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body:
+                    data = compress(encoding, body)
+                    headers["Content-Length"] = str(len(data))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                del headers["Content-Length"]
+                encoder = _new_encoder(encoding)
+                await send(start)
+
+            data = encoder.feed(body)
+            if not more_body:
+                data += encoder.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
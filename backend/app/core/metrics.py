@@ -0,0 +1,119 @@
+"""
+Prometheus metrics, aggregated across uvicorn worker processes.
+
+With PROMETHEUS_MULTIPROC_DIR set (the Dockerfile does this), every worker writes its
+samples to mmap'd files in that directory and /metrics merges all of them, so a scrape
+that lands on any one worker still sees the whole container. Without it (local
+single-process dev) the default in-process registry is used.
+
+Hooks: middleware (request latency, in-flight), db/session.py pool (checked-out,
+overflow, wait), core/redis.py client (round-trip time), WebhookService._trigger and
+the Maersk call sites (external latency, background deliveries in progress),
+core/cache.py (hit/miss by tier), services/llm_gateway.py (LLM calls, latency, tokens and
+in-flight calls per feature).
+"""
+import os
+import time
+from typing import Awaitable, TypeVar
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+T = TypeVar("T")
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    # Start commands that bypass the Dockerfile CMD (railway.toml) don't create it
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+HTTP_LATENCY = Histogram(
+    "cargolink_http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "cargolink_http_requests_in_flight", "Requests currently being handled",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "cargolink_db_pool_checked_out", "DB connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "cargolink_db_pool_overflow", "DB connections open beyond pool_size",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "cargolink_db_pool_wait_seconds", "Time spent waiting for a pooled DB connection",
+    buckets=_FAST_BUCKETS,
+)
+REDIS_LATENCY = Histogram(
+    "cargolink_redis_command_duration_seconds", "Redis round-trip time by command",
+    ["command"], buckets=_FAST_BUCKETS,
+)
+EXTERNAL_LATENCY = Histogram(
+    "cargolink_external_call_duration_seconds", "Outbound call latency by service",
+    ["service", "outcome"], buckets=_LATENCY_BUCKETS,
+)
+BACKGROUND_IN_PROGRESS = Gauge(
+    "cargolink_background_tasks_in_progress", "Background deliveries (n8n webhooks) queued or running",
+    ["kind"], multiprocess_mode="livesum",
+)
+RATE_LIMITED = Counter(
+    "cargolink_rate_limited_total", "Requests rejected with 429",
+)
+CACHE_LOOKUPS = Counter(
+    "cargolink_cache_lookups_total", "Cache lookups by cache and where they were answered",
+    ["cache", "result"],
+)
+
+LLM_CALLS = Counter(
+    "cargolink_llm_calls_total", "LLM gateway calls by feature and outcome (ok, error, retried, failed, rejected)",
+    ["feature", "outcome"],
+)
+LLM_LATENCY = Histogram(
+    "cargolink_llm_call_duration_seconds", "LLM call latency by feature and kind (chat, first_token, stream, embed)",
+    ["feature", "kind"], buckets=_LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "cargolink_llm_tokens_total", "LLM tokens used by feature (prompt, completion)",
+    ["feature", "kind"],
+)
+LLM_IN_FLIGHT = Gauge(
+    "cargolink_llm_calls_in_flight", "LLM calls currently holding a gateway slot",
+    ["feature"], multiprocess_mode="livesum",
+)
+
+
+async def observe_external(service: str, call: Awaitable[T]) -> T:
+    """Await an outbound call and record its latency: `resp = await observe_external("maersk", client.get(...))`."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await call
+        outcome = "ok"
+        return result
+    finally:
+        EXTERNAL_LATENCY.labels(service, outcome).observe(time.perf_counter() - started)
+
+
+def observe_pool(pool) -> None:
+    DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    DB_POOL_OVERFLOW.set(max(0, pool.overflow()))
+
+
+def render() -> tuple:
+    """(body, content type) for the /metrics endpoint."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    """Drop this worker's live gauges on shutdown so livesum stops counting them."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,115 @@
+"""
+Security headers + rate limiting as raw ASGI middleware.
+
+Replaces the @app.middleware("http") function: no Request object, no call_next task or
+body-stream wrapping, so StreamingResponse / SSE bytes go straight through. Headers are
+injected on `http.response.start`; rate-limited requests are answered with a prebuilt 429
+before the app runs. Non-HTTP scopes (lifespan, websocket) pass through untouched.
+"""
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core import metrics
+from app.core.config import settings
+from app.core.rate_limit import rate_limiter
+from app.db.query_stats import begin_query_stats
+from app.db.session import begin_pool_stats
+
+_LOCAL_CLIENTS = frozenset(("127.0.0.1", "::1"))
+
+_SECURITY_HEADERS = (
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "DENY"),
+    ("X-XSS-Protection", "1; mode=block"),
+    ("Strict-Transport-Security", "max-age=31536000; includeSubDomains"),
+    ("Referrer-Policy", "strict-origin-when-cross-origin"),
+)
+
+_TOO_MANY_BODY = b'{"detail":"Too many requests. Please try again in a moment."}'
+
+
+def _header(scope: Scope, name: bytes):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _send_429(send: Send, retry_ms: int) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(_TOO_MANY_BODY)).encode()),
+            (b"retry-after", str(max(1, -(-retry_ms // 1000))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": _TOO_MANY_BODY})
+
+
+class SecurityRateLimitMiddleware:
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "127.0.0.1"
+
+        # 1. Rate Limit Check — Redis GCRA, local token buckets if Redis is down (Bypass for Localhost)
+        if client_ip not in _LOCAL_CLIENTS:
+            retry_ms = await rate_limiter.check(
+                scope["path"], _header(scope, b"authorization"), client_ip,
+                _header(scope, b"x-omego-api-key") or _header(scope, b"x-omego-auth"),
+            )
+            if retry_ms:
+                metrics.RATE_LIMITED.inc()
+                await _send_429(send, retry_ms)
+                return
+
+        # 2. Process Request (with per-request DB pool and SQL counters)
+        pool_stats = begin_pool_stats()
+        query_stats = begin_query_stats()
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # 3. Add Security Headers
+                headers = MutableHeaders(scope=message)
+                if settings.DEBUG:
+                    headers["X-DB-Checkouts"] = str(pool_stats.checkouts)
+                    headers["X-DB-Pool-Wait-Ms"] = f"{pool_stats.wait_ms:.1f}"
+                    headers["X-DB-Queries"] = str(query_stats.statements)
+                    headers["X-DB-Round-Trips"] = str(query_stats.round_trips)
+                    headers["X-DB-Time-Ms"] = f"{query_stats.db_ms:.1f}"
+                for name, value in _SECURITY_HEADERS:
+                    headers[name] = value
+            await send(message)
+
+        metrics.HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_headers)
+        except Exception as e:
+            print(f"[MIDDLEWARE_CRITICAL] Exception caught: {e}")
+            raise
+        finally:
+            metrics.HTTP_IN_FLIGHT.dec()
+            # Route template (e.g. /api/marketplace/requests/{request_id}), never the raw path — keeps label cardinality bounded
+            route = scope.get("route")
+            metrics.HTTP_LATENCY.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status_code)
+            ).observe(time.perf_counter() - started)
+
+        if pool_stats.checkouts > 1:
+            print(f"[DB_POOL] {scope['method']} {scope['path']} checked out {pool_stats.checkouts} "
+                  f"connections (waited {pool_stats.wait_ms:.1f}ms)")
+        for sql, count in query_stats.n_plus_one():
+            print(f"[DB_N+1] {scope['method']} {scope['path']} ran the same statement {count}x: {sql[:160]}")
@@ -0,0 +1,174 @@
+"""
+Rate limiting for the HTTP middleware.
+
+Tier 1 — Redis GCRA (Generic Cell Rate Algorithm) in a single Lua call:
+one key per (budget, principal) holding a "theoretical arrival time", so memory
+stays O(1) per principal instead of one ZSET member per request.
+
+Tier 2 — per-worker token buckets, used whenever Redis is missing or failing so
+limits keep being enforced (each worker enforces the full budget on its own).
+"""
+import hashlib
+import hmac
+import time
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+from jose import jwt, JWTError
+from app.core import redis as redis_mod
+from app.core.config import settings
+from app.core.security import ALGORITHM
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] = bucket key
+# ARGV[1] = emission interval (ms per request), ARGV[2] = burst tolerance (ms), ARGV[3] = now (ms)
+# Returns {allowed (1/0), retry_after_ms}
+_GCRA_LUA = """
+local tat = tonumber(redis.call('GET', KEYS[1]))
+local now = tonumber(ARGV[3])
+if not tat or tat < now then tat = now end
+local new_tat = tat + tonumber(ARGV[1])
+local allow_at = new_tat - tonumber(ARGV[2])
+if allow_at > now then
+    return {0, math.ceil(allow_at - now)}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, 0}
+"""
+
+# n8n sync endpoints (global bridge aliases + marketplace router paths)
+N8N_PATHS = {
+    "/api/request-sync", "/api/quotations/new", "/api/requests/close", "/api/bid-status-sync",
+    "/api/marketplace/request-sync", "/api/marketplace/close", "/api/marketplace/requests/close",
+    "/api/marketplace/quotations/new", "/api/marketplace/n8n-sync", "/api/marketplace/bid-status-sync",
+}
+
+# Unauthenticated credential endpoints — always keyed by IP (brute-force protection)
+AUTH_PATHS = {
+    "/api/auth/login", "/api/auth/register", "/api/auth/refresh", "/api/auth/social-sync",
+    "/api/auth/forgot-password", "/api/auth/reset-password",
+}
+
+
+class Budget:
+    """A named requests-per-minute allowance with a burst of the full minute."""
+    __slots__ = ("name", "per_minute", "emission_ms", "tolerance_ms")
+
+    def __init__(self, name: str, per_minute: int):
+        self.name = name
+        self.per_minute = max(int(per_minute), 1)
+        self.emission_ms = 60000 / self.per_minute
+        self.tolerance_ms = 60000 - self.emission_ms
+
+
+BUDGETS = {
+    "default": Budget("default", settings.RATE_LIMIT_PER_MINUTE),
+    "auth": Budget("auth", settings.RATE_LIMIT_AUTH_PER_MINUTE),
+    "n8n": Budget("n8n", settings.RATE_LIMIT_N8N_PER_MINUTE),
+}
+
+
+def _n8n_principal(authorization: Optional[str], api_key: Optional[str]) -> Optional[str]:
+    """The principal for a request carrying the n8n webhook secret (same headers as deps.verify_n8n_webhook)."""
+    secret = settings.OMEGO_API_SECRET
+    if not secret:
+        return None
+    candidates = [api_key]
+    if authorization:
+        scheme, _, token = authorization.partition(" ")
+        if scheme in ("Bearer", "OMEGO"):
+            candidates.append(token)
+    for token in candidates:
+        if token and hmac.compare_digest(token.encode(), secret.encode()):
+            return "key:" + hashlib.sha256(secret.encode()).hexdigest()[:16]
+    return None
+
+
+def classify(path: str, authorization: Optional[str], client_ip: str,
+             api_key: Optional[str] = None) -> Tuple[Budget, str]:
+    """Pick the budget for a route and the principal it is charged to."""
+    if path in N8N_PATHS:
+        # Only the verified webhook secret gets the n8n budget; anyone else is an anonymous caller
+        principal = _n8n_principal(authorization, api_key)
+        if principal is not None:
+            return BUDGETS["n8n"], principal
+        return BUDGETS["default"], f"ip:{client_ip}"
+    if path in AUTH_PATHS:
+        return BUDGETS["auth"], f"ip:{client_ip}"
+    if authorization and authorization.startswith("Bearer "):
+        try:
+            sub = jwt.decode(authorization[7:], settings.SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+            if sub:
+                return BUDGETS["default"], f"sub:{sub.lower()}"
+        except JWTError:
+            pass
+    return BUDGETS["default"], f"ip:{client_ip}"
+
+
+class _LocalBuckets:
+    """Bounded LRU of token buckets — the in-process fallback tier."""
+
+    def __init__(self, max_keys: int = 10000):
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._max_keys = max_keys
+
+    def hit(self, key: str, budget: Budget) -> int:
+        """Consume one token. Returns 0 if allowed, else retry-after in ms."""
+        now = time.monotonic()
+        rate = budget.per_minute / 60.0
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(budget.per_minute), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(budget.per_minute, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0
+        return int((1 - bucket[0]) / rate * 1000) + 1
+
+
+class RateLimiter:
+    # After a Redis failure, stay on the local tier for this long before retrying Redis
+    REDIS_RETRY_SECONDS = 5.0
+
+    def __init__(self):
+        self._local = _LocalBuckets()
+        self._script = None
+        self._script_client = None
+        self._redis_down_until = 0.0
+
+    def _gcra(self):
+        client = redis_mod.redis_client
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(_GCRA_LUA)
+            self._script_client = client
+        return self._script
+
+    async def check(self, path: str, authorization: Optional[str], client_ip: str,
+                    api_key: Optional[str] = None) -> int:
+        """Charge one request. Returns 0 when allowed, else retry-after in milliseconds."""
+        budget, principal = classify(path, authorization, client_ip, api_key)
+        key = f"rl:{budget.name}:{principal}"
+
+        if redis_mod.redis_client is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                allowed, retry_ms = await self._gcra()(
+                    keys=[key],
+                    args=[budget.emission_ms, budget.tolerance_ms, int(time.time() * 1000)],
+                )
+                return 0 if int(allowed) else int(retry_ms)
+            except Exception as e:
+                self._redis_down_until = time.monotonic() + self.REDIS_RETRY_SECONDS
+                if "Connect call failed" not in str(e):
+                    logger.warning(f"[RATE_LIMIT] Redis tier unavailable, using local buckets: {e}")
+
+        return self._local.hit(key, budget)
+
+
+rate_limiter = RateLimiter()
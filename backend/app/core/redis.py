@@ -2,7 +2,33 @@
 Shared Redis client reference.
 Initialized by main.py lifespan; None until then (safe to check).
 """
+import time
 import redis.asyncio as aioredis
+from redis.asyncio.client import Pipeline
 from typing import Optional
+from app.core import metrics
 
 redis_client: Optional[aioredis.Redis] = None
+
+
+class _InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            metrics.REDIS_LATENCY.labels("PIPELINE").observe(time.perf_counter() - started)
+
+
+class InstrumentedRedis(aioredis.Redis):
+    """Redis client that records every round trip (single commands and pipelines) in metrics."""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            metrics.REDIS_LATENCY.labels(str(args[0]).upper()).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        return _InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
@@ -4,6 +4,7 @@ from sqlalchemy import func
 from app.models.user import User
 from app.core import security
 from app.schemas import UserLogin
+from app.services.principal_cache import principal_cache
 
 class CRUDUser:
     async def get_by_email(self, db: AsyncSession, email: str) -> User | None:
@@ -42,6 +43,7 @@ class CRUDUser:
                     setattr(db_user, field, value)
             await db.commit()
             await db.refresh(db_user)
+            await principal_cache.invalidate_user(db_user.id)
         return db_user
 
     def is_active(self, user: User) -> bool:
@@ -0,0 +1,123 @@
+"""
+Per-request SQL telemetry: statements, round trips and DB time, plus N+1 detection.
+
+The HTTP middleware (app/core/middleware.py) opens a QueryStats scope per request;
+engine events below record into whatever scope is active in the current context.
+Statements are keyed by their parameterised SQL, so the same SELECT issued in a loop
+with different bind values shows up as one key with a high count — an N+1 candidate.
+Scopes nest (assert_query_budget around a request that opens its own scope): every
+statement is recorded in the innermost scope and all of its parents.
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import event
+
+# Same statement this many times in one request → reported as an N+1 candidate
+N_PLUS_ONE_THRESHOLD = 5
+
+
+class QueryStats:
+    __slots__ = ("statements", "round_trips", "db_ms", "by_sql", "parent", "_started")
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.statements = 0
+        self.round_trips = 0     # statements + transaction control (BEGIN/COMMIT/ROLLBACK)
+        self.db_ms = 0.0
+        self.by_sql: Counter = Counter()
+        self.parent = parent
+        self._started: List[float] = []
+
+    def n_plus_one(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """Statements repeated at least `threshold` times, most repeated first."""
+        return [(sql, n) for sql, n in self.by_sql.most_common() if n >= threshold]
+
+    def _chain(self) -> Iterator["QueryStats"]:
+        stats = self
+        while stats is not None:
+            yield stats
+            stats = stats.parent
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def begin_query_stats() -> QueryStats:
+    """Start a fresh statement counter for the current request context."""
+    stats = QueryStats(parent=_query_stats.get())
+    _query_stats.set(stats)
+    return stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    if stats is not None:
+        stats._started.append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    if stats is None or not stats._started:
+        return
+    elapsed_ms = (time.perf_counter() - stats._started.pop()) * 1000
+    key = " ".join(statement.split())
+    for scope in stats._chain():
+        scope.db_ms += elapsed_ms
+        scope.statements += 1
+        scope.round_trips += 1
+        scope.by_sql[key] += 1
+
+
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute; drop their start mark
+    stats = _query_stats.get()
+    if stats is not None and stats._started:
+        stats._started.pop()
+
+
+def _transaction_round_trip(conn, *args):
+    stats = _query_stats.get()
+    if stats is not None:
+        for scope in stats._chain():
+            scope.round_trips += 1
+
+
+def instrument(engine) -> None:
+    """Attach the listeners to an engine (AsyncEngine or sync Engine)."""
+    target = getattr(engine, "sync_engine", engine)
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+    for name in ("begin", "commit", "rollback"):
+        event.listen(target, name, _transaction_round_trip)
+
+
+@contextmanager
+def assert_query_budget(max_statements: int, max_round_trips: Optional[int] = None,
+                        allow_n_plus_one: bool = False) -> Iterator[QueryStats]:
+    """
+    Fail if the wrapped block exceeds its SQL budget. Meant for endpoint regression tests:
+
+        with assert_query_budget(3):
+            await client.get("/api/dashboard/stats", headers=auth)
+
+    tests/conftest.py wraps it as the `no_n_plus_one` fixture, which fails a whole test on N+1
+    or on more statements than its `@pytest.mark.query_budget(n)` (see tests/test_admin_stats.py).
+    """
+    previous = _query_stats.get()
+    stats = begin_query_stats()
+    try:
+        yield stats
+    finally:
+        _query_stats.set(previous)
+    problems = []
+    if stats.statements > max_statements:
+        problems.append(f"{stats.statements} statements (budget {max_statements})")
+    if max_round_trips is not None and stats.round_trips > max_round_trips:
+        problems.append(f"{stats.round_trips} round trips (budget {max_round_trips})")
+    if not allow_n_plus_one:
+        problems.extend(f"N+1 candidate x{n}: {sql[:120]}" for sql, n in stats.n_plus_one())
+    if problems:
+        raise AssertionError("Query budget exceeded:\n  " + "\n  ".join(problems))
@@ -0,0 +1,43 @@
+"""
+Startup schema check.
+
+Alembic owns the schema. Workers used to run Base.metadata.create_all on every start
+(4 workers x full metadata reflection); now each one reads alembic_version once and only
+falls back to create_all when the database is not at the migration head (fresh DB,
+or a deploy that skipped `alembic upgrade head`).
+"""
+from pathlib import Path
+from typing import Optional, Set
+from sqlalchemy import text
+from app.db.session import engine, Base
+
+_ALEMBIC_DIR = Path(__file__).resolve().parent.parent.parent / "alembic"
+
+
+def alembic_heads() -> Set[str]:
+    from alembic.script import ScriptDirectory
+    return set(ScriptDirectory(str(_ALEMBIC_DIR)).get_heads())
+
+
+async def current_revision() -> Optional[str]:
+    try:
+        async with engine.connect() as conn:
+            return (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+    except Exception:
+        return None   # no alembic_version table yet
+
+
+async def ensure_schema() -> str:
+    """Returns what was done: 'at-head' or 'create_all'."""
+    revision = await current_revision()
+    heads = alembic_heads()
+    if revision in heads:
+        return "at-head"
+
+    import app.db.base  # noqa: F401 — registers every model on Base.metadata
+    import app.models.forwarder_network  # noqa: F401
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    print(f"[SYSTEM] DB revision {revision or 'none'} != Alembic head {', '.join(sorted(heads))} — "
+          f"ran create_all. Run `alembic upgrade head` to apply indexes and data migrations.")
+    return "create_all"
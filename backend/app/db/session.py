@@ -1,9 +1,15 @@
 import asyncio
 import sys
 import ssl as ssl_mod
+import time
+from contextvars import ContextVar
+from typing import Optional
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core import metrics
+from app.db.query_stats import instrument
 
 # REAL DATABASE CONNECTION
 # This requires DATABASE_URL to be set in .env
@@ -39,9 +45,52 @@ elif _is_supabase:
         "server_settings": {"application_name": "cargolink_backend"},
     }
 
+# PER-REQUEST POOL TELEMETRY
+# Every request should check out exactly ONE connection. The HTTP middleware (app/core/middleware.py)
+# opens a PoolStats scope per request; the pool below records into it.
+class PoolStats:
+    __slots__ = ("checkouts", "wait_ms")
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_ms = 0.0
+
+
+_pool_stats: ContextVar[Optional[PoolStats]] = ContextVar("pool_stats", default=None)
+
+
+def begin_pool_stats() -> PoolStats:
+    """Start a fresh checkout/wait counter for the current request context."""
+    stats = PoolStats()
+    _pool_stats.set(stats)
+    return stats
+
+
+class _InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Counts checkouts and time spent waiting for a free connection (includes connect time for new ones)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            stats = _pool_stats.get()
+            if stats is not None:
+                stats.checkouts += 1
+                stats.wait_ms += waited * 1000
+            metrics.DB_POOL_WAIT.observe(waited)
+            metrics.observe_pool(self)
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        metrics.observe_pool(self)
+
+
 engine = create_async_engine(
     DATABASE_URL,
     echo=settings.DEBUG,
+    poolclass=_InstrumentedQueuePool,
     pool_pre_ping=False,   # Skip extra round-trip ping — Neon pooler keeps connections alive
     pool_recycle=300,
     pool_size=5,           # Small pool — pooler handles multiplexing
@@ -49,6 +98,7 @@ engine = create_async_engine(
     pool_timeout=30,
     connect_args=_connect_args
 )
+instrument(engine)  # per-request statement counts / N+1 detection (app/db/query_stats.py)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -60,6 +110,10 @@ AsyncSessionLocal = sessionmaker(
 Base = declarative_base()
 
 async def get_db():
+    """
+    The ONLY request-scoped session provider. Routers and auth dependencies must all
+    depend on this exact callable so FastAPI caches it and a request holds one connection.
+    """
     async with AsyncSessionLocal() as session:
         try:
             yield session
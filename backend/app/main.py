@@ -1,4 +1,8 @@
+import time
+_IMPORTS_STARTED = time.perf_counter()
+
 import asyncio
+import hmac
 import sys
 
 # Critical fix for Windows: asyncpg + Neon SSL handshake
@@ -10,20 +14,22 @@ if sys.platform == "win32":
         pass
 
 from fastapi import FastAPI, Request, Depends
-from fastapi.responses import JSONResponse
-from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.api import deps
 from fastapi.middleware.cors import CORSMiddleware
-import time
 from app.api.routers import auth, references, dashboard, marketplace, forwarders, tasks, quotes, tools, admin, bookings, conversations, forwarder_conversations, forwarder_network, agent
 from app.core.config import settings
 from contextlib import asynccontextmanager
 from app.models.user import User
 from app.api.deps import get_current_user
-import redis.asyncio as aioredis
 from app.core import redis as redis_mod
+from app.core import metrics
+from app.core.middleware import SecurityRateLimitMiddleware
+from app.core.compression import CompressionMiddleware
+
+_IMPORTS_DONE = time.perf_counter()
 
 async def _db_keepalive():
     """Ping Neon DB every 4 minutes so it never cold-starts."""
@@ -40,49 +46,64 @@ async def _db_keepalive():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    keepalive_task = None
+    rag_task = None
     try:
-        redis_mod.redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
-        # Create all tables from models on startup (safe for fresh DB)
+        timings = [("imports", (_IMPORTS_DONE - _IMPORTS_STARTED) * 1000)]
+        started = time.perf_counter()
+        redis_mod.redis_client = redis_mod.InstrumentedRedis.from_url(settings.REDIS_URL, decode_responses=True)
+        timings.append(("redis client", (time.perf_counter() - started) * 1000))
+
+        # Schema check doubles as pool warm-up: one SELECT on alembic_version, create_all only if not at head
+        started = time.perf_counter()
         try:
-            from app.db.session import engine, Base
-            import app.models.user, app.models.forwarder, app.models.marketplace
-            import app.models.conversation, app.models.booking, app.models.activity
-            import app.models.task, app.models.forwarder_network
-            async with engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
-            print("[SYSTEM] DB tables created/verified.")
+            from app.db.schema import ensure_schema
+            schema_state = await ensure_schema()
         except Exception as e:
+            schema_state = "error"
             print(f"[SYSTEM] DB setup warning: {e}")
-        # Pre-warm DB connection pool on startup
-        from app.db.session import engine
-        from sqlalchemy import text
+        timings.append((f"schema ({schema_state})", (time.perf_counter() - started) * 1000))
+
+        # Map the persisted RAG index (built once, shared by all workers). A missing or stale one is
+        # rebuilt on the first knowledge question, or right away with RAG_PREWARM
+        started = time.perf_counter()
         try:
-            async with engine.connect() as conn:
-                await conn.execute(text("SELECT 1"))
-            print("[SYSTEM] DB connection pool warmed up.")
+            from app.services import rag_service
+            rag_state = await asyncio.to_thread(rag_service.load_index)
         except Exception as e:
-            print(f"[SYSTEM] DB warmup warning: {e}")
-        # Pre-warm RAG knowledge index in background (avoids 10s delay on first knowledge question)
-        import threading
-        def _prewarm_rag_sync():
-            try:
-                from app.services.rag_service import get_index
-                get_index()
-                print("[SYSTEM] RAG knowledge index pre-warmed.")
-            except Exception as e:
-                print(f"[SYSTEM] RAG pre-warm skipped: {e}")
-        threading.Thread(target=_prewarm_rag_sync, daemon=True).start()
+            rag_state = "error"
+            print(f"[SYSTEM] RAG index load warning: {e}")
+        timings.append((f"rag index ({rag_state})", (time.perf_counter() - started) * 1000))
+        if settings.RAG_PREWARM and not rag_state.endswith("chunks"):
+            async def _prewarm_rag():
+                try:
+                    from app.services.rag_service import get_index
+                    await get_index()
+                    print("[SYSTEM] RAG knowledge index pre-warmed.")
+                except Exception as e:
+                    print(f"[SYSTEM] RAG pre-warm skipped: {e}")
+            rag_task = asyncio.create_task(_prewarm_rag())
         # Start background keep-alive so Neon never sleeps
         keepalive_task = asyncio.create_task(_db_keepalive())
+        print("[STARTUP] " + " | ".join(f"{name} {ms:.0f}ms" for name, ms in timings)
+              + f" | total {sum(ms for _, ms in timings):.0f}ms")
         print(f"[SYSTEM] CargoLink Logistics OS Backend Initialized.")
         print(f"[SYSTEM] CORS WHITELIST: {settings.ALLOWED_ORIGINS}")
         yield
     except asyncio.CancelledError:
         print(f"[SYSTEM] CargoLink Logistics OS: Shutdown Signal Received.")
     finally:
-        keepalive_task.cancel()
+        if keepalive_task:
+            keepalive_task.cancel()
+        if rag_task:
+            rag_task.cancel()
         if redis_mod.redis_client:
             await redis_mod.redis_client.aclose()
+        from app.services.maersk import maersk_client
+        await maersk_client.aclose()
+        from app.services.llm_gateway import llm_gateway
+        await llm_gateway.aclose()
+        metrics.mark_worker_dead()
         print(f"[SYSTEM] CargoLink Logistics OS: Securely Offline.")
 
 app = FastAPI(
@@ -92,52 +113,6 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# SECURITY HEADERS + REDIS RATE LIMITING MIDDLEWARE
-@app.middleware("http")
-async def security_and_rate_limit(request: Request, call_next):
-    client_ip = request.client.host if request.client else "127.0.0.1"
-
-    # 1. Rate Limit Check via Redis ZSET (Bypass for Localhost)
-    if client_ip not in ["127.0.0.1", "::1"] and redis_mod.redis_client is not None:
-        try:
-            now = time.time()
-            key = f"rate:{client_ip}"
-            pipe = redis_mod.redis_client.pipeline()
-            pipe.zremrangebyscore(key, 0, now - 60)
-            pipe.zadd(key, {str(now): now})
-            pipe.zcard(key)
-            pipe.expire(key, 60)
-            results = await pipe.execute()
-            request_count = results[2]
-            if request_count > settings.RATE_LIMIT_PER_MINUTE:
-                return JSONResponse(
-                    status_code=429,
-                    content={"detail": "Too many requests. Please try again in a moment."}
-                )
-        except Exception as e:
-            # Silent fallback for Redis connection errors to keep logs clean
-            if "Connect call failed" not in str(e):
-                print(f"[REDIS_WARNING] Rate limiting disabled: {e}")
-
-    # 2. Process Request
-    try:
-        response = await call_next(request)
-
-        # 3. Add Security Headers
-        if hasattr(response, "headers"):
-            response.headers["X-Content-Type-Options"] = "nosniff"
-            response.headers["X-Frame-Options"] = "DENY"
-            response.headers["X-XSS-Protection"] = "1; mode=block"
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-            response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-
-        return response
-    except asyncio.CancelledError:
-        raise
-    except Exception as e:
-        print(f"[MIDDLEWARE_CRITICAL] Exception caught: {e}")
-        raise e
-
 # Mount the 'Honest' Routers
 app.include_router(references.router, prefix="/api/references", tags=["Reference Data"])
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
@@ -197,6 +172,24 @@ async def global_forwarder_my_bids(db: AsyncSession = Depends(get_db), current_u
     return await forwarders.get_forwarder_bids(db, current_user)
 
 
+_LOOPBACK = {"127.0.0.1", "::1", "localhost"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """
+    Prometheus text exposition, merged across all uvicorn workers. Requires Bearer METRICS_TOKEN;
+    without a token configured it is only served to loopback clients (local dev, a sidecar).
+    """
+    if settings.METRICS_TOKEN:
+        if not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {settings.METRICS_TOKEN}"):
+            return JSONResponse(status_code=401, content={"detail": "Unauthorized"})
+    elif not request.client or request.client.host not in _LOOPBACK:
+        return JSONResponse(status_code=403, content={"detail": "Metrics require METRICS_TOKEN"})
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health")
 @app.get("/api/health")
 @app.get("/")
@@ -206,10 +199,14 @@ def health_check():
         "note": "CargoLink API is running. Authentication required."
     }
 
-app.add_middleware(GZipMiddleware, minimum_size=500)
+# SECURITY HEADERS + REDIS RATE LIMITING (raw ASGI — see app/core/middleware.py)
+app.add_middleware(SecurityRateLimitMiddleware)
+
+# zstd/br/gzip for JSON and text; event streams are never compressed
+app.add_middleware(CompressionMiddleware)
 
 # CORS CONFIGURATION (G.O.A.T. Security - OUTERMOST)
-# Must be added AFTER all @app.middleware to be the OUTERMOST for requests
+# Must be added LAST to be the OUTERMOST for requests
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Numeric, DateTime, ForeignKey, Index, Boolean
+from sqlalchemy import Column, String, Integer, Numeric, DateTime, ForeignKey, Index, Boolean, text
 from app.db.session import Base
 from datetime import datetime, timezone
 import uuid
@@ -59,6 +59,9 @@ class Conversation(Base):
         Index("idx_conv_shipper", "shipper_id"),
         Index("idx_conv_forwarder", "forwarder_id"),
         Index("idx_conv_quote", "quote_id"),
+        # Conversation lists: WHERE shipper_id/forwarder_id = ? ORDER BY updated_at DESC
+        Index("idx_conv_shipper_updated", shipper_id, updated_at.desc()),
+        Index("idx_conv_forwarder_updated", forwarder_id, updated_at.desc()),
     )
 
 
@@ -86,3 +89,9 @@ class ChatMessage(Base):
     is_read = Column(Boolean, default=False, nullable=False)  # True once the recipient polls this message
 
     created_at = Column(DateTime, default=_utcnow, index=True)
+
+    __table_args__ = (
+        # Unread badge counts only ever look at unread, non-system messages
+        Index("idx_msg_unread_partial", "conversation_id", "sender_id",
+              postgresql_where=text("is_read = false AND sender_role <> 'SYSTEM'")),
+    )
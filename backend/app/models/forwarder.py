@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, JSON, Boolean, DateTime, Float, Integer
+from sqlalchemy import Column, String, JSON, Boolean, DateTime, Float, Integer, Index, func
 from app.db.session import Base
 from datetime import datetime, timezone
 import uuid
@@ -48,3 +48,8 @@ class Forwarder(Base):
     # Brute-force protection for /auth endpoint
     failed_auth_attempts = Column(Integer, default=0, nullable=False)
     auth_locked_until = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Portal auth matches func.lower(Forwarder.email)
+        Index("idx_forwarders_email_lower", func.lower(email)),
+    )
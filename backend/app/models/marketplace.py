@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, JSON, Boolean, DateTime, Date, Numeric, Integer, ForeignKey, UniqueConstraint, Index
+from sqlalchemy import Column, String, JSON, Boolean, DateTime, Date, Numeric, Integer, ForeignKey, UniqueConstraint, Index, text
 from app.db.session import Base
 from datetime import datetime, timezone
 import uuid
@@ -14,11 +14,11 @@ class MarketplaceRequest(Base):
     __tablename__ = "requests"
 
     # Database ID - SERIAL parity
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     
     # n8n UNIQUE Fields
     request_id = Column(String, unique=True, index=True) # Column A
-    user_sovereign_id = Column(String, index=True) # Column B
+    user_sovereign_id = Column(String) # Column B
     user_email = Column(String, index=True) # Column C
     user_phone = Column(String, nullable=True) # ADDED: Tactical Contact Sync
     user_name = Column(String) # Column D
@@ -26,7 +26,7 @@ class MarketplaceRequest(Base):
     origin_type = Column(String) # Port, Airport, Terminal
     destination = Column(String) # Column F
     destination_type = Column(String) # Port, Airport, Terminal
-    cargo_type = Column(String, index=True) # Column G (Mode)
+    cargo_type = Column(String) # Column G (Mode)
     commodity = Column(String) # Specific item
     cargo_specification = Column(String, nullable=True) # Handling / Container Spec
     packing_type = Column(String) # Pallets, Crates, etc.
@@ -47,10 +47,10 @@ class MarketplaceRequest(Base):
     destination_locode = Column(String, nullable=True) # UNLOCODE e.g. "USLAX"
     hs_code = Column(String, nullable=True)            # Harmonized System code
     special_requirements = Column(String) # Column J
-    incoterms = Column(String, index=True) # Column K
+    incoterms = Column(String) # Column K
     currency = Column(String, default="USD") # Column L
     surcharge_details = Column(JSON, nullable=True)
-    status = Column(String, default="OPEN", index=True) # Column M
+    status = Column(String, default="OPEN") # Column M
     quotation_count = Column(Integer, default=0) # Column N
     submitted_at = Column(DateTime, default=_utcnow, index=True) # Column O
     closed_at = Column(DateTime, nullable=True) # Column P
@@ -58,7 +58,7 @@ class MarketplaceRequest(Base):
     
     # F2F: set when a forwarder posts this request (not a shipper)
     is_f2f = Column(Boolean, default=False, nullable=False)
-    posted_by_forwarder_id = Column(String, nullable=True, index=True)  # forwarder_id of poster
+    posted_by_forwarder_id = Column(String, nullable=True)  # forwarder_id of poster
 
     # Timestamps for dashboard logic
     created_at = Column(DateTime, default=_utcnow)
@@ -66,9 +66,13 @@ class MarketplaceRequest(Base):
 
     # Indices for Sovereign Dashboard Performance
     __table_args__ = (
-        Index("idx_request_sovereign_user", "user_sovereign_id"),
+        # "My requests" lists and counts: WHERE user_sovereign_id = ? ORDER BY submitted_at DESC
+        Index("idx_request_sovereign_submitted", user_sovereign_id, submitted_at.desc()),
         Index("idx_request_status_submitted", "status", "submitted_at"),
-        Index("idx_request_f2f", "is_f2f", "posted_by_forwarder_id"),
+        # Forwarder inbox: status = 'OPEN' ORDER BY [is_f2f DESC,] submitted_at DESC LIMIT 20
+        Index("idx_request_open_submitted", submitted_at.desc(), postgresql_where=text("status = 'OPEN'")),
+        Index("idx_request_open_f2f_submitted", is_f2f.desc(), submitted_at.desc(),
+              postgresql_where=text("status = 'OPEN'")),
     )
 
 class MarketplaceBid(Base):
@@ -79,19 +83,19 @@ class MarketplaceBid(Base):
     __tablename__ = "quotations"
 
     # Database ID - SERIAL parity
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     
     # n8n UNIQUE Fields
     quotation_id = Column(String, unique=True, index=True) # Column A
-    request_id = Column(String, ForeignKey("requests.request_id", ondelete="CASCADE"), index=True) # Column B
-    forwarder_id = Column(String, index=True) # Column C (n8n generated)
-    forwarder_email = Column(String, index=True) # Column D
-    forwarder_company = Column(String, index=True) # Column D
-    total_price = Column(Numeric(12, 2), index=True) # Column E - Precise Pricing
-    currency = Column(String, default="USD", index=True) # Column F
-    transit_days = Column(Integer, index=True) # Column G
+    request_id = Column(String, ForeignKey("requests.request_id", ondelete="CASCADE")) # Column B
+    forwarder_id = Column(String) # Column C (n8n generated)
+    forwarder_email = Column(String) # Column D
+    forwarder_company = Column(String) # Column D
+    total_price = Column(Numeric(12, 2)) # Column E - Precise Pricing
+    currency = Column(String, default="USD") # Column F
+    transit_days = Column(Integer) # Column G
     validity_days = Column(Integer, default=7) # Column H
-    carrier = Column(String, index=True) # Column I
+    carrier = Column(String) # Column I
     service_type = Column(String) # Column J
     surcharges = Column(JSON, nullable=True) # Column K
     is_hazardous = Column(Boolean, default=False)
@@ -100,13 +104,20 @@ class MarketplaceBid(Base):
     notes = Column(String, nullable=True) # Column M
     ai_summary = Column(String, nullable=True) # Column N
     raw_email = Column(String, nullable=True) # Column O
-    status = Column(String, default="ACTIVE", index=True) # Column P
-    received_at = Column(DateTime, default=_utcnow, index=True) # Column Q
+    status = Column(String, default="ACTIVE") # Column P
+    received_at = Column(DateTime, default=_utcnow) # Column Q
     expires_at = Column(DateTime, nullable=True) # Column R
     
     # Timestamps
     created_at = Column(DateTime, default=_utcnow)
 
+    __table_args__ = (
+        # Quotes of a request, cheapest first; also backs the request_id FK cascade
+        Index("idx_quote_request_price", "request_id", "total_price"),
+        # Forwarder inbox anti-join: request_id NOT IN (quotes by this forwarder) — index-only
+        Index("idx_quote_forwarder_request", "forwarder_id", "request_id"),
+    )
+
 class ForwarderBidStatus(Base):
     """
     Tracks every interaction a forwarder has with a request.
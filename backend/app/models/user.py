@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Integer
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.session import Base
@@ -38,3 +38,6 @@ class User(Base):
     # Marketplace Relationships (Clean Slate Protocol)
     # The Sovereign Logistics OS focuses on User -> Request -> Quotation.
 
+
+# Case-insensitive login lookup: crud.user.get_by_email filters on lower(email)
+Index("idx_users_email_lower", func.lower(User.email))
@@ -0,0 +1,179 @@
+"""
+Vectorized freight estimates for POST /api/tools/freight-estimate/batch.
+
+Prices the whole cube origins × destinations × containers × commodities × goods values in one
+pass instead of one run_estimate() call per cell:
+
+  - per (origin, destination): sanctions, lane, EBS and route warnings come from
+    FreightTables.pair(), evaluated once per unique country pair (a 40 × 40 LOCODE matrix over
+    6 countries does 36 lookups, not 1,600); the fixed surcharge stack comes from
+    FreightTables.surcharges() per unique pair and equipment
+  - lane rates, container multipliers, commodity multipliers / DGF / duty and the customs
+    rate coefficients are NumPy arrays; the cube is a handful of broadcast operations
+  - customs fees are rounded per fee with their min/max clamps, exactly like run_estimate
+
+The arrays are rebuilt when the tariff tables are reloaded (matrix_for). The numbers match
+run_estimate() for every cell (scripts/bench_freight_matrix.py checks the whole cube). Output
+is NDJSON, one "lane" line per origin/destination pair followed by its "cell" lines (none when
+the pair is sanctioned), then a closing "done" line.
+"""
+import json
+import threading
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+import numpy as np
+from app.services.freight_tables import FreightTables
+
+
+class FreightMatrix:
+
+    def __init__(self, tables: FreightTables):
+        self.tables = tables
+
+        self._container_keys = {k: i for i, k in enumerate(tables.containers)}
+        self.cont_mul = np.array([c['mul'] for c in tables.containers.values()])
+
+        self._commodity_keys = {k: i for i, k in enumerate(tables.commodities)}
+        self.comm_mul = np.array([c['mul'] for c in tables.commodities.values()])
+        self.dgf = np.array([c['dgf'] for c in tables.commodities.values()], dtype=np.int64)
+        self.duty_base = np.array([c['duty_base'] for c in tables.commodities.values()])
+
+        # Customs: one row per authority, rate fees padded to the longest list (0 × value = 0)
+        self._customs_keys = {k: i for i, k in enumerate(tables.customs)}
+        self._customs_default = self._customs_keys['DEFAULT']
+        width = max(len(c.rates) for c in tables.customs.values()) or 1
+        shape = (len(tables.customs), width)
+        self.customs_fixed = np.array([c.fixed_total for c in tables.customs.values()], dtype=np.int64)
+        self.customs_rate, self.customs_min, self.customs_max = np.zeros(shape), np.full(shape, -np.inf), np.full(shape, np.inf)
+        for row, schedule in enumerate(tables.customs.values()):
+            for col, (rate, lo, hi) in enumerate(schedule.rates):
+                self.customs_rate[row, col], self.customs_min[row, col], self.customs_max[row, col] = rate, lo, hi
+
+    def price(self, origins: Sequence[str], destinations: Sequence[str], containers: Sequence[str],
+              commodities: Sequence[str], goods_values: Sequence[float]) -> dict:
+        """
+        Price the full cube. Returns the per-pair info (`pairs[o][d]`) and int64 arrays:
+        ocean_low/high/avg and surcharges_total / total_freight shaped (O, D, C, K),
+        customs_total and total_landed shaped (O, D, C, K, V). Blocked pairs hold zeros.
+        """
+        tables = self.tables
+        origin_cc = [o[:2].upper() for o in origins]
+        dest_cc = [d[:2].upper() for d in destinations]
+        unique: Dict[Tuple[str, str], int] = {}
+        pair_idx = np.array([[unique.setdefault((o, d), len(unique)) for d in dest_cc] for o in origin_cc])
+        infos = [tables.pair(o, d) for o, d in unique]
+        pairs = [[infos[u] for u in row] for row in pair_idx.tolist()]
+
+        c_keys = [tables.container_key(c.upper()) for c in containers]
+        k_idx = [self._commodity_keys[tables.commodity_key(k)] for k in commodities]
+
+        # ── per unique country pair: lane rates and the fixed surcharge stack per equipment ──
+        n_u = len(unique)
+        rates = np.zeros((n_u, 3))
+        fixed = np.zeros((n_u, len(c_keys)), dtype=np.int64)
+        open_pair = np.zeros(n_u, dtype=bool)
+        for u, ((o, d), info) in enumerate(zip(unique, infos)):
+            if info['cannot_ship']:
+                continue
+            lane = info['lane']
+            rates[u] = lane['low'], lane['high'], lane['avg']
+            fixed[u] = [tables.surcharges(o, d, c)['fixed_total'] for c in c_keys]
+            open_pair[u] = True
+        rates, fixed, open_lane = rates[pair_idx], fixed[pair_idx], open_pair[pair_idx]
+
+        cont_mul = self.cont_mul[[self._container_keys[c] for c in c_keys]]
+        comm_mul, dgf, duty_base = self.comm_mul[k_idx], self.dgf[k_idx], self.duty_base[k_idx]
+        value = np.asarray(goods_values, dtype=float)
+
+        # ── ocean freight (O, D, C, K) — same multiplication order as run_estimate ──
+        def ocean(rate: np.ndarray) -> np.ndarray:
+            return np.ceil(rate[:, :, None, None] * cont_mul[None, None, :, None] * comm_mul).astype(np.int64)
+
+        ocean_low, ocean_high, ocean_avg = ocean(rates[..., 0]), ocean(rates[..., 1]), ocean(rates[..., 2])
+
+        # ── surcharges: fixed stack per pair/equipment + CAF on ocean + DGF per commodity ──
+        caf = np.ceil(ocean_avg * tables.caf_rate).astype(np.int64)
+        surcharges = fixed[..., None] + caf + dgf
+        total_freight = ocean_avg + surcharges
+
+        # ── customs (D, K, V): fixed + Σ round(clamp(value × rate)) + round(value × duty) ──
+        d_idx = [self._customs_keys.get(cc, self._customs_default) for cc in dest_cc]
+        rated = value[None, :, None] * self.customs_rate[d_idx][:, None, :]
+        rated = np.clip(rated, self.customs_min[d_idx][:, None, :], self.customs_max[d_idx][:, None, :])
+        rate_fees = np.round(rated).sum(axis=2).astype(np.int64)
+        duty = np.round(value[None, :] * duty_base[:, None]).astype(np.int64)
+        customs_total = self.customs_fixed[d_idx][:, None, None] + rate_fees[:, None, :] + duty[None, :, :]
+
+        total_landed = total_freight[..., None] + customs_total[None, :, None, :, :]
+        blocked = ~open_lane
+        for arr in (ocean_low, ocean_high, ocean_avg, surcharges, total_freight):
+            arr[blocked] = 0
+        customs_total = np.broadcast_to(customs_total[None, :, None], total_landed.shape).copy()
+        customs_total[blocked] = 0
+        total_landed[blocked] = 0
+
+        return {
+            'pairs': pairs,
+            'ocean_low': ocean_low, 'ocean_high': ocean_high, 'ocean_avg': ocean_avg,
+            'surcharges_total': surcharges, 'total_freight': total_freight,
+            'customs_total': customs_total, 'total_landed': total_landed,
+        }
+
+    def ndjson(self, origins: Sequence[str], destinations: Sequence[str], containers: Sequence[str],
+               commodities: Sequence[str], goods_values: Sequence[float]) -> Iterator[str]:
+        """NDJSON for the cube, one chunk per origin/destination pair (lane line + its cells)."""
+        cube = self.price(origins, destinations, containers, commodities, goods_values)
+        dumps = json.dumps
+        o_json = [dumps(o.upper(), ensure_ascii=False) for o in origins]
+        d_json = [dumps(d.upper(), ensure_ascii=False) for d in destinations]
+        c_json = [dumps(c.upper()) for c in containers]
+        k_json = [dumps(k, ensure_ascii=False) for k in commodities]
+        v_json = [dumps(float(v)) for v in goods_values]
+        cells = blocked = 0
+
+        for i, row in enumerate(cube['pairs']):
+            for j, pair in enumerate(row):
+                head = {'type': 'lane', 'origin': origins[i].upper(), 'destination': destinations[j].upper()}
+                if pair['cannot_ship']:
+                    blocked += 1
+                    yield dumps({**head, 'cannot_ship': True, 'reason': pair['reason']}, ensure_ascii=False) + "\n"
+                    continue
+                lane = pair['lane']
+                lines = [dumps({
+                    **head, 'cannot_ship': False, 'via': lane['via'], 'transit_days': lane['transit'],
+                    'data_source': self.tables.data_source, 'tariff_version': self.tables.version,
+                    'warnings': list(pair['warnings']),
+                }, ensure_ascii=False)]
+                pair_key = f'{{"type": "cell", "origin": {o_json[i]}, "destination": {d_json[j]}, '
+                low, high, avg = cube['ocean_low'][i, j].tolist(), cube['ocean_high'][i, j].tolist(), cube['ocean_avg'][i, j].tolist()
+                sur, freight = cube['surcharges_total'][i, j].tolist(), cube['total_freight'][i, j].tolist()
+                customs, landed = cube['customs_total'][i, j].tolist(), cube['total_landed'][i, j].tolist()
+                for c, c_label in enumerate(c_json):
+                    for k, k_label in enumerate(k_json):
+                        prefix = (
+                            f'{pair_key}"container_type": {c_label}, "commodity": {k_label}, '
+                            f'"ocean_low": {low[c][k]}, "ocean_high": {high[c][k]}, "ocean_avg": {avg[c][k]}, '
+                            f'"surcharges_total": {sur[c][k]}, "total_freight": {freight[c][k]}, '
+                        )
+                        customs_ck, landed_ck = customs[c][k], landed[c][k]
+                        lines.extend(
+                            f'{prefix}"goods_value": {v_label}, "customs_total": {customs_ck[v]}, "total_landed": {landed_ck[v]}}}'
+                            for v, v_label in enumerate(v_json)
+                        )
+                cells += len(lines) - 1
+                lines.append("")
+                yield "\n".join(lines)
+
+        yield dumps({'type': 'done', 'lanes': len(origins) * len(destinations), 'blocked': blocked, 'cells': cells}) + "\n"
+
+
+_matrix: Optional[FreightMatrix] = None
+_matrix_lock = threading.Lock()
+
+
+def matrix_for(tables: FreightTables) -> FreightMatrix:
+    """The matrix for this tariff version, rebuilt once after a reload."""
+    global _matrix
+    with _matrix_lock:
+        if _matrix is None or _matrix.tables is not tables:
+            _matrix = FreightMatrix(tables)
+        return _matrix
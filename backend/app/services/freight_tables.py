@@ -0,0 +1,207 @@
+"""
+Freight tariff tables shared by the estimator (tools.run_estimate) and the batch matrix
+(app/services/freight_matrix.py), compiled from the versioned data file
+app/data/freight_tariffs.json instead of being rebuilt with branching logic per estimate:
+
+  - pair(orig_cc, dest_cc): sanctions, lane, EBS and route warnings for a country pair
+  - surcharges(orig_cc, dest_cc, container): the fixed surcharge stack (BAF, EBS, THC,
+    documentation) for a pair and equipment; CAF and DGF depend on the cargo and are added
+    by the caller
+  - customs[dest_cc]: fixed amounts plus linear rate coefficients with optional min/max
+    clamps (US MPF). Each fee is rounded on its own, so the customs total is
+    fixed_total + Σ round(clamp(goods_value × rate)) + duty
+Pair and surcharge rows are compiled on first use and memoized (bounded), so a repeat estimate
+is a few dict lookups.
+
+tariff_store.current() re-reads the file when its mtime changes (checked at most every
+FREIGHT_TARIFF_CHECK_INTERVAL seconds), so an edited tariff goes live on every worker without
+a restart. A file that fails to load keeps the previous tables in service.
+"""
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from app.core.config import settings
+from app.services.lanes import UNLISTED_LANE, country_lane
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_FILE = Path(__file__).resolve().parent.parent / "data" / "freight_tariffs.json"
+_MAX_MEMO = 65536    # pair / surcharge rows kept per table version
+
+
+class CustomsSchedule:
+    """One customs authority: fee line items in display order, fixed part pre-summed."""
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.label: str = raw['label']
+        self.regulatory: List[str] = raw['regulatory']
+        self.items: List[Tuple[str, Optional[int], int]] = []       # (label, fixed amount, rate index)
+        self.rates: List[Tuple[float, float, float]] = []           # (rate, min, max)
+        self.fixed_total = 0
+        for fee in raw['fees']:
+            if 'amount' in fee:
+                self.items.append((fee['label'], fee['amount'], -1))
+                self.fixed_total += fee['amount']
+            else:
+                self.items.append((fee['label'], None, len(self.rates)))
+                self.rates.append((float(fee['rate']), float(fee.get('min', float('-inf'))),
+                                   float(fee.get('max', float('inf')))))
+
+    def fees(self, goods_value: float) -> Tuple[List[Dict[str, Any]], int]:
+        """Line items and their total for `goods_value` (duty not included)."""
+        rated = [round(min(max(goods_value * rate, lo), hi)) for rate, lo, hi in self.rates]
+        items = [
+            {'label': label, 'amount': fixed if fixed is not None else rated[i]}
+            for label, fixed, i in self.items
+        ]
+        return items, self.fixed_total + sum(rated)
+
+
+class FreightTables:
+    """One compiled version of the tariff file. Immutable once built apart from its memos."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.version: str = data['version']
+        self.data_source: str = data['data_source']
+        self.sanctioned: Dict[str, str] = data['sanctioned']
+        groups = {name: frozenset(ccs) for name, ccs in data['country_groups'].items()}
+
+        def countries(ref) -> Optional[FrozenSet[str]]:
+            if ref is None:
+                return None
+            return groups[ref] if isinstance(ref, str) else frozenset(ref)
+
+        # (origins, destinations, either) — None matches any country
+        self._warning_rules = [
+            (countries(r.get('origins')), countries(r.get('destinations')), countries(r.get('either')), r['text'])
+            for r in data['warnings']
+        ]
+        self._unlisted_warning: str = data['unlisted_lane_warning']
+
+        self.containers: Dict[str, dict] = data['containers']
+        self.default_container: str = data['default_container']
+        self.commodities: Dict[str, dict] = data['commodities']
+        self.default_commodity: str = data['default_commodity']
+
+        surcharges = data['surcharges']
+        self._baf_tiers = [(t['above'], t) for t in surcharges['baf']]
+        self._ebs_amount: int = surcharges['ebs']['amount']
+        self._ebs_between = tuple(countries(g) for g in surcharges['ebs']['between'])
+        self.caf_rate: float = surcharges['caf_rate']
+        self.documentation: Dict[str, int] = surcharges['documentation']
+        self.documentation_total = sum(self.documentation.values())
+
+        self.duty_label: str = data['duty_label']
+        self.customs = {cc: CustomsSchedule(raw) for cc, raw in data['customs'].items()}
+        self.default_customs = self.customs['DEFAULT']
+        for key, table in (('default_container', self.containers), ('default_commodity', self.commodities)):
+            if data[key] not in table:
+                raise ValueError(f"{key} {data[key]!r} is not defined")
+        if self._baf_tiers[-1][0] is not None:
+            raise ValueError("the last BAF tier must have \"above\": null")
+
+        self._pairs: Dict[Tuple[str, str], dict] = {}
+        self._surcharges: Dict[Tuple[str, str, str], dict] = {}
+
+    def container_key(self, container: str) -> str:
+        return container if container in self.containers else self.default_container
+
+    def commodity_key(self, commodity: str) -> str:
+        return commodity if commodity in self.commodities else self.default_commodity
+
+    def customs_for(self, dest_cc: str) -> CustomsSchedule:
+        return self.customs.get(dest_cc, self.default_customs)
+
+    def warnings_for(self, orig_cc: str, dest_cc: str) -> List[str]:
+        return [
+            text for origins, dests, either, text in self._warning_rules
+            if (origins is None or orig_cc in origins) and (dests is None or dest_cc in dests)
+            and (either is None or orig_cc in either or dest_cc in either)
+        ]
+
+    def _compile_pair(self, orig_cc: str, dest_cc: str) -> dict:
+        if orig_cc in self.sanctioned:
+            return {'cannot_ship': True, 'reason': f'Origin country blocked. {self.sanctioned[orig_cc]}'}
+        if dest_cc in self.sanctioned:
+            return {'cannot_ship': True, 'reason': f'Destination country blocked. {self.sanctioned[dest_cc]}'}
+        lane = country_lane(orig_cc, dest_cc)
+        warnings = self.warnings_for(orig_cc, dest_cc)
+        if not lane:
+            lane = UNLISTED_LANE
+            warnings.append(self._unlisted_warning.format(orig=orig_cc, dest=dest_cc))
+        a, b = self._ebs_between
+        ebs = self._ebs_amount if (orig_cc in a and dest_cc in b) or (dest_cc in a and orig_cc in b) else 0
+        return {'cannot_ship': False, 'lane': lane, 'lane_found': lane is not UNLISTED_LANE,
+                'ebs': ebs, 'warnings': tuple(warnings)}
+
+    def pair(self, orig_cc: str, dest_cc: str) -> dict:
+        """Sanctions verdict, or lane + EBS + warnings, for a country pair (memoized)."""
+        key = (orig_cc, dest_cc)
+        row = self._pairs.get(key)
+        if row is None:
+            if len(self._pairs) >= _MAX_MEMO:
+                self._pairs.clear()
+            row = self._pairs[key] = self._compile_pair(orig_cc, dest_cc)
+        return row
+
+    def surcharges(self, orig_cc: str, dest_cc: str, container: str) -> dict:
+        """Cargo-independent surcharges for an open pair and equipment key, plus their total."""
+        key = (orig_cc, dest_cc, container)
+        row = self._surcharges.get(key)
+        if row is None:
+            pair = self.pair(orig_cc, dest_cc)
+            avg = pair['lane']['avg']
+            tier = next(t for above, t in self._baf_tiers if above is None or avg > above)
+            cont = self.containers[container]
+            baf = tier.get(container, tier['other'])
+            row = {'baf': baf, 'ebs': pair['ebs'], 'thc_o': cont['thc_o'], 'thc_d': cont['thc_d']}
+            row['fixed_total'] = baf + pair['ebs'] + cont['thc_o'] + cont['thc_d'] + self.documentation_total
+            if len(self._surcharges) >= _MAX_MEMO:
+                self._surcharges.clear()
+            self._surcharges[key] = row
+        return row
+
+
+def load_tables(path: Path) -> FreightTables:
+    return FreightTables(json.loads(path.read_text(encoding="utf-8")))
+
+
+class TariffStore:
+    """Holds the live FreightTables and swaps in a new version when the data file changes."""
+
+    def __init__(self, path: Path, check_interval: float):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()       # the batch endpoint prices in the threadpool
+        self._mtime = path.stat().st_mtime
+        self._tables = load_tables(path)    # a broken file at startup should fail loudly
+        self._checked = time.monotonic()
+        logger.info(f"[FREIGHT] Tariff tables {self._tables.version} loaded from {path.name}")
+
+    def current(self) -> FreightTables:
+        if time.monotonic() - self._checked >= self.check_interval:
+            self.reload()
+        return self._tables
+
+    def reload(self, force: bool = False) -> FreightTables:
+        """Re-read the data file if it changed (or always, with force); keep the old tables on error."""
+        with self._lock:
+            self._checked = time.monotonic()
+            try:
+                mtime = self.path.stat().st_mtime
+                if force or mtime != self._mtime:
+                    tables = load_tables(self.path)
+                    logger.info(f"[FREIGHT] Tariff tables {self._tables.version} → {tables.version}")
+                    self._tables, self._mtime = tables, mtime
+            except Exception as e:
+                logger.error(f"[FREIGHT] Tariff reload from {self.path} failed, keeping {self._tables.version}: {e}")
+        return self._tables
+
+
+tariff_store = TariffStore(
+    Path(settings.FREIGHT_TARIFF_FILE) if settings.FREIGHT_TARIFF_FILE else _DEFAULT_FILE,
+    settings.FREIGHT_TARIFF_CHECK_INTERVAL,
+)
@@ -0,0 +1,183 @@
+"""
+BM25 search over HS headings, shared by /api/references/commodities/search and the WCO
+fallback of /api/tools/hs-code-classify.
+
+Built once per worker at import. Replaces the per-request `q in name.lower()` scan:
+  - tokenizer: lowercase alphanumerics, stop-words dropped, light suffix stemming
+    ("garments" → garment, "batteries" → battery, "salted" → salt)
+  - synonyms from app/data/hs_synonyms.json expand a query term ("clothes" → garment,
+    apparel, ...) at SYNONYM_WEIGHT of the original term
+  - BM25 (k1=1.2, b=0.75) with per-posting weights precomputed, so a query is a few dict adds
+  - chapter boost: headings in the chapter that collects the most evidence for the query
+    get up to CHAPTER_BOOST extra ("frozen fish" favours chapter 03 over frozen meat in 02)
+  - type-ahead: the last query word also matches heading words it is a prefix of ("cot" →
+    cotton, cottonseed), found by bisecting the sorted word list, at PREFIX_WEIGHT
+  - digit queries ("8517", "85") match HS codes by prefix
+
+`confidence` is the score as a share of the best score the query could reach (each query term,
+or its strongest synonym, saturated in a short heading), so it means the same thing across queries.
+"""
+import heapq
+import json
+import math
+import re
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from app.data.hs_codes import HS_HEADINGS
+
+K1 = 1.2
+B = 0.75
+SYNONYM_WEIGHT = 0.6
+PREFIX_WEIGHT = 0.5
+MIN_PREFIX = 3
+CHAPTER_BOOST = 0.25
+
+_SYNONYMS_FILE = Path(__file__).resolve().parent.parent / "data" / "hs_synonyms.json"
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it", "not",
+    "of", "on", "or", "other", "others", "the", "than", "that", "their", "to", "whether", "with",
+    "without", "nes", "etc",
+})
+
+
+def stem(word: str) -> str:
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith(("ies", "ied")) and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("sses"):
+        return word[:-2]
+    if word.endswith("es") and word[:-2].endswith(("s", "x", "z", "ch", "sh")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    for suffix, min_stem in (("ing", 4), ("ed", 3)):
+        base = word[:-len(suffix)]
+        if word.endswith(suffix) and len(base) >= min_stem and any(v in base for v in "aeiouy"):
+            return base
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(t) for t in _TOKEN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def load_synonyms(path: Path = _SYNONYMS_FILE) -> Dict[str, List[str]]:
+    """{stemmed term: [stemmed expansion terms]} from the JSON data file."""
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    synonyms: Dict[str, List[str]] = {}
+    for key, expansions in raw.items():
+        terms = {t for phrase in expansions for t in tokenize(phrase)}
+        for k in tokenize(key):
+            synonyms.setdefault(k, [])
+            synonyms[k].extend(t for t in terms if t != k and t not in synonyms[k])
+    return synonyms
+
+
+class HSIndex:
+
+    def __init__(self, headings: List[Dict[str, Any]], synonyms: Optional[Dict[str, List[str]]] = None):
+        self.headings = headings
+        self.synonyms = synonyms or {}
+        docs = [tokenize(h["name"]) for h in headings]
+        n = len(docs)
+        avg_len = sum(len(d) for d in docs) / max(n, 1)
+
+        doc_freq: Dict[str, int] = {}
+        for tokens in docs:
+            for t in set(tokens):
+                doc_freq[t] = doc_freq.get(t, 0) + 1
+        self.idf = {t: math.log(1 + (n - df + 0.5) / (df + 0.5)) for t, df in doc_freq.items()}
+
+        # term → [(doc id, precomputed BM25 contribution)]
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        for i, tokens in enumerate(docs):
+            norm = K1 * (1 - B + B * len(tokens) / avg_len)
+            counts: Dict[str, int] = {}
+            for t in tokens:
+                counts[t] = counts.get(t, 0) + 1
+            for t, tf in counts.items():
+                self.postings.setdefault(t, []).append((i, self.idf[t] * tf * (K1 + 1) / (tf + norm)))
+        # sorted (surface word, stem) pairs for prefix lookup of a partially typed word
+        words = {(w, stem(w)) for h in headings for w in _TOKEN.findall(h["name"].lower()) if w not in STOP_WORDS}
+        self._words = sorted(words)
+        self._word_keys = [w for w, _ in self._words]
+        self.chapters = [h.get("chapter") or h["code"][:2] for h in headings]
+        by_code = sorted((h["code"].replace(".", ""), i) for i, h in enumerate(headings))
+        self._code_keys = [c for c, _ in by_code]
+        self._code_ids = [i for _, i in by_code]
+
+    def _term_ceiling(self, t: str, w: float) -> float:
+        """Highest contribution term `t` at weight `w` can make (tf saturated, shortest heading)."""
+        return w * self.idf.get(t, 0.0) * (K1 + 1)
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        """Stems of the heading words that start with `prefix`."""
+        lo = bisect_left(self._word_keys, prefix)
+        hi = bisect_left(self._word_keys, prefix + "{", lo)     # "{" sorts right after "z"
+        return list(dict.fromkeys(t for _, t in self._words[lo:hi]))
+
+    def _query_terms(self, q: str) -> Tuple[Dict[str, float], float]:
+        """Weighted query terms (originals + synonyms + prefix completions) and the best score they could reach."""
+        weights: Dict[str, float] = {}
+        originals = tokenize(q)
+        for t in originals:
+            weights[t] = 1.0
+        words = _TOKEN.findall(q.lower())
+        partial = words[-1] if words and len(words[-1]) >= MIN_PREFIX and words[-1] not in STOP_WORDS else None
+        ceiling = 0.0
+        for t in dict.fromkeys(originals):
+            best = self._term_ceiling(t, 1.0)
+            for s in self.synonyms.get(t, ()):
+                weights.setdefault(s, SYNONYM_WEIGHT)
+                best = max(best, self._term_ceiling(s, weights[s]))
+            if partial is not None and t == stem(partial):
+                for p in self._prefix_terms(partial):
+                    weights.setdefault(p, PREFIX_WEIGHT)
+                    best = max(best, self._term_ceiling(p, weights[p]))
+            ceiling += best
+        return weights, ceiling
+
+    def search(self, q: str, limit: int = 6) -> List[Dict[str, Any]]:
+        """Top headings as {"heading", "score", "confidence"} (confidence 0-99), best first."""
+        q = q.strip()
+        if not q:
+            return []
+        digits = q.replace(".", "")
+        if digits.isdigit():
+            lo = bisect_left(self._code_keys, digits)
+            hi = bisect_left(self._code_keys, digits + ":", lo)   # ":" sorts right after "9"
+            return [
+                {"heading": self.headings[i], "score": 1.0, "confidence": 99.0}
+                for i in self._code_ids[lo:min(hi, lo + limit)]
+            ]
+
+        weights, ceiling = self._query_terms(q)
+        scores: Dict[int, float] = {}
+        get = scores.get
+        for t, w in weights.items():
+            for i, contribution in self.postings.get(t, ()):
+                scores[i] = get(i, 0.0) + w * contribution
+        if not scores:
+            return []
+
+        chapters = self.chapters
+        chapter_totals: Dict[str, float] = {}
+        for i, s in scores.items():
+            c = chapters[i]
+            chapter_totals[c] = chapter_totals.get(c, 0.0) + s
+        top_chapter = max(chapter_totals.values())
+        boost = {c: 1 + CHAPTER_BOOST * total / top_chapter for c, total in chapter_totals.items()}
+
+        ceiling *= 1 + CHAPTER_BOOST
+        best = heapq.nsmallest(limit, ((-s * boost[chapters[i]], i) for i, s in scores.items()))
+        best = [(i, -neg) for neg, i in best]
+        return [
+            {"heading": self.headings[i], "score": round(s, 3), "confidence": round(min(99.0, 100 * s / ceiling), 1)}
+            for i, s in best
+        ]
+
+
+hs_index = HSIndex(HS_HEADINGS, load_synonyms())
@@ -0,0 +1,239 @@
+"""
+Trade-lane resolution shared by the instant-quote engine (quotes.py) and the freight
+estimator (tools.py). Everything is compiled once at import:
+
+  - region lookup: LOCODE / 3-char prefix / country code → region through dict lookups
+    (was: upper-case + startswith scan over five lists, up to 8 times per quote), memoized
+    per input string
+  - QUOTE_LANE_TABLE: (origin region, destination region) → lane pricing for every pair,
+    including the "International" defaults, so quote_lane() is two region lookups + one get
+  - RATE_TABLE: "CN-US" style country pairs with the reverse direction pre-filled, so
+    country_lane() is a single get instead of forward + reverse formatting and lookups
+
+scripts/bench_lanes.py resolves 1M pairs through the old and new paths.
+"""
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+# ═══════════════════════════════════════════════════════
+# INSTANT-QUOTE REGIONS
+# Entries are country codes, LOCODEs or city prefixes; an input matches an entry it starts with.
+# ═══════════════════════════════════════════════════════
+ASIA = ["CN", "SHA", "CNSHA", "CNNBO", "CNNGB", "CNTXG", "CNQIN",
+        "SG", "SGSIN", "JP", "JPOSA", "JPTYO", "KR", "KRPUS",
+        "TW", "TWKEL", "HK", "HKHKG", "VN", "VNSGN", "TH", "THBKK",
+        "MY", "MYPKG", "ID", "IDJKT", "PH", "PHMNL"]
+
+US_WEST = ["USLAX", "USLGB", "USSEA", "USPOR", "USOAK"]
+US_EAST = ["USNYC", "USSAV", "USHOU", "USBLT", "USORF", "USBOS", "USCHA"]
+EUROPE  = ["NLRTM", "DEHAM", "BEANR", "GBFXT", "ESBCN", "FRMRS",
+           "ITGOA", "PLGDY", "SEGOT", "DKAAR", "NL", "DE", "GB", "FR"]
+MIDEAST = ["AEDXB", "AEJEA", "SADAM", "SAJED", "OMKCT", "QADOH",
+           "KWKWI", "BHMNA", "AE", "SA", "OM", "QA", "KW"]
+
+# Match priority when an input could fall in more than one region (first wins)
+REGIONS = (("ASIA", ASIA), ("EUROPE", EUROPE), ("US_WEST", US_WEST), ("US_EAST", US_EAST), ("MIDEAST", MIDEAST))
+
+_TRANS_PAC_WB = {"base": 2900, "transit": (34, 22, 16), "lane": "Trans-Pacific Westbound",
+                 "red_sea": False, "note": "Stable rates; Lunar New Year volumes impacting February schedules"}
+_TRANS_PAC_EC = {"base": 4600, "transit": (42, 30, 24), "lane": "Trans-Pacific East Coast (All-Water)",
+                 "red_sea": False, "note": "All-water route via Panama; strong demand from US importers"}
+_ASIA_EUROPE = {"base": 4100, "transit": (40, 28, 22), "lane": "Asia-Europe",
+                "red_sea": True, "note": "Red Sea diversion via Cape of Good Hope adding 10-14 days and $600-800 surcharge"}
+_ASIA_MIDEAST = {"base": 2200, "transit": (18, 12, 9), "lane": "Asia-Middle East",
+                 "red_sea": True, "note": "Red Sea situation: some carriers re-routing via Cape; confirm routing with carrier"}
+_ASIA_INTL = {"base": 3200, "transit": (35, 25, 18), "lane": "Asia-International",
+              "red_sea": False, "note": "Market rate for international routing"}
+_EUROPE_NA = {"base": 2600, "transit": (18, 14, 10), "lane": "Europe-North America",
+              "red_sea": False, "note": "Transatlantic rates competitive; Hamburg and Rotterdam main hubs"}
+_EUROPE_INTL = {"base": 2800, "transit": (30, 22, 16), "lane": "Europe-International",
+                "red_sea": False, "note": "Stable transatlantic market conditions"}
+_TRANS_PAC_EB = {"base": 1200, "transit": (25, 18, 14), "lane": "Trans-Pacific Eastbound",
+                 "red_sea": False, "note": "Backhaul rates — US exports at discount vs import lane"}
+_NA_EUROPE = {"base": 2400, "transit": (16, 12, 9), "lane": "North America-Europe",
+              "red_sea": False, "note": "Competitive transatlantic corridor; multiple direct services available"}
+DEFAULT_QUOTE_LANE = {"base": 3000, "transit": (35, 25, 18), "lane": "International",
+                      "red_sea": False, "note": "International routing — confirm exact schedule with carrier"}
+
+# (origin region, destination region) → lane; None = any region (incl. unmatched)
+_QUOTE_LANE_RULES = [
+    ("ASIA", "US_WEST", _TRANS_PAC_WB),
+    ("ASIA", "US_EAST", _TRANS_PAC_EC),
+    ("ASIA", "EUROPE", _ASIA_EUROPE),
+    ("ASIA", "MIDEAST", _ASIA_MIDEAST),
+    ("ASIA", None, _ASIA_INTL),
+    ("EUROPE", "US_WEST", _EUROPE_NA),
+    ("EUROPE", "US_EAST", _EUROPE_NA),
+    ("EUROPE", None, _EUROPE_INTL),
+    ("US_WEST", "ASIA", _TRANS_PAC_EB),
+    ("US_EAST", "ASIA", _TRANS_PAC_EB),
+    ("US_WEST", "EUROPE", _NA_EUROPE),
+    ("US_EAST", "EUROPE", _NA_EUROPE),
+]
+
+
+# ═══════════════════════════════════════════════════════
+# Q1 2025 LANE RATES (40FT spot basis, USD)
+# Source: Drewry WCI, SCFI, Xeneta, Freightos Baltic Index Q1 2025
+# ═══════════════════════════════════════════════════════
+LANES: Dict[str, dict] = {
+    # ── CHINA EXPORTS ──
+    'CN-US': {'low': 2800, 'high': 4800, 'avg': 3800, 'transit': 16, 'via': 'Trans-Pacific Direct'},
+    'CN-CA': {'low': 2600, 'high': 4500, 'avg': 3600, 'transit': 18, 'via': 'Trans-Pacific'},
+    'CN-MX': {'low': 3000, 'high': 5000, 'avg': 4000, 'transit': 21, 'via': 'Trans-Pacific'},
+    'CN-DE': {'low': 3200, 'high': 5500, 'avg': 4200, 'transit': 28, 'via': 'Asia-Europe (Cape of Good Hope)'},
+    'CN-NL': {'low': 3100, 'high': 5200, 'avg': 4000, 'transit': 27, 'via': 'Asia-Europe (Cape of Good Hope)'},
+    'CN-GB': {'low': 3300, 'high': 5600, 'avg': 4300, 'transit': 30, 'via': 'Asia-Europe (Cape of Good Hope)'},
+    'CN-FR': {'low': 3200, 'high': 5400, 'avg': 4100, 'transit': 29, 'via': 'Asia-Europe (Cape of Good Hope)'},
+    'CN-BE': {'low': 3100, 'high': 5300, 'avg': 4100, 'transit': 28, 'via': 'Asia-Europe (Cape of Good Hope)'},
+    'CN-IT': {'low': 3400, 'high': 5800, 'avg': 4500, 'transit': 32, 'via': 'Asia-Med (Cape of Good Hope)'},
+    'CN-ES': {'low': 3300, 'high': 5600, 'avg': 4400, 'transit': 31, 'via': 'Asia-Med (Cape of Good Hope)'},
+    'CN-TR': {'low': 3500, 'high': 6000, 'avg': 4700, 'transit': 34, 'via': 'Asia-Med (Cape)'},
+    'CN-PL': {'low': 3200, 'high': 5500, 'avg': 4200, 'transit': 30, 'via': 'Asia-Europe (Cape)'},
+    'CN-EG': {'low': 2800, 'high': 4500, 'avg': 3500, 'transit': 24, 'via': 'Suez Canal (risk-flagged)'},
+    'CN-SA': {'low': 2000, 'high': 3500, 'avg': 2600, 'transit': 18, 'via': 'Middle East'},
+    'CN-AE': {'low': 1800, 'high': 3200, 'avg': 2400, 'transit': 16, 'via': 'Middle East'},
+    'CN-IN': {'low': 900,  'high': 1800, 'avg': 1200, 'transit': 12, 'via': 'Intra-Asia'},
+    'CN-SG': {'low': 600,  'high': 1200, 'avg': 850,  'transit': 7,  'via': 'Intra-Asia'},
+    'CN-MY': {'low': 500,  'high': 1000, 'avg': 700,  'transit': 6,  'via': 'Intra-Asia'},
+    'CN-TH': {'low': 500,  'high': 1000, 'avg': 700,  'transit': 5,  'via': 'Intra-Asia'},
+    'CN-VN': {'low': 350,  'high': 800,  'avg': 500,  'transit': 4,  'via': 'Intra-Asia'},
+    'CN-JP': {'low': 400,  'high': 850,  'avg': 600,  'transit': 3,  'via': 'Intra-Asia'},
+    'CN-KR': {'low': 350,  'high': 750,  'avg': 500,  'transit': 3,  'via': 'Intra-Asia'},
+    'CN-AU': {'low': 1400, 'high': 2600, 'avg': 1900, 'transit': 14, 'via': 'Asia-Oceania'},
+    'CN-NZ': {'low': 1600, 'high': 3000, 'avg': 2200, 'transit': 17, 'via': 'Asia-Oceania'},
+    'CN-BR': {'low': 3500, 'high': 5500, 'avg': 4400, 'transit': 36, 'via': 'Trans-Pacific/South America'},
+    'CN-AR': {'low': 3800, 'high': 5800, 'avg': 4700, 'transit': 38, 'via': 'South America'},
+    'CN-ZA': {'low': 2000, 'high': 3500, 'avg': 2700, 'transit': 22, 'via': 'Africa'},
+    'CN-NG': {'low': 2800, 'high': 4500, 'avg': 3500, 'transit': 30, 'via': 'West Africa'},
+    'CN-KE': {'low': 2200, 'high': 3800, 'avg': 2900, 'transit': 25, 'via': 'East Africa'},
+    'CN-PK': {'low': 800,  'high': 1600, 'avg': 1100, 'transit': 10, 'via': 'Intra-Asia'},
+    'CN-BD': {'low': 700,  'high': 1400, 'avg': 1000, 'transit': 9,  'via': 'Intra-Asia'},
+    # ── INDIA EXPORTS ──
+    'IN-US': {'low': 3200, 'high': 5200, 'avg': 4000, 'transit': 26, 'via': 'Asia-Pacific/Suez'},
+    'IN-CA': {'low': 3000, 'high': 5000, 'avg': 3800, 'transit': 28, 'via': 'Asia-Pacific'},
+    'IN-DE': {'low': 2400, 'high': 4000, 'avg': 3000, 'transit': 22, 'via': 'Asia-Europe'},
+    'IN-NL': {'low': 2300, 'high': 3900, 'avg': 2900, 'transit': 22, 'via': 'Asia-Europe'},
+    'IN-GB': {'low': 2500, 'high': 4200, 'avg': 3200, 'transit': 24, 'via': 'Asia-Europe'},
+    'IN-AE': {'low': 400,  'high': 900,  'avg': 600,  'transit': 5,  'via': 'Middle East'},
+    'IN-SA': {'low': 500,  'high': 1100, 'avg': 750,  'transit': 6,  'via': 'Middle East'},
+    'IN-AU': {'low': 1800, 'high': 3000, 'avg': 2400, 'transit': 17, 'via': 'Oceania'},
+    'IN-SG': {'low': 500,  'high': 1100, 'avg': 750,  'transit': 7,  'via': 'Intra-Asia'},
+    'IN-CN': {'low': 800,  'high': 1600, 'avg': 1100, 'transit': 12, 'via': 'Intra-Asia'},
+    'IN-JP': {'low': 1000, 'high': 2000, 'avg': 1400, 'transit': 14, 'via': 'Intra-Asia'},
+    'IN-MY': {'low': 600,  'high': 1200, 'avg': 800,  'transit': 8,  'via': 'Intra-Asia'},
+    # ── EUROPE EXPORTS ──
+    'DE-US': {'low': 1800, 'high': 3200, 'avg': 2500, 'transit': 14, 'via': 'Trans-Atlantic'},
+    'NL-US': {'low': 1700, 'high': 3000, 'avg': 2400, 'transit': 13, 'via': 'Trans-Atlantic'},
+    'GB-US': {'low': 1800, 'high': 3200, 'avg': 2500, 'transit': 12, 'via': 'Trans-Atlantic'},
+    'FR-US': {'low': 1800, 'high': 3200, 'avg': 2500, 'transit': 13, 'via': 'Trans-Atlantic'},
+    'DE-CN': {'low': 800,  'high': 1600, 'avg': 1100, 'transit': 28, 'via': 'Europe-Asia (backhaul)'},
+    'NL-CN': {'low': 750,  'high': 1500, 'avg': 1000, 'transit': 27, 'via': 'Europe-Asia (backhaul)'},
+    'GB-CN': {'low': 800,  'high': 1600, 'avg': 1100, 'transit': 30, 'via': 'Europe-Asia (backhaul)'},
+    'DE-IN': {'low': 1800, 'high': 3000, 'avg': 2300, 'transit': 22, 'via': 'Europe-Asia'},
+    'NL-IN': {'low': 1700, 'high': 2900, 'avg': 2200, 'transit': 22, 'via': 'Europe-Asia'},
+    # ── US EXPORTS ──
+    'US-CN': {'low': 700,  'high': 1400, 'avg': 1000, 'transit': 16, 'via': 'Trans-Pacific (backhaul)'},
+    'US-DE': {'low': 1600, 'high': 2900, 'avg': 2200, 'transit': 14, 'via': 'Trans-Atlantic'},
+    'US-NL': {'low': 1500, 'high': 2800, 'avg': 2100, 'transit': 13, 'via': 'Trans-Atlantic'},
+    'US-GB': {'low': 1600, 'high': 2900, 'avg': 2200, 'transit': 12, 'via': 'Trans-Atlantic'},
+    'US-IN': {'low': 2800, 'high': 4500, 'avg': 3500, 'transit': 26, 'via': 'Trans-Pacific/Asia'},
+    'US-JP': {'low': 800,  'high': 1600, 'avg': 1200, 'transit': 12, 'via': 'Trans-Pacific'},
+    'US-KR': {'low': 800,  'high': 1600, 'avg': 1200, 'transit': 13, 'via': 'Trans-Pacific'},
+    'US-AU': {'low': 1400, 'high': 2500, 'avg': 1900, 'transit': 16, 'via': 'Trans-Pacific'},
+    'US-MX': {'low': 300,  'high': 800,  'avg': 500,  'transit': 4,  'via': 'Gulf/Pacific Coastwise'},
+    'US-CA': {'low': 400,  'high': 900,  'avg': 600,  'transit': 4,  'via': 'Coastwise'},
+    'US-BR': {'low': 2000, 'high': 3500, 'avg': 2700, 'transit': 18, 'via': 'South America'},
+    'US-AE': {'low': 2500, 'high': 4000, 'avg': 3200, 'transit': 26, 'via': 'Middle East'},
+    'US-SG': {'low': 2200, 'high': 3800, 'avg': 3000, 'transit': 18, 'via': 'Trans-Pacific'},
+    # ── SE ASIA EXPORTS ──
+    'SG-US': {'low': 2500, 'high': 4200, 'avg': 3200, 'transit': 18, 'via': 'Trans-Pacific'},
+    'SG-DE': {'low': 2800, 'high': 4500, 'avg': 3500, 'transit': 26, 'via': 'Asia-Europe'},
+    'VN-US': {'low': 3000, 'high': 5000, 'avg': 3800, 'transit': 18, 'via': 'Trans-Pacific'},
+    'VN-DE': {'low': 3000, 'high': 5000, 'avg': 3800, 'transit': 28, 'via': 'Asia-Europe'},
+    'TH-US': {'low': 2800, 'high': 4600, 'avg': 3600, 'transit': 20, 'via': 'Trans-Pacific'},
+    'MY-US': {'low': 2600, 'high': 4400, 'avg': 3400, 'transit': 18, 'via': 'Trans-Pacific'},
+    # ── JAPAN / KOREA ──
+    'JP-US': {'low': 1200, 'high': 2500, 'avg': 1800, 'transit': 12, 'via': 'Trans-Pacific'},
+    'KR-US': {'low': 1200, 'high': 2400, 'avg': 1700, 'transit': 12, 'via': 'Trans-Pacific'},
+    'JP-DE': {'low': 1800, 'high': 3200, 'avg': 2400, 'transit': 28, 'via': 'Asia-Europe'},
+    'KR-DE': {'low': 1800, 'high': 3200, 'avg': 2400, 'transit': 28, 'via': 'Asia-Europe'},
+    # ── MIDDLE EAST ──
+    'AE-US': {'low': 2800, 'high': 4500, 'avg': 3500, 'transit': 26, 'via': 'Middle East-Atlantic'},
+    'AE-DE': {'low': 1800, 'high': 3200, 'avg': 2400, 'transit': 18, 'via': 'Middle East-Europe'},
+    'AE-CN': {'low': 1600, 'high': 2800, 'avg': 2000, 'transit': 16, 'via': 'Middle East-Asia'},
+    'AE-IN': {'low': 400,  'high': 900,  'avg': 600,  'transit': 5,  'via': 'Intra-Middle East/Asia'},
+    'SA-US': {'low': 2800, 'high': 4500, 'avg': 3500, 'transit': 27, 'via': 'Middle East-Atlantic'},
+    # ── AUSTRALIA ──
+    'AU-US': {'low': 1400, 'high': 2600, 'avg': 1900, 'transit': 16, 'via': 'Trans-Pacific'},
+    'AU-CN': {'low': 1200, 'high': 2200, 'avg': 1600, 'transit': 14, 'via': 'Asia-Oceania'},
+    'AU-DE': {'low': 2000, 'high': 3500, 'avg': 2700, 'transit': 28, 'via': 'Oceania-Europe'},
+}
+
+
+# ═══════════════════════════════════════════════════════
+# COMPILED TABLES
+# ═══════════════════════════════════════════════════════
+def _compile_regions() -> Tuple[Tuple[int, ...], Dict[str, Tuple[int, str]]]:
+    """prefix → (priority, region); plus the distinct prefix lengths to probe, longest first."""
+    prefixes: Dict[str, Tuple[int, str]] = {}
+    for priority, (region, entries) in enumerate(REGIONS):
+        for entry in entries:
+            prefixes.setdefault(entry.upper(), (priority, region))
+    lengths = tuple(sorted({len(p) for p in prefixes}, reverse=True))
+    return lengths, prefixes
+
+
+def _compile_quote_lanes() -> Dict[Tuple[Optional[str], Optional[str]], dict]:
+    names = [region for region, _ in REGIONS] + [None]
+    table = {}
+    for origin in names:
+        for dest in names:
+            lane = DEFAULT_QUOTE_LANE
+            for rule_origin, rule_dest, rule_lane in _QUOTE_LANE_RULES:
+                if rule_origin == origin and rule_dest in (dest, None):
+                    lane = rule_lane
+                    break
+            table[(origin, dest)] = lane
+    return table
+
+
+def _compile_rates() -> Dict[str, dict]:
+    table = dict(LANES)
+    for key, lane in LANES.items():
+        orig, dest = key.split("-")
+        table.setdefault(f"{dest}-{orig}", lane)   # lanes are quoted both ways; a listed direction wins
+    return table
+
+
+_PREFIX_LENGTHS, _REGION_BY_PREFIX = _compile_regions()
+QUOTE_LANE_TABLE = _compile_quote_lanes()
+RATE_TABLE = _compile_rates()
+
+# Unknown lane — estimate from global average + distance heuristic
+UNLISTED_LANE = {
+    'low': 1500, 'high': 4000, 'avg': 2500,
+    'transit': 20, 'via': 'Estimated — lane not in primary database',
+}
+
+
+@lru_cache(maxsize=4096)
+def region_of(place: str) -> Optional[str]:
+    """Instant-quote region for a LOCODE / country code / city text, or None."""
+    code = place.upper()
+    best = None
+    for n in _PREFIX_LENGTHS:
+        hit = _REGION_BY_PREFIX.get(code[:n])
+        if hit is not None and (best is None or hit[0] < best[0]):
+            best = hit
+    return best[1] if best else None
+
+
+def quote_lane(origin: str, dest: str) -> dict:
+    """Base pricing and transit config for an instant-quote trade lane. Shared dict — read-only."""
+    return QUOTE_LANE_TABLE[(region_of(origin), region_of(dest))]
+
+
+def country_lane(orig_cc: str, dest_cc: str) -> Optional[dict]:
+    """Q1 2025 spot rates for a country pair (either direction), or None if the lane isn't listed."""
+    return RATE_TABLE.get(f"{orig_cc}-{dest_cc}")
@@ -0,0 +1,139 @@
+"""
+Offline stand-in for the OpenAI API, for load-testing the LLM gateway without a key or
+network (LLM_BACKEND=fake, or llm_gateway.use_backend(FakeLLM(...))).
+
+Shaped like AsyncOpenAI for the parts the app uses — chat.completions.create (plain, streamed
+with usage, JSON mode) and embeddings.create — and behaves like a slow upstream:
+  - latency: `first_token` seconds before the response starts, then `per_token` per token
+  - failures: a `failure_rate` share of calls raise a 503 (exercises retries and the breaker)
+  - embeddings: deterministic hashed bag-of-words vectors, so retrieval still ranks sensibly
+It never asks for tools. Tokens are estimated at ~4 characters each; `in_flight` / `peak`
+count the calls it is serving, so a load test can check the gateway's concurrency caps.
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import zlib
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+EMBED_DIM = 1536          # text-embedding-3-small
+_WORD = re.compile(r"[a-z0-9]+")
+
+_ANSWER = ("Offline answer from the fake LLM backend: under FOB the seller loads the goods on the "
+           "vessel and risk passes to the buyer once the cargo is on board.")
+_QUOTES = {"quotes": [
+    {"carrier_name": carrier, "price": price, "transit_time_days": days, "vessel_name": vessel,
+     "wisdom": "Offline quote from the fake LLM backend.",
+     "breakdown": {"base_rate": price - 600, "fuel_surcharge": 300, "port_fees": 200, "surcharges": 100, "total": price}}
+    for carrier, price, days, vessel in (("MSC", 2100, 34, "MSC OSCAR"), ("Maersk", 2600, 28, "MAERSK ESSEN"),
+                                         ("CMA CGM", 3300, 22, "CMA CGM JACQUES SAADE"))
+]}
+
+
+class FakeLLMError(Exception):
+    """Upstream failure as the openai client would report it (has a status_code)."""
+
+    def __init__(self, status_code: int = 503):
+        super().__init__(f"fake upstream error {status_code}")
+        self.status_code = status_code
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def embed_text(text: str, dim: int = EMBED_DIM) -> List[float]:
+    """Unit-length hashed bag-of-words vector: texts sharing words have a positive cosine."""
+    vector = [0.0] * dim
+    for word in _WORD.findall(text.lower()):
+        vector[zlib.crc32(word.encode()) % dim] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class _Completions:
+
+    def __init__(self, llm: "FakeLLM"):
+        self.llm = llm
+
+    async def create(self, model: str, messages: list, stream: bool = False, stream_options: Optional[dict] = None,
+                     response_format: Optional[dict] = None, **params) -> Any:
+        llm = self.llm
+        llm._start()
+        try:
+            await llm._latency()
+        except BaseException:
+            llm._finish()
+            raise
+        json_mode = (response_format or {}).get("type") == "json_object"
+        text = json.dumps(_QUOTES) if json_mode else _ANSWER
+        usage = SimpleNamespace(
+            prompt_tokens=_tokens(json.dumps(messages, default=str)), completion_tokens=_tokens(text),
+        )
+        if stream:
+            return self._stream(text, usage, bool(stream_options and stream_options.get("include_usage")))
+        try:
+            await asyncio.sleep(usage.completion_tokens * llm.per_token)
+        finally:
+            llm._finish()
+        message = SimpleNamespace(role="assistant", content=text, tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    async def _stream(self, text: str, usage: Any, include_usage: bool):
+        try:
+            for word in re.findall(r"\S+\s*", text):
+                await asyncio.sleep(_tokens(word) * self.llm.per_token)
+                yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=word, tool_calls=None))])
+            if include_usage:
+                yield SimpleNamespace(usage=usage, choices=[])
+        finally:
+            self.llm._finish()
+
+
+class _Embeddings:
+
+    def __init__(self, llm: "FakeLLM"):
+        self.llm = llm
+
+    async def create(self, model: str, input: List[str], **params) -> Any:
+        llm = self.llm
+        llm._start()
+        try:
+            await llm._latency()
+        finally:
+            llm._finish()
+        data = [SimpleNamespace(index=i, embedding=embed_text(text)) for i, text in enumerate(input)]
+        return SimpleNamespace(data=data, usage=SimpleNamespace(prompt_tokens=sum(_tokens(t) for t in input)))
+
+
+class FakeLLM:
+
+    def __init__(self, first_token: float = 0.3, per_token: float = 0.004, failure_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.first_token = first_token
+        self.per_token = per_token
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self.calls = self.failures = self.in_flight = self.peak = 0
+        self.chat = SimpleNamespace(completions=_Completions(self))
+        self.embeddings = _Embeddings(self)
+
+    def _start(self) -> None:
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+
+    def _finish(self) -> None:
+        self.in_flight -= 1
+
+    async def _latency(self) -> None:
+        await asyncio.sleep(self.first_token)
+        if self._random.random() < self.failure_rate:
+            self.failures += 1
+            raise FakeLLMError(503)
+
+    async def close(self) -> None:
+        pass
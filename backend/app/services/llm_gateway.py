@@ -0,0 +1,252 @@
+"""
+Shared LLM gateway — every OpenAI call in the app goes through `llm_gateway`:
+the agent (streamed turns), instant quotes (JSON chat) and the knowledge base (embeddings
+and answers).
+
+One pooled AsyncOpenAI client per worker, created on first use (the openai package is not
+imported at worker start). On top of it:
+  - concurrency: LLM_MAX_CONCURRENCY calls in flight per worker, plus a cap per feature
+    (FEATURES), so a burst of agent chats can't starve quotes
+  - deadlines: each call has a total budget (per feature, or `deadline=`) covering its
+    attempts and the backoff between them
+  - retries: connection errors, timeouts, 429 and 5xx are retried up to LLM_MAX_RETRIES
+    times with full-jitter exponential backoff; other errors (bad request, auth) are raised
+    as they are
+  - circuit breaker: after LLM_BREAKER_FAILURES consecutive failures, calls fail fast with
+    LLMUnavailable for LLM_BREAKER_COOLDOWN seconds, then one probe is let through
+  - metrics: calls by outcome, latency by kind, prompt/completion tokens and in-flight calls,
+    all per feature (app/core/metrics.py)
+
+A stream is only retried until its first chunk arrives; after that a failure ends it, since
+the caller may already have shown part of the answer. The stream keeps its slot until it ends.
+
+LLM_BACKEND=fake (or use_backend()) swaps in app/services/llm_fake.py, so the whole path can
+be load-tested offline — see scripts/load_llm_gateway.py.
+"""
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from app.core import metrics
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# feature: (calls in flight per worker, default deadline in seconds)
+FEATURES: Dict[str, Tuple[int, float]] = {
+    "agent": (8, 45.0),
+    "quotes": (4, 30.0),
+    "rag": (4, 30.0),
+}
+_DEFAULT_FEATURE = (4, 30.0)
+EMBED_MODEL = "text-embedding-3-small"
+_EMBED_BATCH = 256          # inputs per embeddings request
+_BACKOFF_BASE = 0.5
+_BACKOFF_CAP = 4.0
+
+
+class LLMUnavailable(Exception):
+    """The LLM could not be used for this call (circuit open, deadline passed, retries exhausted)."""
+
+
+def _retryable(e: Exception) -> bool:
+    if isinstance(e, asyncio.TimeoutError):
+        return True
+    status = getattr(e, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return type(e).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+async def _close_stream(stream: Any) -> None:
+    close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+    if close is not None:
+        await close()
+
+
+class LLMGateway:
+
+    def __init__(self):
+        self.breaker = CircuitBreaker("LLM", settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_COOLDOWN)
+        self._backend: Any = None
+        self._global = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self._features: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def configured(self) -> bool:
+        """False when there is no API key and no offline backend — callers skip the LLM entirely."""
+        return self._backend is not None or settings.LLM_BACKEND == "fake" or bool(settings.OPENAI_API_KEY)
+
+    def use_backend(self, backend: Any) -> None:
+        """Send every call to `backend` (anything shaped like AsyncOpenAI) — load tests and benchmarks."""
+        self._backend = backend
+
+    def embedding_space(self, model: str = EMBED_MODEL) -> str:
+        """Which vectors embed() returns with the current backend — persisted indexes must not mix them."""
+        if self._backend is None:
+            return f"FakeLLM/{model}" if settings.LLM_BACKEND == "fake" else model
+        name = type(self._backend)
+        return model if name.__module__.startswith("openai") else f"{name.__name__}/{model}"
+
+    def _api(self) -> Any:
+        if self._backend is None:
+            if settings.LLM_BACKEND == "fake":
+                from app.services.llm_fake import FakeLLM
+                self._backend = FakeLLM()
+            else:
+                import httpx
+                from openai import AsyncOpenAI
+                self._backend = AsyncOpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    max_retries=0,      # retries are ours: jittered, and bounded by the call's deadline
+                    http_client=httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_connections=settings.LLM_MAX_CONCURRENCY,
+                            max_keepalive_connections=settings.LLM_MAX_CONCURRENCY,
+                            keepalive_expiry=60.0,
+                        ),
+                        timeout=httpx.Timeout(60.0, connect=5.0),
+                    ),
+                )
+        return self._backend
+
+    async def aclose(self) -> None:
+        close = getattr(self._backend, "close", None)
+        if close is not None:
+            await close()
+        self._backend = None
+
+    @asynccontextmanager
+    async def _slot(self, feature: str):
+        if not self.breaker.allow():
+            metrics.LLM_CALLS.labels(feature, "rejected").inc()
+            raise LLMUnavailable("LLM circuit open")
+        semaphore = self._features.get(feature)
+        if semaphore is None:
+            semaphore = self._features[feature] = asyncio.Semaphore(FEATURES.get(feature, _DEFAULT_FEATURE)[0])
+        try:
+            async with semaphore, self._global:
+                metrics.LLM_IN_FLIGHT.labels(feature).inc()
+                try:
+                    yield
+                finally:
+                    metrics.LLM_IN_FLIGHT.labels(feature).dec()
+        except BaseException:
+            # Cancelled, or a stream closed early by its consumer (GeneratorExit): a half-open
+            # probe that got no recorded outcome must not keep the breaker half-open for good
+            self.breaker.release_probe()
+            raise
+
+    async def _attempts(self, feature: str, kind: str, call: Callable[[], Awaitable[T]], deadline_at: float) -> T:
+        """Run `call` until it succeeds, fails for good, or the deadline passes."""
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                metrics.LLM_CALLS.labels(feature, "failed").inc()
+                raise LLMUnavailable(f"{feature}: deadline passed")
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(call(), remaining)
+            except Exception as e:
+                if not _retryable(e):
+                    self.breaker.release_probe()      # the API answered — it's the request that's wrong
+                    metrics.LLM_CALLS.labels(feature, "error").inc()
+                    raise
+                self.breaker.record_failure()
+                attempt += 1
+                backoff = random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt))
+                if (attempt > settings.LLM_MAX_RETRIES or self.breaker.state == "open"
+                        or time.monotonic() + backoff >= deadline_at):
+                    metrics.LLM_CALLS.labels(feature, "failed").inc()
+                    raise LLMUnavailable(f"{feature}: {type(e).__name__}: {e}") from e
+                metrics.LLM_CALLS.labels(feature, "retried").inc()
+                logger.warning(f"[LLM] {feature} {kind} failed ({type(e).__name__}), retry {attempt} in {backoff:.2f}s")
+                await asyncio.sleep(backoff)
+                continue
+            self.breaker.record_success()
+            metrics.LLM_LATENCY.labels(feature, kind).observe(time.perf_counter() - started)
+            return result
+
+    def _deadline_at(self, feature: str, deadline: Optional[float]) -> float:
+        return time.monotonic() + (deadline or FEATURES.get(feature, _DEFAULT_FEATURE)[1])
+
+    @staticmethod
+    def _account(feature: str, usage: Any) -> None:
+        if usage is None:
+            return
+        metrics.LLM_TOKENS.labels(feature, "prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+        metrics.LLM_TOKENS.labels(feature, "completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+    async def chat(self, feature: str, deadline: Optional[float] = None, **params) -> Any:
+        """chat.completions.create(**params) under the feature's limits, deadline and retries."""
+        deadline_at = self._deadline_at(feature, deadline)
+        async with self._slot(feature):
+            response = await self._attempts(
+                feature, "chat", lambda: self._api().chat.completions.create(**params), deadline_at,
+            )
+        metrics.LLM_CALLS.labels(feature, "ok").inc()
+        self._account(feature, getattr(response, "usage", None))
+        return response
+
+    async def stream(self, feature: str, deadline: Optional[float] = None, **params) -> AsyncIterator[Any]:
+        """
+        Streamed chat completion: yields chunks as they arrive. Opening the stream (up to the
+        first chunk) is retried within the deadline like chat(); usage is requested and counted
+        from the final chunk.
+        """
+        params.setdefault("stream_options", {"include_usage": True})
+        deadline_at = self._deadline_at(feature, deadline)
+
+        async def open_stream():
+            stream = await self._api().chat.completions.create(stream=True, **params)
+            iterator = stream.__aiter__()
+            try:
+                return stream, iterator, await iterator.__anext__()
+            except StopAsyncIteration:
+                return stream, iterator, None
+            except BaseException:
+                await _close_stream(stream)     # timed out, cancelled or failed before the first chunk
+                raise
+
+        started = time.perf_counter()
+        async with self._slot(feature):
+            stream, chunks, first = await self._attempts(feature, "first_token", open_stream, deadline_at)
+            try:
+                if first is not None:
+                    self._account(feature, getattr(first, "usage", None))
+                    yield first
+                    async for chunk in chunks:
+                        self._account(feature, getattr(chunk, "usage", None))
+                        yield chunk
+                metrics.LLM_CALLS.labels(feature, "ok").inc()
+            except Exception:
+                metrics.LLM_CALLS.labels(feature, "error").inc()
+                raise
+            finally:
+                metrics.LLM_LATENCY.labels(feature, "stream").observe(time.perf_counter() - started)
+                await _close_stream(stream)
+
+    async def embed(self, feature: str, texts: List[str], model: str = EMBED_MODEL,
+                    deadline: Optional[float] = None) -> List[List[float]]:
+        """Embedding vectors for `texts`, in order, requested _EMBED_BATCH inputs (one deadline) at a time."""
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), _EMBED_BATCH):
+            batch = texts[start:start + _EMBED_BATCH]
+            deadline_at = self._deadline_at(feature, deadline)
+            async with self._slot(feature):
+                response = await self._attempts(
+                    feature, "embed", lambda: self._api().embeddings.create(model=model, input=batch), deadline_at,
+                )
+            metrics.LLM_CALLS.labels(feature, "ok").inc()
+            self._account(feature, getattr(response, "usage", None))
+            vectors.extend(d.embedding for d in sorted(response.data, key=lambda d: d.index))
+        return vectors
+
+
+llm_gateway = LLMGateway()
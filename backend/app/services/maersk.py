@@ -0,0 +1,123 @@
+"""
+Shared Maersk reference-data client.
+
+One pooled httpx.AsyncClient per worker (keep-alive, HTTP/2 when `h2` is installed) instead
+of a fresh client — and TCP+TLS handshake — per type-ahead keystroke. On top of the pool:
+  - per-endpoint timeouts (locations / commodities / vessels / hs)
+  - bounded concurrency (MAERSK_MAX_CONCURRENCY requests in flight per worker)
+  - singleflight: identical in-flight GETs share one outbound request
+  - circuit breaker: after MAERSK_BREAKER_FAILURES consecutive failures, calls fail fast with
+    MaerskUnavailable for MAERSK_BREAKER_COOLDOWN seconds, then one probe is let through
+
+Callers treat MaerskUnavailable like any other Maersk error and serve their built-in fallback.
+Point MAERSK_BASE_URL at scripts/maersk_stub.py to exercise all of this locally.
+"""
+import asyncio
+import logging
+from typing import Dict, Optional
+import httpx
+from app.core import metrics
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401 — httpx only needs it importable
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+TIMEOUTS = {
+    "locations": 6.0,
+    "commodities": 8.0,
+    "vessels": 5.0,
+    "hs": 15.0,
+}
+
+
+class MaerskUnavailable(Exception):
+    """Maersk could not be used for this call (circuit open, network error, timeout)."""
+
+
+class MaerskClient:
+
+    def __init__(self, base_url: Optional[str] = None, consumer_key: Optional[str] = None,
+                 max_concurrency: Optional[int] = None):
+        self.base_url = (base_url or settings.MAERSK_BASE_URL).rstrip("/")
+        self.consumer_key = settings.MAERSK_CONSUMER_KEY if consumer_key is None else consumer_key
+        self.breaker = CircuitBreaker("MAERSK", settings.MAERSK_BREAKER_FAILURES, settings.MAERSK_BREAKER_COOLDOWN)
+        self._max_concurrency = max_concurrency or settings.MAERSK_MAX_CONCURRENCY
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.consumer_key)
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Consumer-Key": self.consumer_key},
+                http2=_HTTP2,
+                limits=httpx.Limits(max_connections=self._max_concurrency,
+                                    max_keepalive_connections=self._max_concurrency,
+                                    keepalive_expiry=60),
+            )
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._client
+
+    async def get(self, endpoint: str, path: str, params: Optional[dict] = None) -> httpx.Response:
+        """
+        GET `path` (may carry its own query string). Returns the response for any HTTP status;
+        raises MaerskUnavailable when the breaker is open or the request itself failed.
+        """
+        key = path + ("?" + "&".join(f"{k}={v}" for k, v in sorted(params.items())) if params else "")
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        if not self.breaker.allow():
+            raise MaerskUnavailable("circuit open")
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._fetch(endpoint, path, params)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e if isinstance(e, MaerskUnavailable) else MaerskUnavailable(str(e)))
+            future.exception()  # mark retrieved — no "exception never retrieved" warning without waiters
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _fetch(self, endpoint: str, path: str, params: Optional[dict]) -> httpx.Response:
+        client = self._http()
+        try:
+            async with self._semaphore:
+                response = await metrics.observe_external(
+                    "maersk", client.get(path, params=params, timeout=TIMEOUTS[endpoint])
+                )
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            raise MaerskUnavailable(f"{type(e).__name__}: {e}") from e
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+maersk_client = MaerskClient()
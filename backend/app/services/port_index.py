@@ -0,0 +1,230 @@
+"""
+In-memory port search index, built once per worker at import.
+
+Replaces the per-call linear scan over MAJOR_PORTS (lowercase everything, substring test,
+sort). Everything a query needs is precomputed:
+  - rank: entries are stored in display order (by name), so sorting candidates is sorting ints
+  - exact LOCODE map: "CNSHA" → entry in O(1), ranked first
+  - prefix lookup over city / name / LOCODE and every word in them ("jebel" → Jebel Ali,
+    "shang" → Shanghai), as sorted key arrays searched with bisect — the same O(log n + k) walk
+    as a pointer trie without millions of node dicts at 100k entries
+  - bigram + trigram postings for infix matches ("otterd"), and city trigram postings for the
+    typo-tolerant fallback ("rotterdma" → Rotterdam, ranked by trigram Jaccard similarity)
+  - per-country id lists for country-filtered and empty queries
+
+Ordering matches the old scan: exact LOCODE, then city-prefix matches, then other substring
+matches, each by name. Fuzzy matches are only returned when nothing matches literally.
+
+PORT_INDEX_FILE may point at a UN/LOCODE CSV (CodeListPart*.csv, ~100k rows); its locations
+are added after MAJOR_PORTS, which win on duplicate codes.
+"""
+import csv
+import logging
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+from app.data.ports import MAJOR_PORTS
+
+logger = logging.getLogger(__name__)
+
+PortRow = Tuple[str, str, str, str, str]   # (name, city, unlocode, country_name, country_code)
+
+FUZZY_MIN_SIMILARITY = 0.4   # Jaccard similarity of query and city trigram sets
+_DENSE_CANDIDATES = 5000     # above this, walk entries in rank order instead of sorting candidates
+
+
+def _grams(text: str, n: int) -> Iterable[str]:
+    return (text[i:i + n] for i in range(len(text) - n + 1))
+
+
+class PortIndex:
+
+    def __init__(self, rows: Iterable[PortRow]):
+        seen = set()
+        unique: List[PortRow] = []
+        for row in rows:
+            code = row[2].strip().upper()
+            if not code or code in seen:
+                continue
+            seen.add(code)
+            unique.append(row)
+        unique.sort(key=lambda r: r[0])
+
+        self._results: List[Dict[str, Any]] = []
+        self._fields: List[Tuple[str, str, str]] = []   # (city, name, code) lowercased
+        self._countries: List[str] = []
+        self._by_code: Dict[str, int] = {}
+        self._by_country: Dict[str, List[int]] = {}
+        city_keys: List[Tuple[str, int]] = []
+        word_keys: List[Tuple[str, int]] = []
+        postings: Dict[str, array] = {}
+        city_postings: Dict[str, array] = {}
+        self._city_gram_counts = array("H")
+
+        for i, (name, city, code, country_name, country_code) in enumerate(unique):
+            code = code.strip().upper()
+            self._results.append({
+                "name": name,
+                "city": city,
+                "code": code,
+                "country": country_name,
+                "country_code": country_code,
+                "region": "",
+                "type": "",
+            })
+            fields = (city.lower(), name.lower(), code.lower())
+            self._fields.append(fields)
+            self._countries.append(country_code.lower())
+            self._by_code[code] = i
+            self._by_country.setdefault(country_code.lower(), []).append(i)
+
+            city_keys.append((fields[0], i))
+            words = {w for field in fields for w in field.split()} | set(fields)
+            word_keys.extend((w, i) for w in words)
+            grams = {g for field in fields for n in (2, 3) for g in _grams(field, n)}
+            for g in grams:
+                posting = postings.get(g)
+                if posting is None:
+                    posting = postings[g] = array("I")
+                posting.append(i)
+            city_grams = set(_grams(fields[0], 3))
+            self._city_gram_counts.append(len(city_grams))
+            for g in city_grams:
+                posting = city_postings.get(g)
+                if posting is None:
+                    posting = city_postings[g] = array("I")
+                posting.append(i)
+
+        city_keys.sort()
+        word_keys.sort()
+        self._city_keys = [k for k, _ in city_keys]
+        self._city_ids = array("I", (i for _, i in city_keys))
+        self._word_keys = [k for k, _ in word_keys]
+        self._word_ids = array("I", (i for _, i in word_keys))
+        self._postings = postings
+        self._city_postings = city_postings
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    # ── lookups ────────────────────────────────────────────
+    def by_code(self, code: str) -> Optional[Dict[str, Any]]:
+        i = self._by_code.get(code.strip().upper())
+        return None if i is None else self._results[i]
+
+    def _prefix_ids(self, keys: List[str], ids: array, prefix: str) -> List[int]:
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + "￿", lo)
+        return list(ids[lo:hi])
+
+    def prefix(self, prefix: str) -> List[int]:
+        """Ids whose city, name, LOCODE or any word in them starts with `prefix` (lowercase)."""
+        return sorted(set(self._prefix_ids(self._word_keys, self._word_ids, prefix)))
+
+    def _substring_ids(self, q: str, allowed) -> Iterable[int]:
+        """Ids containing `q` in city, name or LOCODE, in rank order."""
+        if len(q) >= 2:
+            grams = set(_grams(q, 3 if len(q) >= 3 else 2))
+            lists = sorted((self._postings.get(g, ()) for g in grams), key=len)
+            if not lists[0]:
+                return []
+            candidates = set(lists[0])
+            for posting in lists[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return []
+            if len(candidates) <= _DENSE_CANDIDATES:
+                ordered: Iterable[int] = sorted(candidates)
+            else:
+                ordered = (i for i in (allowed if allowed is not None else range(len(self))) if i in candidates)
+        else:
+            ordered = allowed if allowed is not None else range(len(self))
+        fields = self._fields
+        return (i for i in ordered if q in fields[i][0] or q in fields[i][1] or q in fields[i][2])
+
+    def _fuzzy_ids(self, q: str) -> List[int]:
+        grams = set(_grams(q, 3))
+        if not grams:
+            return []
+        shared = Counter()
+        for g in grams:
+            shared.update(self._city_postings.get(g, ()))
+        counts = self._city_gram_counts
+        hits = []
+        for i, n in shared.items():
+            similarity = n / (len(grams) + counts[i] - n)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                hits.append((-similarity, i))
+        hits.sort()
+        return [i for _, i in hits]
+
+    # ── search ─────────────────────────────────────────────
+    def search(self, q: str, country: str = "", limit: int = 20) -> List[Dict[str, Any]]:
+        """Ranked ports for `q`, optionally restricted to an ISO country code. Results are shared — treat as read-only."""
+        q = q.strip().lower()
+        country = country.strip().lower()
+        allowed = self._by_country.get(country, []) if country else None
+        if not q:
+            ids = allowed if allowed is not None else range(len(self))
+            return [self._results[i] for i in ids[:limit]]
+
+        countries = self._countries
+        out: List[int] = []
+        taken = set()
+
+        def take(ids: Iterable[int]) -> bool:
+            for i in ids:
+                if i in taken or (country and countries[i] != country):
+                    continue
+                taken.add(i)
+                out.append(i)
+                if len(out) >= limit:
+                    return True
+            return False
+
+        exact = self._by_code.get(q.upper())
+        if (exact is not None and take((exact,))) \
+                or take(sorted(self._prefix_ids(self._city_keys, self._city_ids, q))) \
+                or take(self._substring_ids(q, allowed)):
+            return [self._results[i] for i in out]
+        if not out and len(q) >= 3:
+            take(self._fuzzy_ids(q))
+        return [self._results[i] for i in out]
+
+
+def load_unlocode(path: str) -> List[PortRow]:
+    """
+    Rows from a UN/LOCODE code list CSV (Change, Country, Location, Name, NameWoDiacritics, ...).
+    Country header rows (no Location, Name ".COUNTRY") supply the country names.
+    """
+    rows: List[PortRow] = []
+    country_names: Dict[str, str] = {}
+    with open(path, newline="", encoding="latin-1") as f:
+        for record in csv.reader(f):
+            if len(record) < 5:
+                continue
+            country_code, location, name = record[1].strip(), record[2].strip(), record[4].strip() or record[3].strip()
+            if not country_code:
+                continue
+            if not location:
+                country_names[country_code] = name.lstrip(".").title()
+                continue
+            rows.append((name, name, country_code + location, country_names.get(country_code, country_code), country_code))
+    return rows
+
+
+def _build() -> PortIndex:
+    rows: List[PortRow] = list(MAJOR_PORTS)
+    if settings.PORT_INDEX_FILE:
+        path = Path(settings.PORT_INDEX_FILE)
+        if path.exists():
+            rows.extend(load_unlocode(str(path)))
+        else:
+            logger.warning(f"[PORT_INDEX] PORT_INDEX_FILE {path} not found — using built-in ports only")
+    return PortIndex(rows)
+
+
+port_index = _build()
@@ -0,0 +1,135 @@
+"""
+Authenticated-principal cache for deps.get_current_user.
+
+Keyed by sha256(token). Two tiers:
+  - in-process LRU (per worker), entries live at most LOCAL_TTL seconds
+  - Redis (shared by all workers), entries live until the token's `exp`
+
+Invalidation is per user: invalidate_user() bumps `principal_epoch:{user_id}` in Redis
+(and a local generation counter). Every cached entry remembers the epoch it was built
+under, so an epoch bump makes all cached principals of that user stale at once.
+"""
+import hashlib
+import json
+import time
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Optional
+from sqlalchemy import DateTime
+from app.core import redis as redis_mod
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+LOCAL_TTL = 30          # seconds — bounds cross-worker staleness if Redis is unavailable
+LOCAL_MAX_ENTRIES = 5000
+EPOCH_TTL = 86400 * 30  # same horizon as pw_changed_at
+
+# Only what get_current_user and the routers read from current_user. Never password_hash,
+# survey answers or lockout counters: snapshots are stored in Redis as plain JSON.
+# Code that needs anything else (change-password) loads the row from the DB.
+_SNAPSHOT_FIELDS = (
+    "id", "sovereign_id", "email", "full_name", "company_name", "company_email", "website",
+    "phone_number", "avatar_url", "role", "onboarding_completed", "is_active", "created_at",
+)
+_USER_COLUMNS = [(key, isinstance(User.__table__.columns[key].type, DateTime)) for key in _SNAPSHOT_FIELDS]
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def snapshot_user(user: User) -> dict:
+    """The allow-listed column values of a User as a JSON-safe dict."""
+    data = {}
+    for key, is_dt in _USER_COLUMNS:
+        value = getattr(user, key, None)
+        data[key] = value.isoformat() if (is_dt and value is not None) else value
+    return data
+
+
+def materialize_user(data: dict) -> User:
+    """Detached (session-less) User built from a snapshot. Treat as read-only; other columns are None."""
+    values = {}
+    for key, is_dt in _USER_COLUMNS:
+        value = data.get(key)
+        values[key] = datetime.fromisoformat(value) if (is_dt and value) else value
+    return User(**values)
+
+
+class PrincipalCache:
+
+    def __init__(self):
+        self._local: "OrderedDict[str, dict]" = OrderedDict()
+        self._generations: dict = {}
+
+    # ── local tier ─────────────────────────────────────────
+    def get_local(self, key: str) -> Optional[dict]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        now = time.time()
+        if entry["local_until"] < now or entry["gen"] != self._generations.get(entry["user_id"], 0):
+            self._local.pop(key, None)
+            return None
+        self._local.move_to_end(key)
+        return entry
+
+    def put(self, key: str, user_id: str, user_data: dict, iat: int, exp: int, epoch: str) -> dict:
+        entry = {
+            "user_id": user_id,
+            "user": user_data,
+            "iat": iat,
+            "exp": exp,
+            "epoch": epoch,
+            "gen": self._generations.get(user_id, 0),
+            "local_until": min(exp, time.time() + LOCAL_TTL),
+        }
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > LOCAL_MAX_ENTRIES:
+            self._local.popitem(last=False)
+        return entry
+
+    # ── redis tier ─────────────────────────────────────────
+    async def store_shared(self, key: str, entry: dict) -> None:
+        client = redis_mod.redis_client
+        ttl = int(entry["exp"] - time.time())
+        if client is None or ttl <= 0:
+            return
+        payload = {k: entry[k] for k in ("user_id", "user", "iat", "exp", "epoch")}
+        try:
+            await client.setex(f"principal:{key}", ttl, json.dumps(payload))
+        except Exception as e:
+            logger.warning(f"[PRINCIPAL_CACHE] Redis store failed: {e}")
+
+    @staticmethod
+    def parse_shared(raw: Optional[str]) -> Optional[dict]:
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    # ── invalidation ───────────────────────────────────────
+    async def invalidate_user(self, user_id: Any) -> None:
+        """Drop every cached principal for this user, in this worker and all others."""
+        if user_id is None:
+            return
+        user_id = str(user_id)
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        client = redis_mod.redis_client
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                pipe.incr(f"principal_epoch:{user_id}")
+                # Must outlive any access token, otherwise the epoch could fall back to a stale value
+                pipe.expire(f"principal_epoch:{user_id}", EPOCH_TTL)
+                await pipe.execute()
+            except Exception as e:
+                logger.warning(f"[PRINCIPAL_CACHE] Epoch bump failed for {user_id}: {e}")
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,141 @@
+"""
+Persisted knowledge-base index for app/services/rag_service.py, shared by every worker.
+
+Layout under RAG_INDEX_DIR (default backend/.rag_index):
+  CURRENT              name of the live build
+  <build>/index.faiss  FAISS IndexFlatIP over unit vectors (inner product = cosine), opened with
+                       IO_FLAG_MMAP_IFC | IO_FLAG_READ_ONLY: the embedding matrix is mapped,
+                       not copied, so all workers share one copy in the page cache
+  <build>/chunks.json  chunk texts, sources and content hashes in row order, plus the manifest
+                       (embedding model, chunk settings, digest of the knowledge files)
+
+A build is named after the hash of the knowledge digest and its chunk hashes. It is written to
+a temp dir, renamed into place, then published by atomically replacing CURRENT, so a reader
+never sees half an index.
+The previous build is kept for readers that still have it open; older ones are removed.
+
+Rebuilds are incremental: a chunk's key is sha256(embedding model, chunk text), vectors of
+unchanged chunks are copied from the live build and only new or edited chunks are embedded.
+One worker builds at a time (flock on <dir>/.lock); the others wait, then load its result.
+"""
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from app.core.config import settings
+
+_DEFAULT_DIR = Path(__file__).resolve().parent.parent.parent / ".rag_index"
+FORMAT = 1
+
+
+def chunk_hash(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def files_digest(directory: Path) -> str:
+    """sha256 over the names and bytes of the files in `directory` — cheap staleness check."""
+    digest = hashlib.sha256()
+    for path in sorted(p for p in directory.iterdir() if p.is_file() and not p.name.startswith(".")):
+        digest.update(path.name.encode("utf-8") + b"\0" + path.read_bytes() + b"\0")
+    return digest.hexdigest()
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class KnowledgeIndex:
+    """One build: the mapped FAISS index plus the chunk rows it was built from."""
+
+    def __init__(self, build: str, index, manifest: dict, chunks: List[dict]):
+        self.build = build
+        self.index = index
+        self.manifest = manifest
+        self.texts = [c["text"] for c in chunks]
+        self.sources = [c["source"] for c in chunks]
+        self.hashes = [c["hash"] for c in chunks]
+
+    def search(self, vector: List[float], k: int) -> List[int]:
+        """Chunk rows by descending cosine similarity to `vector`."""
+        query = _unit(np.asarray([vector], dtype=np.float32))
+        _, rows = self.index.search(query, min(k, len(self.texts)) or 1)
+        return [int(r) for r in rows[0] if r >= 0]
+
+    def vectors_by_hash(self) -> Dict[str, np.ndarray]:
+        matrix = self.index.reconstruct_n(0, self.index.ntotal) if self.texts else []
+        return dict(zip(self.hashes, matrix))
+
+
+class IndexStore:
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def load(self) -> Optional[KnowledgeIndex]:
+        """The published build, memory-mapped read-only; None if nothing usable is on disk."""
+        build = self._current()
+        if build is None:
+            return None
+        try:
+            meta = json.loads((self.root / build / "chunks.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if meta["manifest"].get("format") != FORMAT:
+            return None
+        import faiss
+        index = faiss.read_index(str(self.root / build / "index.faiss"), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        return KnowledgeIndex(build, index, meta["manifest"], meta["chunks"])
+
+    @asynccontextmanager
+    async def build_lock(self):
+        """Exclusive across worker processes; waiting for another worker's build happens off the loop."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.root / ".lock", os.O_CREAT | os.O_RDWR)
+        try:
+            await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)     # releases the lock
+
+    def publish(self, manifest: dict, chunks: List[dict], vectors: np.ndarray) -> KnowledgeIndex:
+        """Write a build (rows of `vectors` match `chunks`), make it CURRENT and return it mapped."""
+        import faiss
+        key = manifest["knowledge_digest"] + "".join(c["hash"] for c in chunks)
+        build = hashlib.sha256(key.encode()).hexdigest()[:16]
+        target = self.root / build
+        if not target.exists():
+            staging = Path(tempfile.mkdtemp(prefix=".build-", dir=self.root))
+            staging.chmod(0o755)        # mkdtemp is owner-only; workers may run as another user
+            index = faiss.IndexFlatIP(manifest["dim"])
+            if len(chunks):
+                index.add(_unit(np.ascontiguousarray(vectors, dtype=np.float32)))
+            faiss.write_index(index, str(staging / "index.faiss"))
+            (staging / "chunks.json").write_text(
+                json.dumps({"manifest": {**manifest, "format": FORMAT}, "chunks": chunks}, ensure_ascii=False),
+                encoding="utf-8",
+            )
+            os.rename(staging, target)
+        previous = self._current()
+        pointer = self.root / ".CURRENT.tmp"
+        pointer.write_text(build, encoding="utf-8")
+        os.replace(pointer, self.root / "CURRENT")
+        for path in self.root.iterdir():
+            if path.is_dir() and path.name not in (build, previous):
+                shutil.rmtree(path, ignore_errors=True)
+        return self.load()
+
+    def _current(self) -> Optional[str]:
+        try:
+            return (self.root / "CURRENT").read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+
+
+index_store = IndexStore(Path(settings.RAG_INDEX_DIR) if settings.RAG_INDEX_DIR else _DEFAULT_DIR)
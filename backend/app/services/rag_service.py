@@ -1,38 +1,109 @@
 """
-LlamaIndex RAG over freight knowledge base.
-Indexes markdown files and enables semantic search.
+RAG over the freight knowledge base (app/knowledge/*.md).
+
+LlamaIndex reads and chunks the markdown files; embeddings and the answer go through the shared
+LLM gateway (app/services/llm_gateway.py), so knowledge questions share the worker's client
+pool, concurrency caps, retries, breaker and token metrics with the agent and quotes.
+
+The index is persisted and shared by all workers (app/services/rag_index.py). At worker start
+load_index() maps it read-only if it is current for the knowledge files (a file digest check;
+no llama-index import, no embeddings call). Otherwise the first question (or RAG_PREWARM)
+rebuilds it, re-embedding only the chunks whose content changed.
 """
-import os
+import asyncio
+import logging
 from pathlib import Path
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, Settings
-from llama_index.llms.openai import OpenAI as LlamaOpenAI
-from llama_index.embeddings.openai import OpenAIEmbedding
-from app.core.config import settings
+from typing import Optional
+import numpy as np
+from app.services.llm_gateway import llm_gateway
+from app.services.rag_index import KnowledgeIndex, chunk_hash, files_digest, index_store
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_DIR = Path(__file__).parent.parent / "knowledge"
+TOP_K = 3
+CHUNK_SIZE = 1024         # tokens per chunk (LlamaIndex defaults)
+CHUNK_OVERLAP = 200
+
+_QA_PROMPT = (
+    "Context information is below.\n---------------------\n{context}\n---------------------\n"
+    "Given the context information and not prior knowledge, answer the query.\nQuery: {question}\nAnswer: "
+)
+
+
+def _manifest() -> dict:
+    return {
+        "embed_model": llm_gateway.embedding_space(), "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP,
+        "knowledge_digest": files_digest(KNOWLEDGE_DIR),
+    }
+
 
-_index: VectorStoreIndex | None = None
+def _is_current(index: Optional[KnowledgeIndex], manifest: dict) -> bool:
+    return index is not None and all(index.manifest.get(k) == v for k, v in manifest.items())
 
 
-def _build_index() -> VectorStoreIndex:
-    knowledge_dir = Path(__file__).parent.parent / "knowledge"
-    Settings.llm = LlamaOpenAI(model="gpt-4o-mini", api_key=settings.OPENAI_API_KEY)
-    Settings.embed_model = OpenAIEmbedding(model="text-embedding-3-small", api_key=settings.OPENAI_API_KEY)
-    docs = SimpleDirectoryReader(str(knowledge_dir)).load_data()
-    return VectorStoreIndex.from_documents(docs)
+def _load_chunks():
+    from llama_index.core import SimpleDirectoryReader
+    from llama_index.core.node_parser import SentenceSplitter
+    docs = SimpleDirectoryReader(str(KNOWLEDGE_DIR)).load_data()
+    nodes = SentenceSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP).get_nodes_from_documents(docs)
+    return [n.get_content() for n in nodes], [n.metadata.get("file_name", "") for n in nodes]
+
+
+async def _build_index(previous: Optional[KnowledgeIndex], manifest: dict) -> KnowledgeIndex:
+    """Chunk the knowledge files, embed the chunks `previous` doesn't have, publish the new build."""
+    texts, sources = await asyncio.to_thread(_load_chunks)     # llama-index import + file reads
+    hashes = [chunk_hash(manifest["embed_model"], t) for t in texts]
+    known = previous.vectors_by_hash() if previous is not None else {}
+    missing = {h: t for h, t in zip(hashes, texts) if h not in known}
+    if missing:
+        known.update(zip(missing, np.asarray(await llm_gateway.embed("rag", list(missing.values())), dtype=np.float32)))
+    dim = len(next(iter(known.values()))) if known else 1536
+    vectors = np.array([known[h] for h in hashes], dtype=np.float32).reshape(len(hashes), dim)
+    chunks = [{"hash": h, "source": s, "text": t} for h, s, t in zip(hashes, sources, texts)]
+    index = await asyncio.to_thread(index_store.publish, {**manifest, "dim": dim}, chunks, vectors)
+    logger.info(f"[RAG] Index {index.build} published: {len(chunks)} chunks, "
+                f"{len(missing)} embedded, {len(chunks) - len(missing)} reused")
+    return index
+
+
+_index: Optional[KnowledgeIndex] = None
+_index_lock = asyncio.Lock()
+
+
+def load_index() -> str:
+    """Map the persisted index if it is current (worker start). Returns its state for the startup line."""
+    global _index
+    index = index_store.load()
+    if index is None:
+        return "none"
+    if not _is_current(index, _manifest()):
+        return "stale"
+    _index = index
+    return f"{len(index.texts)} chunks"
 
 
-def get_index() -> VectorStoreIndex:
+async def get_index() -> KnowledgeIndex:
     global _index
     if _index is None:
-        _index = _build_index()
+        async with _index_lock:
+            if _index is None:
+                manifest = _manifest()
+                async with index_store.build_lock():
+                    index = await asyncio.to_thread(index_store.load)   # another worker may have just built it
+                    _index = index if _is_current(index, manifest) else await _build_index(index, manifest)
     return _index
 
 
-def query_knowledge(question: str) -> str:
-    """Query the freight knowledge base and return an answer."""
-    try:
-        index = get_index()
-        engine = index.as_query_engine(similarity_top_k=3)
-        response = engine.query(question)
-        return str(response)
-    except Exception as e:
-        return f"Knowledge base unavailable: {e}"
+async def query_knowledge(question: str) -> str:
+    """Query the freight knowledge base and return an answer. Index and LLM failures are raised."""
+    index = await get_index()
+    (vector,) = await llm_gateway.embed("rag", [question])
+    context = "\n\n".join(index.texts[i] for i in index.search(vector, TOP_K))
+    response = await llm_gateway.chat(
+        "rag",
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": _QA_PROMPT.format(context=context, question=question)}],
+        temperature=0.1,
+    )
+    return response.choices[0].message.content
@@ -0,0 +1,14 @@
+"""
+Caches for Maersk reference searches (ports, commodities, vessels) — see app/core/cache.py.
+
+Keyed by normalized query (+ country for ports). Reference data changes rarely, so entries
+are fresh for hours and then served stale for up to a day while one background refresh runs.
+Empty results are cached for 10 minutes, so a typo'd query doesn't hit Maersk on every
+keystroke but a newly listed location shows up quickly. Maersk errors are never cached —
+the router serves its built-in fallback and the next request retries.
+"""
+from app.core.cache import TieredCache, normalize  # noqa: F401 — normalize is re-exported for the routers
+
+port_cache = TieredCache("ports", fresh_ttl=6 * 3600, stale_ttl=24 * 3600, negative_ttl=600)
+commodity_cache = TieredCache("commodities", fresh_ttl=6 * 3600, stale_ttl=24 * 3600, negative_ttl=600)
+vessel_cache = TieredCache("vessels", fresh_ttl=3600, stale_ttl=12 * 3600, negative_ttl=600)
@@ -0,0 +1,107 @@
+"""
+Tool-result layer for the AI agent (app/api/routers/agent.py).
+
+  - tool_cache: per-user cache of tool results (keyed by user, tool and arguments) for
+    AGENT_TOOL_CACHE_TTL seconds, so a follow-up question in the same conversation doesn't
+    re-run the queries. Error results are not kept. See app/core/cache.py.
+  - fit_to_budget(): keeps the tool messages of one model turn within
+    AGENT_TOOL_TOKEN_BUDGET tokens. Results that fit are left alone. Oversized ones are cut
+    down by halving their longest lists (with a "… N more not shown" marker), then by
+    truncating text, so the model still gets valid JSON and knows something was left out.
+
+Tokens are estimated at ~4 characters each, which is close enough for a budget.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.cache import TieredCache
+from app.core.config import settings
+
+CHARS_PER_TOKEN = 4
+_MIN_SHARE = 200   # tokens every result keeps, however many tools ran
+
+tool_cache = TieredCache(
+    "agent_tools", fresh_ttl=settings.AGENT_TOOL_CACHE_TTL, max_entries=5000,
+    ttl_for=lambda v: 0 if isinstance(v, dict) and "error" in v else settings.AGENT_TOOL_CACHE_TTL,
+)
+
+
+def tool_cache_key(sovereign_id: str, name: str, args: dict) -> str:
+    return f"{sovereign_id}|{name}|{json.dumps(args, sort_keys=True, default=str)}"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+def _split(items: list) -> Tuple[list, int]:
+    """(items still shown, count already hidden) for a list that may end in a "… N more" marker."""
+    if items and isinstance(items[-1], str) and items[-1].startswith("… "):
+        return items[:-1], int(items[-1].split()[1])
+    return items, 0
+
+
+def _longest_list(value: Any) -> Optional[Tuple[Any, Any, list]]:
+    """(container, key, list) for the list with the most shown items anywhere in `value` (None if all ≤ 1)."""
+    best, best_len = None, 1
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        children = node.items() if isinstance(node, dict) else enumerate(node) if isinstance(node, list) else ()
+        for key, child in children:
+            if isinstance(child, list):
+                shown = len(_split(child)[0])
+                if shown > best_len:
+                    best, best_len = (node, key, child), shown
+            if isinstance(child, (dict, list)):
+                stack.append(child)
+    return best
+
+
+def shrink(value: Any, max_tokens: int) -> str:
+    """JSON for `value` in at most ~max_tokens tokens: lists are cut before any text is."""
+    text = _dumps(value)
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    if isinstance(value, str):
+        return _dumps(value[:max(0, max_chars - 40)] + " … [truncated]")
+
+    value = {"items": json.loads(text)} if isinstance(value, list) else json.loads(text)   # private copy
+    while len(text) > max_chars:
+        found = _longest_list(value)
+        if found is None:
+            break
+        container, key, items = found
+        shown, hidden = _split(items)
+        keep = len(shown) // 2
+        container[key] = shown[:keep] + [f"… {len(shown) - keep + hidden} more not shown"]
+        text = _dumps(value)
+
+    if len(text) > max_chars:
+        text = _dumps({"truncated": True, "preview": text[:max(0, max_chars - 60)]})
+    return text
+
+
+def fit_to_budget(results: Dict[str, Any], budget: int = 0) -> Dict[str, str]:
+    """
+    Serialized tool results of one turn ({tool_call_id: result} → {tool_call_id: json}),
+    together within `budget` tokens (AGENT_TOOL_TOKEN_BUDGET by default). Small results keep
+    their full size; the rest of the budget is split evenly among the large ones.
+    """
+    budget = budget or settings.AGENT_TOOL_TOKEN_BUDGET
+    texts = {call_id: _dumps(result) for call_id, result in results.items()}
+    if sum(estimate_tokens(t) for t in texts.values()) <= budget:
+        return texts
+
+    remaining = budget
+    order: List[str] = sorted(texts, key=lambda call_id: len(texts[call_id]))
+    for n, call_id in enumerate(order):
+        share = max(remaining // (len(order) - n), _MIN_SHARE)
+        if estimate_tokens(texts[call_id]) > share:
+            texts[call_id] = shrink(results[call_id], share)
+        remaining -= estimate_tokens(texts[call_id])
+    return texts
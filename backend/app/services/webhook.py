@@ -3,6 +3,7 @@ import logging
 from typing import Any, Dict
 import os
 from dotenv import load_dotenv
+from app.core import metrics
 
 load_dotenv()
 
@@ -39,6 +40,7 @@ class WebhookService:
             logger.warning(f"[WEBHOOK] Missing URL for event: {event_name}. Telemetry suppressed.")
             return False
 
+        metrics.BACKGROUND_IN_PROGRESS.labels("webhook").inc()
         try:
             api_secret = os.getenv("OMEGO_API_SECRET", "")
             headers = {
@@ -46,7 +48,7 @@ class WebhookService:
                 "X-OMEGO-Auth": api_secret,
                 "Content-Type": "application/json"
             }
-            response = await _get_client().post(url, json=payload, headers=headers)
+            response = await metrics.observe_external("n8n", _get_client().post(url, json=payload, headers=headers))
             response.raise_for_status()
             logger.info(f"[WEBHOOK] {event_name} dispatched to {url}")
             try:
@@ -56,6 +58,8 @@ class WebhookService:
         except Exception as e:
             logger.error(f"[WEBHOOK] Failed to dispatch {event_name}: {e}")
             return None
+        finally:
+            metrics.BACKGROUND_IN_PROGRESS.labels("webhook").dec()
 
     async def trigger_registration_webhook(self, forwarder_data: Dict[str, Any]):
         """
@@ -0,0 +1,165 @@
+"""
+Benchmark: agent chat loop, old "non-streaming probe + second streaming call" vs the
+single-pass streaming loop in app/api/routers/agent.py.
+
+Usage (from backend/):  python -m scripts.bench_agent_stream [conversations]
+Runs each scripted conversation (plain answer, one tool round, two tool rounds) through both
+loops against an offline fake chat-completions backend with a fixed time-to-first-token and
+per-token generation time, and with the agent tools stubbed out. Reports time to first answer
+token, total time, model calls and prompt + completion tokens per conversation.
+No OpenAI key or database is needed.
+"""
+import asyncio
+import json
+import sys
+import time
+from types import SimpleNamespace
+import logging
+logging.disable(logging.CRITICAL)
+from app.api.routers import agent
+from app.services.llm_gateway import llm_gateway
+
+FIRST_TOKEN_S = 0.30      # fake backend: latency before the first streamed token / before any response
+PER_TOKEN_S = 0.004       # fake backend: generation time per completion token
+TOOL_S = 0.05             # stubbed tool latency
+ANSWER = ("Under **FOB** the seller clears the goods for export and loads them on the vessel; "
+          "risk passes to the buyer once the cargo is on board. ") * 3
+
+SCRIPTS = {
+    "plain answer": [],
+    "one tool round": [["get_my_requests"]],
+    "two tool rounds": [["get_my_requests", "get_dashboard_stats"], ["get_request_details"]],
+}
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeCompletions:
+    """Chat-completions stand-in: asks for the scripted tools, then answers; counts tokens."""
+
+    def __init__(self, rounds):
+        self.rounds = rounds
+        self.calls = self.prompt_tokens = self.completion_tokens = 0
+
+    def _plan(self, messages):
+        done = sum(1 for m in messages if isinstance(m, dict) and m.get("role") == "tool")
+        asked = 0
+        for i, names in enumerate(self.rounds):
+            if done < asked + len(names):
+                return i, names
+            asked += len(names)
+        return None, None
+
+    async def create(self, model, messages, tools=None, tool_choice=None, stream=False, stream_options=None):
+        self.calls += 1
+        prompt = _tokens(json.dumps(messages, default=str)) + (_tokens(json.dumps(tools)) if tools else 0)
+        i, names = self._plan(messages) if tools else (None, None)
+        calls = [
+            {"id": f"call_{i}_{k}", "name": n, "arguments": json.dumps({"request_id": "REQ-1"} if n == "get_request_details" else {})}
+            for k, n in enumerate(names or ())
+        ]
+        words = [] if calls else [w + " " for w in ANSWER.split(" ")]
+        completion = sum(_tokens(c["name"] + c["arguments"]) for c in calls) + len(words)
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        usage = SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion)
+
+        if not stream:
+            await asyncio.sleep(FIRST_TOKEN_S + completion * PER_TOKEN_S)
+            tool_calls = [
+                SimpleNamespace(id=c["id"], type="function", function=SimpleNamespace(name=c["name"], arguments=c["arguments"]))
+                for c in calls
+            ] or None
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+                role="assistant", content=None if calls else "".join(words), tool_calls=tool_calls,
+                model_dump=lambda: {"role": "assistant", "content": None, "tool_calls": calls},
+            ))], usage=usage)
+        return self._stream(words, calls, usage, stream_options)
+
+    async def _stream(self, words, calls, usage, stream_options):
+        await asyncio.sleep(FIRST_TOKEN_S)
+        for w in words:
+            await asyncio.sleep(PER_TOKEN_S)
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=w, tool_calls=None))])
+        for k, c in enumerate(calls):
+            args = c["arguments"]
+            for piece in (None, args[:len(args) // 2], args[len(args) // 2:]):
+                await asyncio.sleep(PER_TOKEN_S)
+                part = SimpleNamespace(
+                    index=k, id=c["id"] if piece is None else None,
+                    function=SimpleNamespace(name=c["name"] if piece is None else None, arguments=piece),
+                )
+                yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=None, tool_calls=[part]))])
+        if stream_options and stream_options.get("include_usage"):
+            yield SimpleNamespace(usage=usage, choices=[])
+
+
+async def _fake_tool(name, args, user):
+    await asyncio.sleep(TOOL_S)
+    return {"tool": name, "rows": [{"request_id": f"REQ-{i}", "status": "OPEN"} for i in range(5)]}
+
+
+_client = None
+
+
+async def _legacy_events(messages, user):
+    """The pre-change loop: a non-streaming call with tools, then a second streaming call for the answer."""
+    client = _client
+    for _ in range(6):
+        response = await client.chat.completions.create(model="gpt-4o-mini", messages=messages, tools=agent.TOOLS, tool_choice="auto")
+        msg = response.choices[0].message
+        if msg.tool_calls:
+            messages.append(msg.model_dump())
+            for tc in msg.tool_calls:
+                yield "progress"
+                result = await _fake_tool(tc.function.name, json.loads(tc.function.arguments or "{}"), user)
+                messages.append({"role": "tool", "tool_call_id": tc.id, "content": json.dumps(result)})
+        else:
+            stream = await client.chat.completions.create(model="gpt-4o-mini", messages=messages, stream=True)
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield "token"
+            return
+
+
+async def _current_events(messages, user):
+    response = await agent.agent_chat_stream(agent.AgentMessage(message=messages[-1]["content"]), current_user=user)
+    async for event in response.body_iterator:
+        if '"token"' in event:
+            yield "token"
+
+
+async def _measure(events, rounds, user):
+    global _client
+    fake = FakeCompletions(rounds)
+    _client = SimpleNamespace(chat=SimpleNamespace(completions=fake))
+    llm_gateway.use_backend(_client)
+    messages = [{"role": "system", "content": agent._build_system_prompt(user)}, {"role": "user", "content": "What does FOB mean?"}]
+    started = time.perf_counter()
+    first = None
+    async for kind in events(messages, user):
+        if kind == "token" and first is None:
+            first = time.perf_counter() - started
+    return first, time.perf_counter() - started, fake.calls, fake.prompt_tokens + fake.completion_tokens
+
+
+async def main(conversations: int):
+    agent.execute_tool = _fake_tool
+    user = SimpleNamespace(sovereign_id="BENCH-1", full_name="Bench Shipper")
+    print("=" * 60)
+    print(f"AGENT LOOP — {conversations} run(s) per script, TTFT {FIRST_TOKEN_S * 1000:.0f}ms, "
+          f"{PER_TOKEN_S * 1000:.0f}ms/token, tools {TOOL_S * 1000:.0f}ms")
+    print("=" * 60)
+    print(f"{'script':<17}{'loop':<8}{'first token':>12}{'total':>9}{'calls':>7}{'tokens':>8}")
+    for label, rounds in SCRIPTS.items():
+        for loop, events in (("old", _legacy_events), ("new", _current_events)):
+            runs = [await _measure(events, rounds, user) for _ in range(conversations)]
+            first = sum(r[0] for r in runs) / len(runs)
+            total = sum(r[1] for r in runs) / len(runs)
+            print(f"{label:<17}{loop:<8}{first * 1000:>10.0f}ms{total * 1000:>7.0f}ms{runs[0][2]:>7}{runs[0][3]:>8,}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3))
@@ -0,0 +1,112 @@
+"""
+Benchmark: response compression — agent SSE time-to-first-token, and bytes/CPU on admin lists.
+
+Usage (from backend/):  python -m scripts.bench_compression
+1. TTFT: a fake /api/agent/chat/stream (one token every 20 ms) behind GZipMiddleware(500)
+   vs CompressionMiddleware, requested with `Accept-Encoding: zstd, br, gzip`.
+2. Size/CPU: an /api/admin/all-requests-shaped payload (2000 rows) through every available
+   encoding at its configured level. zstd/brotli rows appear only when installed.
+"""
+import asyncio
+import json
+import time
+import zlib
+import logging
+logging.disable(logging.CRITICAL)
+import httpx
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from app.core import compression
+from app.core.compression import CompressionMiddleware
+
+ACCEPT = "zstd, br, gzip"
+
+
+def _agent_app(middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/agent/chat/stream")
+    async def stream():
+        async def generate():
+            yield f"data: {json.dumps({'progress': 'Checking your shipments...'})}\n\n"
+            for i in range(30):
+                await asyncio.sleep(0.02)
+                yield f"data: {json.dumps({'token': f'tok{i} '})}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(generate(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    if middleware is GZipMiddleware:
+        app.add_middleware(GZipMiddleware, minimum_size=500)
+    else:
+        app.add_middleware(middleware)
+    return app
+
+
+async def _ttft(label: str, app: FastAPI, runs: int = 10):
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(runs):
+            started = time.perf_counter()
+            async with client.stream("GET", "/api/agent/chat/stream", headers={"Accept-Encoding": ACCEPT}) as resp:
+                encoding = resp.headers.get("content-encoding", "identity")
+                decoder = zlib.decompressobj(31) if encoding == "gzip" else None
+                seen = b""
+                async for raw in resp.aiter_raw():
+                    seen += decoder.decompress(raw) if decoder else raw
+                    if b'"token"' in seen:
+                        samples.append(time.perf_counter() - started)
+                        break
+                else:
+                    samples.append(time.perf_counter() - started)
+    samples.sort()
+    print(f"{label:<28} encoding={encoding:<9} TTFT p50={samples[len(samples) // 2] * 1000:7.1f}ms")
+
+
+def _admin_rows(n: int = 2000) -> bytes:
+    rows = [
+        {
+            "request_id": f"REQ-{i:06d}", "user_name": f"Shipper {i % 300}", "user_email": f"shipper{i % 300}@example.com",
+            "user_sovereign_id": f"OMEGO-{i % 300:04d}", "origin": "Shanghai, CN (CNSHA)", "destination": "Rotterdam, NL (NLRTM)",
+            "cargo_type": ("FCL", "LCL", "AIR")[i % 3], "commodity": "Electronics", "weight_kg": 12000.5 + i,
+            "container_type": "40HC", "container_count": 1 + i % 4, "incoterms": "FOB", "status": ("OPEN", "CLOSED")[i % 2],
+            "quotation_count": i % 4, "submitted_at": "2026-10-18 09:00:00", "closed_at": None, "closed_reason": None,
+            "is_hazardous": False, "needs_insurance": i % 5 == 0, "special_requirements": "",
+            "pickup_ready_date": "2026-11-01", "target_date": None, "is_f2f": False,
+        }
+        for i in range(n)
+    ]
+    return json.dumps(rows).encode()
+
+
+def _size_cpu(body: bytes, repeats: int = 20):
+    print(f"{'identity':<10} {len(body):>10,} bytes")
+    encodings = ["gzip"]
+    if compression.brotli is not None:
+        encodings.insert(0, "br")
+    if compression.zstandard is not None:
+        encodings.insert(0, "zstd")
+    for encoding in encodings:
+        cpu_started = time.process_time()
+        for _ in range(repeats):
+            out = compression.compress(encoding, body)
+        cpu_ms = (time.process_time() - cpu_started) / repeats * 1000
+        print(f"{encoding:<10} {len(out):>10,} bytes  ratio={len(body) / len(out):5.1f}x  cpu={cpu_ms:6.2f}ms/response")
+
+
+async def main():
+    print("=" * 60)
+    print("AGENT STREAM — TIME TO FIRST TOKEN")
+    print("=" * 60)
+    await _ttft("GZipMiddleware(500)", _agent_app(GZipMiddleware))
+    await _ttft("CompressionMiddleware", _agent_app(CompressionMiddleware))
+    print("=" * 60)
+    print("ADMIN ALL-REQUESTS (2000 rows) — BYTES AND CPU")
+    print("=" * 60)
+    _size_cpu(_admin_rows())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
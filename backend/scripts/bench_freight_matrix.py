@@ -0,0 +1,115 @@
+"""
+Benchmark: freight lane × equipment matrix, run_estimate() per cell vs the vectorized
+app/services/freight_matrix.FreightMatrix behind /api/tools/freight-estimate/batch.
+
+Usage (from backend/):  python -m scripts.bench_freight_matrix [ports_per_side]
+Builds a cube of `ports_per_side` (default 25) origins × as many destinations (ANCHORS, then
+MAJOR_PORTS, plus one sanctioned and one unlisted port) × 4 containers × 5 commodities ×
+8 goods values (100,000 cells at the default), then:
+  - checks every cell of the cube against run_estimate()
+  - times run_estimate() over the whole cube, FreightMatrix.price(), and the full NDJSON stream
+"""
+import json
+import random
+import sys
+import time
+from app.api.routers.tools import FreightEstimateRequest, run_estimate
+from app.data.ports import MAJOR_PORTS
+from app.services.freight_matrix import matrix_for
+from app.services.freight_tables import tariff_store
+
+freight_matrix = matrix_for(tariff_store.current())
+
+ANCHORS = ["CNSHA", "USLAX", "INNSA", "AEJEA", "DEHAM", "GBFXT"]   # every customs rate type + Red Sea lanes
+GOODS_VALUES = [0, 5_000, 9_142.5, 25_000, 50_000, 120_000, 177_370.15, 1_000_000]
+
+
+def _cube(ports_per_side: int):
+    rng = random.Random(19)
+    codes = sorted({p[2] for p in MAJOR_PORTS} - set(ANCHORS))
+    origins = ANCHORS + rng.sample(codes, ports_per_side - len(ANCHORS) - 2) + ["IRBND", "ZZABC"]
+    destinations = ANCHORS + rng.sample(codes, ports_per_side - len(ANCHORS) - 2) + ["RULED", "QQXYZ"]
+    tables = tariff_store.current()
+    return origins, destinations, list(tables.containers), list(tables.commodities), GOODS_VALUES
+
+
+def _legacy(origins, destinations, containers, commodities, values):
+    out = []
+    for o in origins:
+        for d in destinations:
+            for c in containers:
+                for k in commodities:
+                    for v in values:
+                        out.append(run_estimate(FreightEstimateRequest(
+                            origin_locode=o, destination_locode=d, origin_name=o, destination_name=d,
+                            container_type=c, commodity=k, goods_value=v,
+                        )))
+    return out
+
+
+def _mismatches(axes, legacy) -> int:
+    cells = {}
+    lanes = {}
+    for line in freight_matrix.ndjson(*axes):
+        for row in line.splitlines():
+            rec = json.loads(row)
+            if rec["type"] == "lane":
+                lanes[(rec["origin"], rec["destination"])] = rec
+            elif rec["type"] == "cell":
+                cells[(rec["origin"], rec["destination"], rec["container_type"], rec["commodity"], rec["goods_value"])] = rec
+
+    bad = 0
+    origins, destinations, containers, commodities, values = axes
+    it = iter(legacy)
+    for o in origins:
+        for d in destinations:
+            for c in containers:
+                for k in commodities:
+                    for v in values:
+                        old = next(it)
+                        lane = lanes[(o, d)]
+                        if old["cannot_ship"]:
+                            bad += not lane["cannot_ship"] or lane["reason"] != old["reason"]
+                            continue
+                        new = cells[(o, d, c, k, float(v))]
+                        bad += (
+                            lane["warnings"] != old["warnings"] or lane["via"] != old["lane"]["via"]
+                            or [new[f] for f in ("ocean_low", "ocean_high", "ocean_avg")]
+                            != [old["freight"][f] for f in ("ocean_low", "ocean_high", "ocean_avg")]
+                            or new["surcharges_total"] != old["surcharges_total"]
+                            or new["total_freight"] != old["total_freight"]
+                            or new["customs_total"] != old["customs"]["total"]
+                            or new["total_landed"] != old["total_landed"]
+                        )
+    return bad
+
+
+def main(ports_per_side: int):
+    axes = _cube(ports_per_side)
+    n = 1
+    for axis in axes:
+        n *= len(axis)
+
+    started = time.perf_counter()
+    legacy = _legacy(*axes)
+    legacy_s = time.perf_counter() - started
+
+    print("=" * 60)
+    print(f"FREIGHT MATRIX — {n:,} cells ({' × '.join(str(len(a)) for a in axes)})")
+    print(f"Cells disagreeing with run_estimate: {_mismatches(axes, legacy)}")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    freight_matrix.price(*axes)
+    price_s = time.perf_counter() - started
+    started = time.perf_counter()
+    size = sum(len(chunk) for chunk in freight_matrix.ndjson(*axes))
+    stream_s = time.perf_counter() - started
+
+    print(f"{'run_estimate per cell':<24} {legacy_s * 1000:8.0f}ms")
+    print(f"{'vectorized price()':<24} {price_s * 1000:8.1f}ms   {legacy_s / price_s:6.0f}x")
+    print(f"{'price + NDJSON stream':<24} {stream_s * 1000:8.1f}ms   {legacy_s / stream_s:6.0f}x   ({size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 25)
@@ -0,0 +1,75 @@
+"""
+Benchmark: HS heading search, old substring scan vs app/services/hs_index.HSIndex (BM25).
+
+Usage (from backend/):  python -m scripts.bench_hs_index
+Runs a set of commodity queries against the ~800 WCO headings and a ~5,600-row set shaped
+like 6-digit subheadings (each heading split into qualified variants). Prints build time,
+per-query latency (mean) and the top hit with its confidence, then checks that type-ahead
+prefixes ("cot", "elect") find exactly the headings with a word starting with the prefix.
+"""
+import re
+import time
+from app.data.hs_codes import HS_HEADINGS
+from app.services.hs_index import STOP_WORDS, HSIndex, load_synonyms
+
+QUERIES = ["clothes", "frozen fish", "laptop", "mobile phone", "olive oil", "steel pipes", "car",
+           "batteries", "wooden furniture", "8517"]
+PREFIX_QUERIES = ["cot", "cotto", "elect", "froz", "batteri", "lapt", "furn"]
+_QUALIFIERS = ["fresh or chilled", "frozen", "of cotton", "of synthetic fibres", "of iron or steel",
+               "of plastics", "for industrial use"]
+
+
+def _legacy_scan(headings, q: str):
+    q_lower = q.strip().lower()
+    return [h for h in headings if q_lower in h["name"].lower()][:6]
+
+
+def _word_prefix_scan(headings, prefix: str):
+    return [h for h in headings
+            if any(w.startswith(prefix) and w not in STOP_WORDS for w in re.findall(r"[a-z0-9]+", h["name"].lower()))]
+
+
+def _subheadings():
+    rows = []
+    for h in HS_HEADINGS:
+        for j, qualifier in enumerate(_QUALIFIERS):
+            rows.append({"code": f"{h['code']}{j + 1:02d}", "name": f"{h['name']}, {qualifier}", "chapter": h["chapter"]})
+    return rows
+
+
+def _time(fn, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def run(label: str, headings, repeats: int = 500):
+    synonyms = load_synonyms()
+    started = time.perf_counter()
+    index = HSIndex(headings, synonyms)
+    build_ms = (time.perf_counter() - started) * 1000
+    print("=" * 60)
+    print(f"{label}: {len(headings):,} rows, index build {build_ms:.0f}ms")
+    print("=" * 60)
+    print(f"{'query':<18} {'scan':>10} {'bm25':>10}  top hit")
+    for q in QUERIES:
+        scan_us = _time(lambda: _legacy_scan(headings, q), repeats)
+        index_us = _time(lambda: index.search(q), repeats)
+        top = index.search(q)[:1]
+        hit = f"{top[0]['heading']['code']} ({top[0]['confidence']}%) {top[0]['heading']['name'][:32]}" if top else "-"
+        print(f"{q:<18} {scan_us:>8.1f}us {index_us:>8.1f}us  {hit}")
+    print(f"{'prefix':<18} {'scan':>10} {'index':>10}  same headings")
+    for q in PREFIX_QUERIES:
+        expected = {h["code"] for h in _word_prefix_scan(headings, q)}
+        found = {m["heading"]["code"] for m in index.search(q, limit=len(headings))}
+        print(f"{q:<18} {len(expected):>10} {len(found):>10}  {'yes' if found == expected else 'NO'}")
+
+
+def main():
+    run("WCO HEADINGS", HS_HEADINGS)
+    run("SUBHEADING-SIZED", _subheadings())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Microbenchmark: trade-lane resolution, old list scans vs app/services/lanes.py tables.
+
+Usage (from backend/):  python -m scripts.bench_lanes [pairs]
+Resolves `pairs` (default 1,000,000) origin/destination pairs drawn from MAJOR_PORTS plus
+free-text and unknown codes, through:
+  - quotes: the old _match/_lane startswith scans vs lanes.quote_lane
+  - tools:  the old forward/reverse LANES f-string lookups vs lanes.country_lane
+and first checks that old and new agree on every distinct pair in the sample.
+"""
+import random
+import sys
+import time
+from app.data.ports import MAJOR_PORTS
+from app.services import lanes
+from app.services.lanes import ASIA, EUROPE, MIDEAST, US_EAST, US_WEST, LANES, country_lane, quote_lane
+
+
+def _match(code: str, regions: list) -> bool:
+    c = code.upper()
+    return any(c.startswith(r.upper()) or c == r.upper() for r in regions)
+
+
+def _legacy_lane(origin: str, dest: str) -> str:
+    """The pre-compile quotes._lane decision tree (lane name only)."""
+    o, d = origin.upper(), dest.upper()
+    if _match(o, ASIA):
+        if _match(d, US_WEST):
+            return "Trans-Pacific Westbound"
+        if _match(d, US_EAST):
+            return "Trans-Pacific East Coast (All-Water)"
+        if _match(d, EUROPE):
+            return "Asia-Europe"
+        if _match(d, MIDEAST):
+            return "Asia-Middle East"
+        return "Asia-International"
+    if _match(o, EUROPE):
+        if _match(d, US_WEST) or _match(d, US_EAST):
+            return "Europe-North America"
+        return "Europe-International"
+    if _match(o, US_WEST) or _match(o, US_EAST):
+        if _match(d, ASIA):
+            return "Trans-Pacific Eastbound"
+        if _match(d, EUROPE):
+            return "North America-Europe"
+    return "International"
+
+
+def _legacy_country_lane(orig_cc: str, dest_cc: str):
+    return LANES.get(f"{orig_cc}-{dest_cc}") or LANES.get(f"{dest_cc}-{orig_cc}")
+
+
+def main(n: int):
+    rng = random.Random(7)
+    places = [p[2] for p in MAJOR_PORTS] + ["Shanghai", "shanghai", "sajed", "USMIA", "ZZZZZ", "", "Rotterdam"]
+    pairs = [(rng.choice(places), rng.choice(places)) for _ in range(n)]
+    cc_pairs = [(o[:2].upper(), d[:2].upper()) for o, d in pairs]
+
+    mismatches = sum(
+        1 for o, d in set(pairs) if _legacy_lane(o, d) != quote_lane(o, d)["lane"]
+    ) + sum(1 for o, d in set(cc_pairs) if _legacy_country_lane(o, d) is not country_lane(o, d))
+    print("=" * 60)
+    print(f"LANE RESOLUTION — {n:,} pairs, {len(places)} distinct places, "
+          f"{len(lanes.QUOTE_LANE_TABLE)} region pairs, {len(lanes.RATE_TABLE)} country lanes")
+    print(f"Old vs new disagreements: {mismatches}")
+    print("=" * 60)
+
+    for label, old, new, sample in (
+        ("quotes (region lane)", _legacy_lane, quote_lane, pairs),
+        ("tools (country lane)", _legacy_country_lane, country_lane, cc_pairs),
+    ):
+        started = time.perf_counter()
+        for o, d in sample:
+            old(o, d)
+        old_s = time.perf_counter() - started
+        started = time.perf_counter()
+        for o, d in sample:
+            new(o, d)
+        new_s = time.perf_counter() - started
+        print(f"{label:<22} old {old_s:6.2f}s ({old_s / n * 1e9:6.0f}ns/pair)   "
+              f"new {new_s:6.2f}s ({new_s / n * 1e9:5.0f}ns/pair)   {old_s / new_s:5.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
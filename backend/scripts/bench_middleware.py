@@ -0,0 +1,112 @@
+"""
+Benchmark: middleware stack throughput, legacy @app.middleware("http") function vs raw ASGI.
+
+Usage (from backend/):  python -m scripts.bench_middleware [requests] [concurrency]
+Both stacks are GZip + CORS + the security/rate-limit layer around the same two routes:
+/health and a typical JSON list (40 requests with nested quotes, ~20 KB). Requests are
+driven in-process through httpx's ASGI transport, so the numbers isolate middleware cost
+from network and server overhead. Clients are localhost, i.e. the rate-limit bypass path.
+"""
+import asyncio
+import sys
+import time
+import logging
+logging.disable(logging.CRITICAL)
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from app.core.middleware import SecurityRateLimitMiddleware
+from app.db.session import begin_pool_stats
+from app.db.query_stats import begin_query_stats
+
+_PAYLOAD = [
+    {
+        "request_id": f"REQ-{i:05d}", "origin": "CNSHA", "destination": "NLRTM", "status": "OPEN",
+        "cargo_type": "FCL", "submitted_at": "2026-10-18T09:00:00",
+        "quotes": [{"quotation_id": f"Q-{i}-{j}", "forwarder_company": "Bench Freight", "total_price": 1800 + j * 75,
+                    "currency": "USD", "transit_days": 28 + j, "carrier": "Maersk"} for j in range(3)],
+    }
+    for i in range(40)
+]
+
+
+def _routes(app: FastAPI) -> FastAPI:
+    @app.get("/health")
+    def health_check():
+        return {"status": "Online", "note": "CargoLink API is running. Authentication required."}
+
+    @app.get("/api/marketplace/my-requests")
+    async def my_requests():
+        return {"success": True, "requests": _PAYLOAD}
+
+    return app
+
+
+def _outer(app: FastAPI) -> FastAPI:
+    app.add_middleware(GZipMiddleware, minimum_size=500)
+    app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allow_methods=["GET"])
+    return app
+
+
+def legacy_app() -> FastAPI:
+    """The pre-ASGI stack: BaseHTTPMiddleware-style function middleware."""
+    app = _routes(FastAPI())
+
+    @app.middleware("http")
+    async def security_and_rate_limit(request: Request, call_next):
+        begin_pool_stats()
+        begin_query_stats()
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        return response
+
+    return _outer(app)
+
+
+def asgi_app() -> FastAPI:
+    app = _routes(FastAPI())
+    app.add_middleware(SecurityRateLimitMiddleware)
+    return _outer(app)
+
+
+async def _run(label: str, app: FastAPI, path: str, n: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 50000))
+    headers = {"Accept-Encoding": "gzip", "Origin": "http://localhost:3000"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50):
+            await client.get(path, headers=headers)   # warm-up
+
+        remaining = n
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                resp = await client.get(path, headers=headers)
+                assert resp.status_code == 200 and resp.headers.get("x-frame-options") == "DENY"
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    print(f"{label:<16} {path:<30} {n / elapsed:9.0f} req/s")
+
+
+async def main(n: int, concurrency: int):
+    print("=" * 60)
+    print(f"MIDDLEWARE BENCHMARK ({n} requests, concurrency {concurrency})")
+    print("=" * 60)
+    for path in ("/health", "/api/marketplace/my-requests"):
+        await _run("legacy function", legacy_app(), path, n, concurrency)
+        await _run("raw ASGI", asgi_app(), path, n, concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    ))
@@ -0,0 +1,101 @@
+"""
+Benchmark: offline port search, old linear scan vs app/services/port_index.PortIndex.
+
+Usage (from backend/):  python -m scripts.bench_port_index [unlocode.csv]
+Runs the same type-ahead queries against MAJOR_PORTS (~200 entries) and a ~100k-entry set:
+the UN/LOCODE CSV if given (same loader as PORT_INDEX_FILE), otherwise synthetic ports.
+Reports index build time and per-query latency (mean over repeats), and checks that the index
+returns the same results as the scan for every literal (non-fuzzy) query.
+"""
+import random
+import sys
+import time
+from app.data.ports import MAJOR_PORTS
+from app.services.port_index import PortIndex, load_unlocode
+
+QUERIES = [("shang", ""), ("jebel", ""), ("rotter", ""), ("cnsha", ""), ("ha", ""), ("s", "CN"),
+           ("port", ""), ("otterd", ""), ("zzq", "")]
+FUZZY_QUERIES = [("rotterdma", ""), ("shanghia", "")]
+
+
+def _legacy_search(rows, q: str, country: str = ""):
+    """The pre-index _fallback_ports body."""
+    q_lower = q.lower()
+    country_lower = country.lower()
+    results = []
+    for name, city, unlocode, country_name, country_code in rows:
+        if country and country_code.lower() != country_lower:
+            continue
+        if q_lower and not (
+            q_lower in city.lower() or
+            q_lower in name.lower() or
+            q_lower in unlocode.lower()
+        ):
+            continue
+        results.append({"name": name, "city": city, "code": unlocode, "country": country_name,
+                        "country_code": country_code, "region": "", "type": ""})
+    results.sort(key=lambda r: (0 if r["city"].lower().startswith(q_lower) else 1, r["name"]))
+    return results[:20]
+
+
+def _synthetic(n: int):
+    rng = random.Random(42)
+    syllables = ["sha", "ng", "hai", "rot", "ter", "dam", "je", "bel", "a", "li", "ham", "burg", "por", "to",
+                 "san", "ta", "ma", "ri", "ko", "be", "lo", "na", "du", "bai", "kar", "chi", "mum", "va"]
+    countries = [("CN", "China"), ("US", "United States"), ("NL", "Netherlands"), ("AE", "United Arab Emirates"),
+                 ("IN", "India"), ("BR", "Brazil"), ("DE", "Germany"), ("SA", "Saudi Arabia")]
+    rows = list(MAJOR_PORTS)
+    codes = {r[2] for r in rows}
+    while len(rows) < n:
+        city = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).title()
+        cc, cname = rng.choice(countries)
+        code = cc + "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ23456789") for _ in range(3))
+        if code in codes:
+            continue
+        codes.add(code)
+        rows.append((city, city, code, cname, cc))
+    return rows
+
+
+def _time(fn, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def run(label: str, rows, repeats: int):
+    # The index keeps the first row per LOCODE; compare against the same rows
+    first = {}
+    for row in rows:
+        first.setdefault(row[2].upper(), row)
+    rows = list(first.values())
+    started = time.perf_counter()
+    index = PortIndex(rows)
+    build_ms = (time.perf_counter() - started) * 1000
+    print("=" * 60)
+    print(f"{label}: {len(index):,} entries, index build {build_ms:.0f}ms")
+    print("=" * 60)
+    print(f"{'query':<14} {'scan':>12} {'index':>12} {'speedup':>9}  match")
+    for q, country in QUERIES:
+        scan_us = _time(lambda: _legacy_search(rows, q, country), max(1, repeats // 20))
+        index_us = _time(lambda: index.search(q, country), repeats)
+        same = [r["code"] for r in index.search(q, country)] == [r["code"] for r in _legacy_search(rows, q, country)]
+        label_q = f"{q}{'/' + country if country else ''}"
+        print(f"{label_q:<14} {scan_us:>10.1f}us {index_us:>10.1f}us {scan_us / index_us:>8.0f}x  {'OK' if same else 'DIFF'}")
+    for q, country in FUZZY_QUERIES:
+        index_us = _time(lambda: index.search(q, country), repeats)
+        top = index.search(q, country)[:1]
+        print(f"{q:<14} {'-':>12} {index_us:>10.1f}us {'fuzzy':>9}  {top[0]['code'] + ' ' + top[0]['city'] if top else 'no match'}")
+
+
+def main():
+    run("MAJOR_PORTS", list(MAJOR_PORTS), repeats=2000)
+    if len(sys.argv) > 1:
+        run(f"UN/LOCODE {sys.argv[1]}", load_unlocode(sys.argv[1]), repeats=200)
+    else:
+        run("SYNTHETIC", _synthetic(100_000), repeats=200)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: quote write throughput (n8n_quote_sync, portal_submit_bid) with the pruned
+index set of migration e8f2a4b6c0d3 vs the legacy index set it removed.
+
+Usage (from backend/, after `alembic upgrade head`):  python -m scripts.bench_quote_writes [writes_per_phase]
+Runs the real route handlers inside one outer transaction (handler commits become savepoint
+releases) and rolls everything back at the end. The index swaps take table locks, so point
+DATABASE_URL at a scratch database, not production.
+"""
+import asyncio
+import importlib.util
+import sys
+import time
+from pathlib import Path
+import logging
+logging.disable(logging.CRITICAL)
+from fastapi import BackgroundTasks
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import engine
+from app.api.routers.marketplace import n8n_quote_sync, N8nQuoteSync
+from app.api.routers.forwarders import portal_submit_bid, PortalBidSubmit
+
+N_FORWARDERS = 200
+N_BACKGROUND_QUOTES = 50000
+
+
+def _migration():
+    path = Path(__file__).resolve().parent.parent / "alembic" / "versions" / "e8f2a4b6c0d3_prune_marketplace_indexes.py"
+    spec = importlib.util.spec_from_file_location("prune_marketplace_indexes", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def _seed(conn, n: int):
+    await conn.execute(text(f"""
+        INSERT INTO forwarders (id, forwarder_id, company_name, email, status, failed_auth_attempts)
+        SELECT 'bench-f-' || g, 'BF' || g, 'Bench Freight ' || g, 'ops' || g || '@benchfreight.com', 'ACTIVE', 0
+        FROM generate_series(1, {N_FORWARDERS}) g"""))
+    # One fresh OPEN request per write and phase, so no write hits MAX_QUOTES_PER_REQUEST
+    await conn.execute(text(f"""
+        INSERT INTO requests (request_id, user_sovereign_id, user_email, status, is_f2f, quotation_count, submitted_at)
+        SELECT 'BENCH-REQ-' || g, 'BENCH-' || (g % 500), 'shipper' || g || '@bench.invalid', 'OPEN', false, 0, now()
+        FROM generate_series(1, {n * 4 + N_BACKGROUND_QUOTES}) g"""))
+    # Existing quotes, so every index insert walks a realistically deep b-tree
+    await conn.execute(text(f"""
+        INSERT INTO quotations (quotation_id, request_id, forwarder_id, forwarder_email, forwarder_company,
+                                total_price, currency, transit_days, carrier, status, received_at)
+        SELECT 'BENCH-BG-' || g, 'BENCH-REQ-' || ({n * 4} + g), 'BF' || (g % {N_FORWARDERS}),
+               'ops' || (g % {N_FORWARDERS}) || '@benchfreight.com', 'Bench Freight ' || (g % {N_FORWARDERS}),
+               500 + g % 4000, 'USD', g % 40, 'Carrier ' || (g % 12), 'ACTIVE', now()
+        FROM generate_series(1, {N_BACKGROUND_QUOTES}) g"""))
+    await conn.execute(text("ANALYZE forwarders"))
+    await conn.execute(text("ANALYZE requests"))
+    await conn.execute(text("ANALYZE quotations"))
+
+
+async def _run(label: str, session: AsyncSession, n: int, offset: int, write):
+    samples = []
+    for i in range(n):
+        started = time.perf_counter()
+        await write(session, offset + i + 1)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    total = sum(samples)
+    p50 = samples[len(samples) // 2] * 1000
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+    print(f"{label:<34} {n / total:8.1f} writes/s  p50={p50:6.2f}ms  p99={p99:6.2f}ms")
+
+
+async def _n8n_write(session: AsyncSession, i: int):
+    await n8n_quote_sync(N8nQuoteSync(
+        quotation_id=f"BENCH-N8N-{i}", request_id=f"BENCH-REQ-{i}", forwarder_id=f"BF{i % N_FORWARDERS + 1}",
+        forwarder_email=f"ops{i % N_FORWARDERS + 1}@benchfreight.com", forwarder_company="Bench Freight",
+        price=1000 + i % 900, transit_days=i % 40, carrier="Bench Line", summary="bench",
+    ), session)
+
+
+async def _portal_write(session: AsyncSession, i: int):
+    f = i % N_FORWARDERS + 1
+    await portal_submit_bid(PortalBidSubmit(
+        forwarder_id=f"BF{f}", email=f"ops{f}@benchfreight.com", request_id=f"BENCH-REQ-{i}",
+        price=1000 + i % 900, transit_days=i % 40, carrier="Bench Line",
+    ), BackgroundTasks(), session)
+
+
+async def main(n: int):
+    migration = _migration()
+    print("=" * 60)
+    print(f"QUOTE WRITE BENCHMARK ({n} writes per phase, {N_BACKGROUND_QUOTES} existing quotes)")
+    print("=" * 60)
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            await _seed(conn, n)
+            session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+
+            # Legacy phase: every index the migration dropped is present
+            for name, table, cols in migration._DROPPED:
+                await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(cols)})"))
+            await _run("n8n_quote_sync     (legacy)", session, n, 0, _n8n_write)
+            await _run("portal_submit_bid  (legacy)", session, n, n, _portal_write)
+
+            # Pruned phase: the index set after e8f2a4b6c0d3
+            for name, _table, _cols in migration._DROPPED:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS idx_quote_request_price ON quotations (request_id, total_price)"))
+            await _run("n8n_quote_sync     (pruned)", session, n, 2 * n, _n8n_write)
+            await _run("portal_submit_bid  (pruned)", session, n, 3 * n, _portal_write)
+            await session.close()
+        finally:
+            await trans.rollback()
+    print("=" * 60)
+    print("Rolled back — no benchmark rows or index changes were kept.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
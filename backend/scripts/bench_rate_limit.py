@@ -0,0 +1,59 @@
+"""
+Benchmark: rate-limit middleware overhead, legacy ZSET pipeline vs GCRA Lua script vs local tier.
+
+Usage (from backend/):  python -m scripts.bench_rate_limit [iterations]
+Requires REDIS_URL to point at a reachable Redis. Reports p50/p99 per check in microseconds.
+"""
+import asyncio
+import sys
+import time
+import redis.asyncio as aioredis
+from app.core import redis as redis_mod
+from app.core.config import settings
+from app.core.rate_limit import RateLimiter
+
+
+def _pct(samples: list, p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] * 1e6
+
+
+async def _legacy(client, ip: str):
+    """The pre-GCRA middleware body: 4 commands, one ZSET member per request."""
+    now = time.time()
+    key = f"bench:rate:{ip}"
+    pipe = client.pipeline()
+    pipe.zremrangebyscore(key, 0, now - 60)
+    pipe.zadd(key, {str(now): now})
+    pipe.zcard(key)
+    pipe.expire(key, 60)
+    results = await pipe.execute()
+    return results[2] > settings.RATE_LIMIT_PER_MINUTE
+
+
+async def _run(label: str, fn, n: int):
+    samples = []
+    for i in range(n):
+        started = time.perf_counter()
+        await fn(f"10.0.{i % 200}.{i % 250}")
+        samples.append(time.perf_counter() - started)
+    print(f"{label:<28} p50={_pct(samples, 0.50):8.1f}us  p99={_pct(samples, 0.99):8.1f}us")
+
+
+async def main(n: int):
+    client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    await client.ping()
+    redis_mod.redis_client = client
+
+    limiter = RateLimiter()
+    await _run("legacy ZSET pipeline", lambda ip: _legacy(client, ip), n)
+    await _run("GCRA Lua (redis tier)", lambda ip: limiter.check("/api/dashboard/stats", None, ip), n)
+
+    redis_mod.redis_client = None
+    await _run("token bucket (local tier)", lambda ip: limiter.check("/api/dashboard/stats", None, ip), n)
+
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
@@ -0,0 +1,144 @@
+"""
+Index check: seed synthetic rows, then assert via EXPLAIN that every hot query uses its intended index.
+
+Usage (from backend/, after `alembic upgrade head`):  python -m scripts.explain_hot_queries
+Everything runs inside one transaction that is rolled back, so no seed data is left behind.
+Point DATABASE_URL at a scratch database anyway — the seed briefly holds row locks.
+"""
+import asyncio
+import json
+import sys
+import logging
+logging.disable(logging.CRITICAL)
+from sqlalchemy import select, func, text, or_
+from sqlalchemy.dialects import postgresql
+from app.db.session import engine
+from app.models.user import User
+from app.models.forwarder import Forwarder
+from app.models.conversation import Conversation, ChatMessage
+from app.models.marketplace import MarketplaceRequest, MarketplaceBid
+
+N_USERS = 20000
+N_FORWARDERS = 2000
+N_REQUESTS = 50000
+N_QUOTES = 100000
+N_CONVERSATIONS = 20000
+
+SEED_SQL = [
+    f"""INSERT INTO users (id, sovereign_id, email, role, is_active, is_locked, failed_login_attempts, onboarding_completed)
+        SELECT 'bench-u-' || g, 'BENCH-' || g, 'Bench.User' || g || '@Example.com', 'user', true, false, 0, true
+        FROM generate_series(1, {N_USERS}) g""",
+    f"""INSERT INTO forwarders (id, forwarder_id, company_name, email, status, failed_auth_attempts)
+        SELECT 'bench-f-' || g, 'BF' || g, 'Bench Freight ' || g, 'Ops' || g || '@BenchFreight.com', 'ACTIVE', 0
+        FROM generate_series(1, {N_FORWARDERS}) g""",
+    f"""INSERT INTO requests (request_id, user_sovereign_id, status, is_f2f, posted_by_forwarder_id, quotation_count, submitted_at)
+        SELECT 'BENCH-REQ-' || g, 'BENCH-' || (g % 5000), CASE WHEN g % 20 = 0 THEN 'OPEN' ELSE 'CLOSED' END,
+               g % 50 = 0, CASE WHEN g % 50 = 0 THEN 'BF' || (g % {N_FORWARDERS}) END, 0,
+               now() - g * interval '1 minute'
+        FROM generate_series(1, {N_REQUESTS}) g""",
+    f"""INSERT INTO quotations (quotation_id, request_id, forwarder_id, status, received_at)
+        SELECT 'BENCH-Q-' || g, 'BENCH-REQ-' || (1 + g % {N_REQUESTS}), 'BF' || (g % {N_FORWARDERS}), 'ACTIVE', now()
+        FROM generate_series(1, {N_QUOTES}) g""",
+    f"""INSERT INTO conversations (public_id, shipper_id, forwarder_id, status, shipper_close_req, forwarder_close_req,
+                                  shipper_book_req, forwarder_book_req, updated_at)
+        SELECT 'bench-c-' || g, 'BENCH-' || (g % 5000), 'BF' || (g % {N_FORWARDERS}), 'OPEN',
+               false, false, false, false, now() - g * interval '1 minute'
+        FROM generate_series(1, {N_CONVERSATIONS}) g""",
+    """INSERT INTO chat_messages (conversation_id, sender_role, sender_id, message_type, content, is_read, created_at)
+        SELECT c.id,
+               CASE WHEN g = 1 THEN 'SYSTEM' WHEN g % 2 = 0 THEN 'SHIPPER' ELSE 'FORWARDER' END,
+               CASE WHEN g = 1 THEN 'SYSTEM' WHEN g % 2 = 0 THEN c.shipper_id ELSE c.forwarder_id END,
+               'TEXT', 'bench message', g < 9, now()
+        FROM conversations c CROSS JOIN generate_series(1, 10) g
+        WHERE c.public_id LIKE 'bench-c-%'""",
+    "ANALYZE users", "ANALYZE forwarders", "ANALYZE requests",
+    "ANALYZE quotations", "ANALYZE conversations", "ANALYZE chat_messages",
+]
+
+
+def _hot_queries(conv_ids: list) -> list:
+    """(label, statement, acceptable index names) — statements mirror the routers."""
+    shipper, fwd = "BENCH-42", "BF42"
+    already_bid_sub = select(MarketplaceBid.request_id).where(MarketplaceBid.forwarder_id == fwd)
+    return [
+        ("crud.user.get_by_email",
+         select(User).filter(func.lower(User.email) == "bench.user123@example.com"),
+         {"idx_users_email_lower"}),
+        ("forwarder lookup by email",
+         select(Forwarder).where(func.lower(Forwarder.email) == "ops123@benchfreight.com"),
+         {"idx_forwarders_email_lower"}),
+        ("unread counts per conversation",
+         select(ChatMessage.conversation_id, func.count(ChatMessage.id))
+         .where(ChatMessage.conversation_id.in_(conv_ids), ChatMessage.sender_id != shipper,
+                ChatMessage.is_read == False, ChatMessage.sender_role != "SYSTEM")  # noqa: E712
+         .group_by(ChatMessage.conversation_id),
+         {"idx_msg_unread_partial"}),
+        ("shipper conversation list",
+         select(Conversation).where(Conversation.shipper_id == shipper).order_by(Conversation.updated_at.desc()),
+         {"idx_conv_shipper_updated"}),
+        ("forwarder conversation list",
+         select(Conversation).where(Conversation.forwarder_id == fwd).order_by(Conversation.updated_at.desc()),
+         {"idx_conv_forwarder_updated"}),
+        ("forwarder inbox (open requests)",
+         select(MarketplaceRequest)
+         .where(MarketplaceRequest.status == "OPEN", MarketplaceRequest.request_id.notin_(already_bid_sub))
+         .order_by(MarketplaceRequest.submitted_at.desc()).limit(20),
+         {"idx_request_open_submitted"}),
+        ("forwarder inbox (with F2F)",
+         select(MarketplaceRequest)
+         .where(MarketplaceRequest.status == "OPEN", MarketplaceRequest.request_id.notin_(already_bid_sub),
+                or_(MarketplaceRequest.is_f2f == False, MarketplaceRequest.posted_by_forwarder_id != fwd))  # noqa: E712
+         .order_by(MarketplaceRequest.is_f2f.desc(), MarketplaceRequest.submitted_at.desc()).limit(20),
+         {"idx_request_open_f2f_submitted"}),
+        ("inbox anti-join subquery",
+         already_bid_sub,
+         {"idx_quote_forwarder_request"}),
+        ("quotes of a request by price",
+         select(MarketplaceBid).where(MarketplaceBid.request_id == "BENCH-REQ-100")
+         .order_by(MarketplaceBid.total_price.asc()),
+         {"idx_quote_request_price"}),
+        ("my requests",
+         select(MarketplaceRequest).where(MarketplaceRequest.user_sovereign_id == shipper)
+         .order_by(MarketplaceRequest.submitted_at.desc()),
+         {"idx_request_sovereign_submitted"}),
+    ]
+
+
+def _index_names(plan: dict) -> set:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+async def main() -> int:
+    failures = 0
+    print("=" * 60)
+    print("HOT QUERY INDEX CHECK")
+    print("=" * 60)
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            for sql in SEED_SQL:
+                await conn.execute(text(sql))
+            conv_ids = [r[0] for r in (await conn.execute(
+                select(Conversation.id).where(Conversation.shipper_id == "BENCH-42")
+            )).all()]
+
+            for label, stmt, expected in _hot_queries(conv_ids):
+                sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+                raw = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar()
+                plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+                used = _index_names(plan)
+                ok = bool(used & expected)
+                failures += 0 if ok else 1
+                print(f"[{'PASS' if ok else 'FAIL'}] {label:<34} expected {sorted(expected)} used {sorted(used) or 'seq scan'}")
+        finally:
+            await trans.rollback()
+    print("=" * 60)
+    print("ALL HOT QUERIES USE THEIR INDEXES" if not failures else f"{failures} QUERY PLAN(S) MISSED THEIR INDEX")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
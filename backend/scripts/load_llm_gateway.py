@@ -0,0 +1,94 @@
+"""
+Load test: the shared LLM gateway (app/services/llm_gateway.py) against the offline fake
+backend (app/services/llm_fake.py) — no OpenAI key or network needed.
+
+Usage (from backend/):  python -m scripts.load_llm_gateway [users] [failure_rate]
+Starts `users` (default 60) concurrent callers, split across the three features the way the
+app uses them — agent (streamed turns), quotes (JSON chat) and rag (embed + chat) — each
+making 5 calls. Reports per feature: completed / unavailable calls, p50 and p95 latency, and
+tokens; plus the peak calls in flight at the backend (must stay ≤ LLM_MAX_CONCURRENCY), and
+retries and the breaker state when `failure_rate` (default 0.05) injects upstream 503s.
+"""
+import asyncio
+import sys
+import time
+import logging
+logging.disable(logging.CRITICAL)
+from app.core import metrics
+from app.core.config import settings
+from app.services.llm_fake import FakeLLM
+from app.services.llm_gateway import FEATURES, LLMUnavailable, llm_gateway
+
+CALLS_PER_USER = 5
+MESSAGES = [{"role": "user", "content": "What does FOB mean for a 40HC from Shanghai to Jebel Ali?"}]
+
+
+async def _agent():
+    async for _ in llm_gateway.stream("agent", model="gpt-4o-mini", messages=MESSAGES):
+        pass
+
+
+async def _quotes():
+    await llm_gateway.chat("quotes", model="gpt-4o-mini", messages=MESSAGES, response_format={"type": "json_object"})
+
+
+async def _rag():
+    await llm_gateway.embed("rag", [MESSAGES[0]["content"]])
+    await llm_gateway.chat("rag", model="gpt-4o-mini", messages=MESSAGES)
+
+
+CALLERS = {"agent": _agent, "quotes": _quotes, "rag": _rag}
+
+
+async def _user(feature: str, latencies: list, unavailable: list):
+    for _ in range(CALLS_PER_USER):
+        started = time.perf_counter()
+        try:
+            await CALLERS[feature]()
+            latencies.append(time.perf_counter() - started)
+        except LLMUnavailable:
+            unavailable.append(feature)
+
+
+def _pct(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _counter(metric, *labels) -> float:
+    return metric.labels(*labels)._value.get()
+
+
+async def main(users: int, failure_rate: float):
+    fake = FakeLLM(first_token=0.2, per_token=0.002, failure_rate=failure_rate, seed=24)
+    llm_gateway.use_backend(fake)
+    features = list(CALLERS)
+    latencies = {f: [] for f in features}
+    unavailable: list = []
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _user(features[i % len(features)], latencies[features[i % len(features)]], unavailable)
+        for i in range(users)
+    ))
+    elapsed = time.perf_counter() - started
+
+    print("=" * 60)
+    print(f"LLM GATEWAY — {users} users × {CALLS_PER_USER} calls, fake backend "
+          f"(200ms first token, {failure_rate:.0%} upstream 503s)")
+    print("=" * 60)
+    print(f"{'feature':<8}{'cap':>5}{'done':>7}{'unavail':>9}{'p50':>9}{'p95':>9}{'tokens':>10}{'retries':>9}")
+    for f in features:
+        tokens = _counter(metrics.LLM_TOKENS, f, "prompt") + _counter(metrics.LLM_TOKENS, f, "completion")
+        print(f"{f:<8}{FEATURES[f][0]:>5}{len(latencies[f]):>7}{unavailable.count(f):>9}"
+              f"{_pct(latencies[f], 0.5) * 1000:>7.0f}ms{_pct(latencies[f], 0.95) * 1000:>7.0f}ms"
+              f"{tokens:>10,.0f}{_counter(metrics.LLM_CALLS, f, 'retried'):>9.0f}")
+    print(f"Backend calls {fake.calls:,} ({fake.failures} failed), peak in flight {fake.peak} "
+          f"(limit {settings.LLM_MAX_CONCURRENCY}), breaker {llm_gateway.breaker.state}, {elapsed:.1f}s total")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 60,
+                     float(sys.argv[2]) if len(sys.argv) > 2 else 0.05))
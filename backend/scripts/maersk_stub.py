@@ -0,0 +1,80 @@
+"""
+Local stand-in for the Maersk reference-data API, for exercising app/services/maersk.py.
+
+Usage (from backend/):  python -m scripts.maersk_stub [port] [latency_ms] [failure_rate]
+Then start the backend with MAERSK_BASE_URL=http://127.0.0.1:<port> (any MAERSK_CONSUMER_KEY).
+Serves /reference-data/locations, /commodity-classifications and /reference-data/vessels with
+canned data. Every request sleeps `latency_ms`; a `failure_rate` share (0..1) answers 503, which
+is enough to watch the circuit breaker open, fail fast, and close again on the half-open probe.
+Hit counts per path are printed so singleflight coalescing is visible.
+"""
+import asyncio
+import random
+import sys
+from collections import Counter
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8099
+LATENCY = (float(sys.argv[2]) if len(sys.argv) > 2 else 150) / 1000
+FAILURE_RATE = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+
+app = FastAPI(title="Maersk stub")
+hits = Counter()
+
+_LOCATIONS = [
+    {"cityName": "Shanghai", "countryCode": "CN", "countryName": "China", "UNLocationCode": "CNSHA", "locationType": "CITY"},
+    {"cityName": "Rotterdam", "countryCode": "NL", "countryName": "Netherlands", "UNLocationCode": "NLRTM", "locationType": "CITY"},
+    {"cityName": "Jeddah", "countryCode": "SA", "countryName": "Saudi Arabia", "UNLocationCode": "SAJED", "locationType": "CITY"},
+    {"cityName": "Dubai", "countryCode": "AE", "countryName": "United Arab Emirates", "UNLocationCode": "AEDXB", "locationType": "CITY"},
+]
+_COMMODITIES = [
+    {"commodityName": "Cotton, raw", "commodityCode": "520100", "hsCommodities": [{"hsCommodityCode": "520100", "hsCommodityName": "Cotton, not carded or combed"}]},
+    {"commodityName": "Cotton garments", "commodityCode": "620342", "hsCommodities": [{"hsCommodityCode": "620342", "hsCommodityName": "Men's trousers of cotton"}]},
+]
+_VESSELS = [
+    {"vesselIMONumber": "9778791", "vesselName": "MAERSK MC-KINNEY MOLLER", "vesselFlagCode": "DK", "carrierVesselCode": "MKM"},
+    {"vesselIMONumber": "9619907", "vesselName": "MADRID MAERSK", "vesselFlagCode": "DK", "carrierVesselCode": "MDM"},
+]
+
+
+@app.middleware("http")
+async def _latency_and_failures(request: Request, call_next):
+    hits[request.url.path] += 1
+    print(f"[STUB] {request.url.path}?{request.url.query}  (hits: {dict(hits)})")
+    await asyncio.sleep(LATENCY)
+    if random.random() < FAILURE_RATE:
+        return JSONResponse({"error": "stub failure"}, status_code=503)
+    return await call_next(request)
+
+
+@app.get("/reference-data/locations")
+async def locations(cityName: str = "", countryCode: str = ""):
+    q = cityName.lower()
+    return [
+        loc for loc in _LOCATIONS
+        if (not q or q in loc["cityName"].lower()) and (not countryCode or loc["countryCode"] == countryCode.upper())
+    ]
+
+
+@app.get("/commodity-classifications")
+async def commodities(commodityName: str = ""):
+    q = commodityName.lower()
+    return {"commodities": [c for c in _COMMODITIES if not q or q in c["commodityName"].lower()]}
+
+
+@app.get("/reference-data/vessels")
+async def vessels(vesselNames: str = "", vesselIMONumbers: str = "", limit: int = 10):
+    q = vesselNames.lower()
+    return [
+        v for v in _VESSELS
+        if (not q or q in v["vesselName"].lower()) and (not vesselIMONumbers or v["vesselIMONumber"] == vesselIMONumbers)
+    ][:limit]
+
+
+if __name__ == "__main__":
+    import uvicorn
+    print("=" * 60)
+    print(f"MAERSK STUB on :{PORT}  latency={LATENCY * 1000:.0f}ms  failure_rate={FAILURE_RATE:.0%}")
+    print("=" * 60)
+    uvicorn.run(app, host="127.0.0.1", port=PORT, log_level="warning")
@@ -0,0 +1,60 @@
+"""
+Startup report: import cost per module for one worker, plus the lifespan init steps.
+
+Usage (from backend/):  python -m scripts.startup_report [top_n]
+Imports app.main in a fresh interpreter under `python -X importtime` and sums the self
+import time per top-level package (fastapi, sqlalchemy, app.api.routers.*, ...),
+then runs the app's lifespan once and prints its [STARTUP] line (schema check, redis, ...).
+Heavy AI stacks (openai, llama_index) should NOT appear here — they load on first use.
+"""
+import asyncio
+import subprocess
+import sys
+from collections import defaultdict
+
+
+def _import_costs() -> list:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:])
+        raise SystemExit("import app.main failed")
+    by_group = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _cumulative_us, module = (f.strip() for f in line[len("import time:"):].split("|"))
+        if not self_us.isdigit():
+            continue   # header row
+        parts = module.split(".")
+        group = ".".join(parts[:4]) if parts[0] == "app" else parts[0]
+        by_group[group] += int(self_us)
+    return sorted(by_group.items(), key=lambda kv: kv[1], reverse=True)
+
+
+async def _lifespan():
+    from app.main import app, lifespan
+    async with lifespan(app):
+        pass
+
+
+def main(top_n: int):
+    costs = _import_costs()
+    total = sum(us for _, us in costs)
+    print("=" * 60)
+    print(f"IMPORT COST BY MODULE (self time, total {total / 1000:.0f}ms)")
+    print("=" * 60)
+    for group, us in costs[:top_n]:
+        print(f"{group:<44} {us / 1000:8.1f}ms")
+    heavy = [g for g, _ in costs if g in ("openai", "llama_index", "langchain", "faiss")]
+    print(f"Heavy AI stacks imported at startup: {', '.join(heavy) if heavy else 'none'}")
+    print("=" * 60)
+    print("LIFESPAN INIT")
+    print("=" * 60)
+    asyncio.run(_lifespan())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 25)
@@ -0,0 +1,40 @@
+"""
+Shared fixtures. Tests need neither Postgres nor Redis: DB fixtures use an in-memory SQLite
+engine instrumented exactly like the app's (app/db/query_stats.instrument).
+"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("OMEGO_API_SECRET", "test")
+
+import pytest
+from sqlalchemy import create_engine
+from app.db.query_stats import assert_query_budget, instrument
+
+pytest_plugins = ["pytester"]
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget(n): cap the statements a test using no_n_plus_one may run at n",
+    )
+
+
+@pytest.fixture
+def sqlite_engine():
+    engine = create_engine("sqlite://")
+    instrument(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def no_n_plus_one(request):
+    """
+    Fails the test if any statement ran N_PLUS_ONE_THRESHOLD or more times during it (an N+1
+    loop), or if it ran more statements than its `@pytest.mark.query_budget(n)`. Statements
+    from fixtures requested before this one (seeding) are not counted.
+    """
+    marker = request.node.get_closest_marker("query_budget")
+    with assert_query_budget(max_statements=marker.args[0] if marker else 10**9):
+        yield
@@ -0,0 +1,65 @@
+"""
+Statement budget of GET /api/admin/stats, run against an instrumented in-memory SQLite DB.
+"""
+import asyncio
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.api.deps import get_admin_user
+from app.api.routers import admin
+from app.db.query_stats import instrument
+from app.db.session import Base, get_db
+from app.models.forwarder import Forwarder
+from app.models.marketplace import MarketplaceBid, MarketplaceRequest
+from app.models.user import User
+
+_TABLES = [User.__table__, Forwarder.__table__, MarketplaceRequest.__table__, MarketplaceBid.__table__]
+
+
+async def _seed(sessions) -> None:
+    async with sessions() as db:
+        db.add_all([User(email=f"user{i}@example.com", role="forwarder" if i % 3 == 0 else "user") for i in range(12)])
+        db.add_all([Forwarder(status=s) for s in ("PENDING", "ACTIVE", "ACTIVE", "REJECTED")])
+        db.add_all([MarketplaceRequest(request_id=f"REQ-{i}", status="OPEN" if i % 2 else "CLOSED") for i in range(6)])
+        db.add_all([MarketplaceBid(request_id=f"REQ-{i % 6}", total_price=1000 + i) for i in range(18)])
+        await db.commit()
+
+
+@pytest.fixture
+def admin_api():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument(engine)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=_TABLES)
+        await _seed(sessions)
+
+    async def get_test_db():
+        async with sessions() as db:
+            yield db
+
+    asyncio.run(setup())
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/admin")
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_admin_user] = lambda: User(email="admin@example.com")
+    yield app
+    asyncio.run(engine.dispose())
+
+
+async def _get(app: FastAPI, path: str):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get(path)
+
+
+@pytest.mark.query_budget(14)
+def test_admin_stats_statement_budget(admin_api, no_n_plus_one):
+    response = asyncio.run(_get(admin_api, "/api/admin/stats"))
+    assert response.status_code == 200
+    stats = response.json()
+    assert (stats["total_users"], stats["forwarder_users"]) == (12, 4)
+    assert (stats["total_forwarders"], stats["active_forwarders"]) == (4, 2)
+    assert (stats["total_requests"], stats["open_requests"], stats["total_quotes"]) == (6, 3, 18)
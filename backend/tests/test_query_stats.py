@@ -0,0 +1,51 @@
+from pathlib import Path
+import pytest
+from sqlalchemy import text
+from app.db.query_stats import N_PLUS_ONE_THRESHOLD, assert_query_budget
+
+
+def _seed(conn, rows: int) -> None:
+    conn.execute(text("CREATE TABLE requests (id INTEGER PRIMARY KEY, shipper_id INTEGER)"))
+    conn.execute(text("INSERT INTO requests (id, shipper_id) VALUES (:id, :s)"),
+                 [{"id": i, "s": i % 3} for i in range(rows)])
+
+
+def test_repeated_statement_is_an_n_plus_one(sqlite_engine):
+    with sqlite_engine.connect() as conn:
+        _seed(conn, 10)
+        with pytest.raises(AssertionError, match=rf"N\+1 candidate x{N_PLUS_ONE_THRESHOLD}: SELECT"):
+            with assert_query_budget(max_statements=100):
+                for i in range(N_PLUS_ONE_THRESHOLD):
+                    conn.execute(text("SELECT shipper_id FROM requests WHERE id = :id"), {"id": i})
+
+
+def test_statement_budget(sqlite_engine):
+    with sqlite_engine.connect() as conn:
+        _seed(conn, 10)
+        with pytest.raises(AssertionError, match="3 statements \\(budget 2\\)"):
+            with assert_query_budget(max_statements=2, allow_n_plus_one=True):
+                for i in range(3):
+                    conn.execute(text("SELECT shipper_id FROM requests WHERE id = :id"), {"id": i})
+
+
+def test_batched_lookup_passes(sqlite_engine, no_n_plus_one):
+    with sqlite_engine.connect() as conn:
+        _seed(conn, 10)
+        ids = list(range(N_PLUS_ONE_THRESHOLD))
+        rows = conn.execute(text(f"SELECT id, shipper_id FROM requests WHERE id IN ({', '.join(map(str, ids))})")).all()
+    assert len(rows) == len(ids)
+
+
+def test_fixture_fails_a_test_with_an_n_plus_one_loop(pytester):
+    pytester.makeconftest(Path(__file__).with_name("conftest.py").read_text(encoding="utf-8"))
+    pytester.makepyfile(f"""
+        from sqlalchemy import text
+
+        def test_loop(sqlite_engine, no_n_plus_one):
+            with sqlite_engine.connect() as conn:
+                for i in range({N_PLUS_ONE_THRESHOLD}):
+                    conn.execute(text("SELECT :i"), {{"i": i}})
+    """)
+    result = pytester.runpytest_inprocess()
+    result.assert_outcomes(passed=1, errors=1)
+    result.stdout.fnmatch_lines([f"*N+1 candidate x{N_PLUS_ONE_THRESHOLD}: SELECT ?*"])